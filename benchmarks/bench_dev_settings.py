@@ -0,0 +1,107 @@
+"""
+Benchmark `django_develop.dev_settings`'s layered view against copying every setting.
+
+This generates a settings module with thousands of names (including large LOGGING, INSTALLED_APPS,
+and TEMPLATES structures), and times:
+
+* activation: copying every uppercase name onto the settings module, versus setting the layers;
+* activation followed by loading the settings with Django's `Settings`, which reads every name.
+
+Run from the repository root::
+
+    PYTHONPATH=src python benchmarks/bench_dev_settings.py --names 5000
+"""
+from __future__ import print_function, unicode_literals
+
+import argparse
+import sys
+import timeit
+import types
+
+
+def make_settings_module(count):
+    """
+    Generate a settings module with `count` extra names, and some large structures.
+    """
+    module = types.ModuleType(str('bench_base_settings'))
+    module.INSTALLED_APPS = ['app_{}'.format(i) for i in range(500)]
+    module.LOGGING = {
+        'version': 1,
+        'loggers': {'logger_{}'.format(i): {'level': 'INFO', 'handlers': ['console']}
+                    for i in range(1000)},
+    }
+    module.TEMPLATES = [{
+        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'DIRS': ['/templates/{}'.format(i) for i in range(500)],
+        'OPTIONS': {'context_processors': ['cp_{}'.format(i) for i in range(200)]},
+    }]
+    for i in range(count):
+        setattr(module, 'SETTING_{}'.format(i), {'value': i, 'items': list(range(10))})
+    return module
+
+
+def copy_loop(target, base_mod, defaults):
+    """
+    The previous approach: copy every uppercase name, then fill in the defaults.
+    """
+    resolved = {}
+    for name in dir(base_mod):
+        if name.isupper():
+            resolved[name] = getattr(base_mod, name)
+    for (name, value) in defaults.items():
+        if name not in resolved:
+            resolved[name] = value
+    resolved['DEBUG'] = True
+    for (name, value) in resolved.items():
+        setattr(target, name, value)
+
+
+def layered(dev_settings, base_mod, defaults):
+    from django_develop import overrides
+    dev_settings.set_layers([{'DEBUG': True}, overrides.ModuleLayer(base_mod), defaults])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--names', type=int, default=5000, help='Number of extra settings.')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    from django.conf import Settings
+    from django_develop import dev_settings
+
+    base_mod = make_settings_module(args.names)
+    defaults = {
+        'SECRET_KEY': 'benchmark',
+        'ROOT_URLCONF': 'django_develop.dev_urls',
+        'DATABASES': {'default': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': ':memory:'}},
+    }
+    copy_target = types.ModuleType(str('bench_copied_settings'))
+    sys.modules[copy_target.__name__] = copy_target
+
+    def run_copy():
+        copy_loop(copy_target, base_mod, defaults)
+
+    def run_layered():
+        layered(dev_settings, base_mod, defaults)
+
+    def run_copy_and_load():
+        run_copy()
+        Settings(copy_target.__name__)
+
+    def run_layered_and_load():
+        run_layered()
+        Settings('django_develop.dev_settings')
+
+    print('{} settings, best of {} runs:'.format(args.names + 3, args.repeat))
+    for (label, function) in [
+            ('copy loop: activate', run_copy),
+            ('layered view: activate', run_layered),
+            ('copy loop: activate + Django Settings load', run_copy_and_load),
+            ('layered view: activate + Django Settings load', run_layered_and_load)]:
+        best = min(timeit.repeat(function, number=1, repeat=args.repeat))
+        print('  {:<48} {:>9.3f} ms'.format(label, best * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,349 @@
+"""
+Benchmark django-develop's discovery and startup paths in a synthetic environment.
+
+This generates an environment (see `synthetic`) with thousands of packages, a deep package tree,
+slow-importing settings modules, and a settings module with many names, and times:
+
+* `utils.discover_candidate_settings()`;
+* `utils.find_potential_problems()`, for a large and a slow-importing settings module;
+* `utils.print_candidate_settings()`, classifying candidates statically and by importing them;
+* `DjangoDevelop.activate_dev_settings()`, with and without a settings snapshot;
+* end-to-end ``django-develop check`` (through `cli.main()`), the early exits of
+  ``django-develop`` and ``django-develop-config`` (outside a virtualenv, and with no instance),
+  and bare Python startup as a baseline.
+
+Each run happens in a fresh subprocess, so that import caches don't carry over.
+Results are written as JSON (and optionally in pyperf's format, if pyperf is installed), and can
+be compared against the results of a previous run, such as the last release's::
+
+    PYTHONPATH=src python benchmarks/bench_startup.py --output new.json --compare old.json
+"""
+from __future__ import print_function, unicode_literals
+
+import argparse
+import fnmatch
+import io
+import json
+import math
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from collections import OrderedDict
+
+import attr
+
+import synthetic
+
+
+_src_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+
+# Bump this when the results format changes.
+_results_version = 1
+
+
+def _entries(root):
+    with io.open(os.path.join(root, 'entries.json'), encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _instance_path(root, name):
+    return os.path.join(root, 'instance-{}'.format(name))
+
+
+# Benchmarks timed within a worker process: each function does its setup, and returns the
+# seconds taken by the measured call.
+
+def _time(function, *args, **kwargs):
+    start = time.perf_counter()
+    function(*args, **kwargs)
+    return time.perf_counter() - start
+
+
+def _discovery_only(root):
+    """
+    Restrict `sys.path` to the synthetic entries, and the standard library (which discovery
+    skips), so that results don't depend on what else is installed.
+    """
+    from django_develop import utils
+    utils.SUCCESS('')  # Imports Django's color styles, if DJANGO_COLORS needs them.
+    sys.path[:] = ([entry for entry in _entries(root) if not entry.endswith('project')] +
+                   [entry for entry in sys.path if utils._is_stdlib_path_entry(entry)])
+    return utils
+
+
+def bench_discover_candidate_settings(root):
+    utils = _discovery_only(root)
+    return _time(lambda: list(utils.discover_candidate_settings()))
+
+
+def bench_find_potential_problems_large(root):
+    from django_develop import utils
+    sys.path.insert(0, _entries(root)[-1])
+    return _time(utils.find_potential_problems, 'bench_project.settings')
+
+
+def bench_find_potential_problems_slow(root):
+    utils = _discovery_only(root)
+    return _time(utils.find_potential_problems, 'synthetic_slow_0.settings')
+
+
+def _print_candidate_settings(root, static):
+    utils = _discovery_only(root)
+    with io.open(os.devnull, 'w') as devnull:
+        stdout = sys.stdout
+        sys.stdout = devnull
+        try:
+            return _time(utils.print_candidate_settings, include_problems=True, static=static)
+        finally:
+            sys.stdout = stdout
+
+
+def bench_print_candidate_settings_static(root):
+    return _print_candidate_settings(root, static=True)
+
+
+def bench_print_candidate_settings_import(root):
+    return _print_candidate_settings(root, static=False)
+
+
+def _activate_dev_settings(root, instance):
+    from django_develop import cli, profiling
+    sys.path.insert(0, _entries(root)[-1])
+    dd = cli.DjangoDevelop(_instance_path(root, instance))
+    return _time(dd.activate_dev_settings, profiler=profiling.NullProfiler())
+
+
+def bench_activate_dev_settings(root):
+    return _activate_dev_settings(root, 'plain')
+
+
+def bench_activate_dev_settings_snapshot(root):
+    return _activate_dev_settings(root, 'snapshot')
+
+
+_main_source = """\
+import sys
+from django_develop import cli, utils
+utils.is_inside_virtual_env = lambda: True
+cli._get_DjangoDevelop = lambda: cli.DjangoDevelop({instance!r})
+sys.argv = ['django-develop', 'check']
+cli.main()
+"""
+
+
+_early_exit_source = """\
+import sys
+from django_develop import cli, utils
+utils.is_inside_virtual_env = lambda: {inside_virtual_env}
+cli._get_DjangoDevelop = lambda: cli.DjangoDevelop({instance!r})
+sys.argv = [{entry_point!r}, 'check']
+try:
+    cli.{function}()
+except SystemExit:
+    pass
+"""
+
+# name -> (entry point, function, inside a virtualenv)
+_early_exits = OrderedDict([
+    ('cli.main early exit (no virtualenv)', ('django-develop', 'main', False)),
+    ('cli.main early exit (no instance)', ('django-develop', 'main', True)),
+    ('cli.main_config early exit (no virtualenv)', ('django-develop-config', 'main_config',
+                                                    False)),
+])
+
+
+def _process_code(name, root):
+    """
+    Code for the benchmarks that time a whole process.
+    """
+    if name == 'cli.main startup (check)':
+        return _main_source.format(instance=_instance_path(root, 'plain'))
+    if name in _early_exits:
+        (entry_point, function, inside_virtual_env) = _early_exits[name]
+        return _early_exit_source.format(
+            inside_virtual_env=inside_virtual_env, instance=_instance_path(root, 'missing'),
+            entry_point=entry_point, function=function)
+    assert name == 'python startup'
+    return 'pass'
+
+
+BENCHMARKS = OrderedDict([
+    ('discover_candidate_settings', bench_discover_candidate_settings),
+    ('find_potential_problems (large settings)', bench_find_potential_problems_large),
+    ('find_potential_problems (slow import)', bench_find_potential_problems_slow),
+    ('print_candidate_settings (static)', bench_print_candidate_settings_static),
+    ('print_candidate_settings (import probes)', bench_print_candidate_settings_import),
+    ('activate_dev_settings', bench_activate_dev_settings),
+    ('activate_dev_settings (settings snapshot)', bench_activate_dev_settings_snapshot),
+    ('cli.main startup (check)', None),
+    ('cli.main early exit (no virtualenv)', None),
+    ('cli.main early exit (no instance)', None),
+    ('cli.main_config early exit (no virtualenv)', None),
+    ('python startup', None),
+])
+
+
+def _subprocess_env(root):
+    paths = [_entries(root)[-1], _src_path]
+    if os.environ.get('PYTHONPATH'):
+        paths.append(os.environ['PYTHONPATH'])
+    return dict(os.environ, PYTHONPATH=os.pathsep.join(paths))
+
+
+def run_once(name, root):
+    """
+    Run one benchmark in a fresh subprocess.
+
+    :return: Seconds
+    """
+    env = _subprocess_env(root)
+    if BENCHMARKS[name] is None:
+        start = time.perf_counter()
+        subprocess.check_call([sys.executable, '-c', _process_code(name, root)], env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        return time.perf_counter() - start
+    output = subprocess.check_output(
+        [sys.executable, os.path.abspath(__file__), '--worker', name, '--root', root], env=env)
+    return float(output.decode('ascii').strip().splitlines()[-1])
+
+
+def prepare(root, spec):
+    """
+    Generate the environment, and the instances to activate.
+    """
+    entries = synthetic.make_environment(root, spec)
+    with io.open(os.path.join(root, 'entries.json'), 'w', encoding='utf-8') as f:
+        f.write(json.dumps(entries))
+
+    sys.path.insert(0, _src_path)
+    from django_develop import cli
+    for (instance, snapshot) in [('plain', False), ('snapshot', True)]:
+        dd = cli.DjangoDevelop(_instance_path(root, instance))
+        with io.open(os.devnull, 'w') as devnull:
+            stdout = sys.stdout
+            sys.stdout = devnull
+            try:
+                dd.init_instance('bench_project.settings')
+            finally:
+                sys.stdout = stdout
+        config = dd.read_config()
+        config.set('django-develop', 'snapshot_settings', str(snapshot).lower())
+        dd.write_config(config)
+    # Save the settings snapshot.
+    run_once('activate_dev_settings (settings snapshot)', root)
+
+
+def _summary(values):
+    mean = sum(values) / len(values)
+    stdev = (math.sqrt(sum((v - mean) ** 2 for v in values) / (len(values) - 1))
+             if len(values) > 1 else 0.0)
+    return OrderedDict([('values', values), ('min', min(values)), ('mean', mean),
+                        ('stdev', stdev)])
+
+
+def _version():
+    try:
+        from importlib.metadata import version
+        return version('django-develop')
+    except Exception:
+        return 'unknown'
+
+
+def _metadata(spec):
+    import django
+    return OrderedDict([
+        ('django_develop', _version()),
+        ('django', django.get_version()),
+        ('python', platform.python_version()),
+        ('implementation', platform.python_implementation()),
+        ('platform', platform.platform()),
+        ('date', time.strftime('%Y-%m-%dT%H:%M:%S')),
+        ('spec', attr.asdict(spec)),
+    ])
+
+
+def write_pyperf(path, results):
+    """
+    Write the results as a pyperf benchmark suite (for ``python -m pyperf compare_to``).
+    """
+    import pyperf
+    suite = pyperf.BenchmarkSuite([
+        pyperf.Benchmark([pyperf.Run(result['values'], collect_metadata=False,
+                                     metadata={'name': name, 'unit': 'second'})])
+        for (name, result) in results['benchmarks'].items()])
+    suite.dump(path, replace=True)
+
+
+def print_comparison(results, baseline):
+    print()
+    print('Compared to {} ({}):'.format(baseline['metadata'].get('django_develop'),
+                                        baseline['metadata'].get('date')))
+    for (name, result) in results['benchmarks'].items():
+        old = baseline['benchmarks'].get(name)
+        if old is None:
+            continue
+        print('  {:<44} {:>9.1f} ms -> {:>9.1f} ms  {:>5.2f}x'.format(
+            name, old['mean'] * 1000, result['mean'] * 1000, result['mean'] / old['mean']))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5, help='Runs per benchmark.')
+    parser.add_argument('--only', metavar='PATTERN', action='append',
+                        help='Only run benchmarks matching this pattern (repeatable).')
+    parser.add_argument('--output', metavar='FILE', help='Write the results as JSON.')
+    parser.add_argument('--pyperf', metavar='FILE', help='Also write pyperf JSON results.')
+    parser.add_argument('--compare', metavar='FILE', help='Compare with previous JSON results.')
+    spec_defaults = synthetic.EnvironmentSpec()
+    for field in attr.fields(synthetic.EnvironmentSpec):
+        parser.add_argument('--' + field.name.replace('_', '-'), type=type(field.default),
+                            default=getattr(spec_defaults, field.name))
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    parser.add_argument('--root', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(BENCHMARKS[args.worker](args.root))
+        return
+
+    if args.pyperf:
+        try:
+            import pyperf  # noqa: F401
+        except ImportError:
+            parser.error('--pyperf requires pyperf (pip install pyperf)')
+    spec = synthetic.EnvironmentSpec(**{field.name: getattr(args, field.name)
+                                        for field in attr.fields(synthetic.EnvironmentSpec)})
+    names = [name for name in BENCHMARKS
+             if not args.only or any(fnmatch.fnmatch(name, pattern) for pattern in args.only)]
+
+    root = tempfile.mkdtemp(prefix='django-develop-bench-')
+    try:
+        print('Generating environment in {}...'.format(root))
+        prepare(root, spec)
+        results = OrderedDict([('version', _results_version), ('metadata', _metadata(spec)),
+                               ('benchmarks', OrderedDict())])
+        print('Mean of {} runs:'.format(args.runs))
+        for name in names:
+            result = _summary([run_once(name, root) for _ in range(args.runs)])
+            results['benchmarks'][name] = result
+            print('  {:<44} {:>9.1f} ms +- {:.1f}'.format(
+                name, result['mean'] * 1000, result['stdev'] * 1000))
+    finally:
+        shutil.rmtree(root)
+
+    if args.output:
+        with io.open(args.output, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(results, indent=2))
+    if args.pyperf:
+        write_pyperf(args.pyperf, results)
+    if args.compare:
+        with io.open(args.compare, encoding='utf-8') as f:
+            print_comparison(results, json.load(f))
+
+
+if __name__ == '__main__':
+    main()
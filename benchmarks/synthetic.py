@@ -0,0 +1,116 @@
+"""
+Generate synthetic Python environments for benchmarking django-develop's discovery and startup.
+
+An environment is a directory of ``sys.path`` entries:
+
+* ``packages-N``: many small top-level packages, some with a settings module;
+* ``deep``: a deep package tree, with a settings module at every level;
+* ``slow``: settings modules that take a while to import;
+* ``project``: a ``bench_project.settings`` module with many names, for activation and startup.
+"""
+from __future__ import print_function, unicode_literals
+
+import io
+import os
+from textwrap import dedent
+
+from attr import attributes, attr
+
+
+@attributes
+class EnvironmentSpec(object):
+    """
+    The shape of a synthetic environment.
+    """
+
+    packages = attr(default=2000)  # type: int
+    path_entries = attr(default=4)  # type: int
+    # Every Nth package gets a settings module.
+    settings_every = attr(default=20)  # type: int
+    depth = attr(default=12)  # type: int
+    breadth = attr(default=3)  # type: int
+    settings_names = attr(default=2000)  # type: int
+    slow_modules = attr(default=5)  # type: int
+    slow_import_seconds = attr(default=0.05)  # type: float
+
+
+_small_settings = dedent("""\
+    SECRET_KEY = 'synthetic'
+    DEBUG = False
+    INSTALLED_APPS = []
+    """)
+
+
+def _write(path, text=''):
+    directory = os.path.dirname(path)
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    with io.open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+
+
+def project_settings_source(names):
+    """
+    Source for a settings module with `names` extra settings, besides a working Django setup.
+    """
+    lines = [
+        'import os',
+        '',
+        "SECRET_KEY = 'synthetic'",
+        "INSTALLED_APPS = ['django.contrib.contenttypes', 'django.contrib.auth']",
+        "ROOT_URLCONF = 'django_develop.dev_urls'",
+        'LOGGING = {',
+        "    'version': 1,",
+        "    'loggers': {'logger_%d' % i: {'level': 'INFO'} for i in range(500)},",
+        '}',
+    ]
+    for i in range(names):
+        lines.append("SETTING_{0} = {{'value': {0}, 'path': os.path.join('a', '{0}')}}".format(i))
+    return '\n'.join(lines) + '\n'
+
+
+def make_environment(root, spec):
+    """
+    Write a synthetic environment under `root`.
+
+    :type spec: EnvironmentSpec
+    :return: List of the ``sys.path`` entries to use.
+    """
+    entries = [os.path.join(root, 'packages-{}'.format(i)) for i in range(spec.path_entries)]
+    for i in range(spec.packages):
+        package = os.path.join(entries[i % len(entries)], 'synthetic_pkg_{}'.format(i))
+        _write(os.path.join(package, '__init__.py'))
+        _write(os.path.join(package, 'models.py'), 'VALUE = {}\n'.format(i))
+        _write(os.path.join(package, 'utils', '__init__.py'))
+        _write(os.path.join(package, 'utils', 'helpers.py'), 'def helper():\n    pass\n')
+        if i % spec.settings_every == 0:
+            _write(os.path.join(package, 'settings.py'), _small_settings)
+
+    deep = os.path.join(root, 'deep')
+    entries.append(deep)
+    directory = os.path.join(deep, 'synthetic_deep')
+    for level in range(spec.depth):
+        _write(os.path.join(directory, '__init__.py'))
+        _write(os.path.join(directory, 'settings.py'), _small_settings)
+        for sibling in range(1, spec.breadth):
+            _write(os.path.join(directory, 'branch_{}'.format(sibling), '__init__.py'))
+            _write(os.path.join(directory, 'branch_{}'.format(sibling), 'views.py'))
+        directory = os.path.join(directory, 'level_{}'.format(level))
+
+    slow = os.path.join(root, 'slow')
+    entries.append(slow)
+    for i in range(spec.slow_modules):
+        _write(os.path.join(slow, 'synthetic_slow_{}'.format(i), '__init__.py'))
+        _write(os.path.join(slow, 'synthetic_slow_{}'.format(i), 'settings.py'), dedent("""\
+            import time
+            time.sleep({})
+            SECRET_KEY = 'synthetic'
+            INSTALLED_APPS = []
+            """.format(spec.slow_import_seconds)))
+
+    project = os.path.join(root, 'project')
+    entries.append(project)
+    _write(os.path.join(project, 'bench_project', '__init__.py'))
+    _write(os.path.join(project, 'bench_project', 'settings.py'),
+           project_settings_source(spec.settings_names))
+    return entries
@@ -1,5 +1,4 @@
 # coding: utf-8
-import sys
 from setuptools import setup, find_packages
 
 
@@ -8,12 +7,6 @@ def README():
         return f.read()
 
 
-# Backward-compatibility dependencies for Python 2
-_python2_requires = [
-    'configparser',
-    'pathlib',
-] if sys.version_info < (3,) else []
-
 setup(
     name='django-develop',
     description='Django development for humans',
@@ -29,17 +22,23 @@ setup(
     setup_requires=['setuptools_scm'],
     use_scm_version=True,
 
+    # Django 2.2 supports Python 3.5 and later.
+    python_requires='>=3.5',
+
     install_requires=[
         # attrs 15.2.0 (2015-12-08) adds the convert feature.
         'attrs >=15.2.0',
-        'Django',
-    ] + _python2_requires,
+        # Django 2.0 adds connection execute wrappers and DatabaseWrapper.creation_class,
+        # and Django 2.2 the autoreloader classes.
+        'Django >=2.2',
+    ],
 
     # The django-develop command-line script
     entry_points={
         'console_scripts': [
             'django-develop = django_develop.cli:main',
             'django-develop-config = django_develop.cli:main_config',
+            'django-develop-client = django_develop.command_server:client_main',
         ],
     },
 
@@ -49,8 +48,8 @@ setup(
         'Framework :: Django',
         'Intended Audience :: Developers',
         'License :: Public Domain',
-        'Programming Language :: Python :: 2',
         'Programming Language :: Python :: 3',
+        'Programming Language :: Python :: 3 :: Only',
         'Topic :: Internet :: WWW/HTTP',
         'Topic :: Utilities',
     ],
@@ -0,0 +1,164 @@
+"""
+A Django cache backend that stores entries in an SQLite database file.
+
+Unlike Django's in-process caches, the entries are shared between processes, and survive
+runserver's autoreload restarts. Unlike Django's file-based cache, the total size of the entries
+is bounded: when it exceeds ``MAX_SIZE`` bytes, the least recently used entries are evicted.
+
+Usage::
+
+    CACHES = {
+        'default': {
+            'BACKEND': 'django_develop.cache.backends.sqlite.SQLiteCache',
+            'LOCATION': '/path/to/cache.sqlite3',
+            'OPTIONS': {'MAX_SIZE': 256 * 1024 * 1024},
+        },
+    }
+"""
+from __future__ import unicode_literals
+
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import BaseCache, DEFAULT_TIMEOUT
+
+
+DEFAULT_MAX_SIZE = 256 * 1024 * 1024
+
+# Check the total size after this many writes.
+_cull_interval = 64
+
+# Evict down to this fraction of MAX_SIZE, to avoid culling on every check.
+_cull_target = 0.9
+
+
+class SQLiteCache(BaseCache):
+
+    def __init__(self, location, params):
+        super(SQLiteCache, self).__init__(params)
+        self._path = location
+        self._max_size = int(params.get('OPTIONS', {}).get('MAX_SIZE', DEFAULT_MAX_SIZE))
+        self._local = threading.local()
+        self._writes = 0
+
+    def _connection(self):
+        # Connections can't be shared between threads, or inherited across forks.
+        if getattr(self._local, 'pid', None) != os.getpid():
+            directory = os.path.dirname(self._path)
+            if directory and not os.path.isdir(directory):
+                os.makedirs(directory)
+            conn = sqlite3.connect(self._path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode = WAL')
+            conn.execute('PRAGMA synchronous = NORMAL')
+            conn.execute('CREATE TABLE IF NOT EXISTS cache ('
+                         'key TEXT PRIMARY KEY, value BLOB, expires REAL, accessed REAL, '
+                         'size INTEGER)')
+            conn.execute('CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)')
+            (self._local.pid, self._local.conn) = (os.getpid(), conn)
+        return self._local.conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        else:
+            conn.execute('COMMIT')
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _expires(self, timeout):
+        expires = self.get_backend_timeout(timeout)
+        return float('inf') if expires is None else expires
+
+    def _wrote(self):
+        self._writes += 1
+        if self._writes % _cull_interval == 0:
+            self.cull()
+
+    def _store(self, verb, key, value, timeout):
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        now = time.time()
+        with self._transaction() as conn:
+            if verb == 'INSERT OR IGNORE':
+                conn.execute('DELETE FROM cache WHERE key = ? AND expires <= ?', (key, now))
+            cursor = conn.execute(
+                '{} INTO cache (key, value, expires, accessed, size) VALUES (?, ?, ?, ?, ?)'
+                .format(verb),
+                (key, sqlite3.Binary(data), self._expires(timeout), now, len(data)))
+        self._wrote()
+        return cursor.rowcount == 1
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._store('INSERT OR IGNORE', self._key(key, version), value, timeout)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._store('INSERT OR REPLACE', self._key(key, version), value, timeout)
+
+    def get(self, key, default=None, version=None):
+        key = self._key(key, version)
+        conn = self._connection()
+        now = time.time()
+        row = conn.execute('SELECT value, expires FROM cache WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return default
+        (data, expires) = row
+        if expires <= now:
+            conn.execute('DELETE FROM cache WHERE key = ? AND expires <= ?', (key, now))
+            return default
+        conn.execute('UPDATE cache SET accessed = ? WHERE key = ?', (now, key))
+        return pickle.loads(bytes(data))
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        cursor = self._connection().execute(
+            'UPDATE cache SET expires = ?, accessed = ? WHERE key = ? AND expires > ?',
+            (self._expires(timeout), time.time(), key, time.time()))
+        return cursor.rowcount == 1
+
+    def delete(self, key, version=None):
+        key = self._key(key, version)
+        cursor = self._connection().execute('DELETE FROM cache WHERE key = ?', (key,))
+        return cursor.rowcount == 1
+
+    def has_key(self, key, version=None):
+        key = self._key(key, version)
+        row = self._connection().execute(
+            'SELECT 1 FROM cache WHERE key = ? AND expires > ?', (key, time.time())).fetchone()
+        return row is not None
+
+    def clear(self):
+        self._connection().execute('DELETE FROM cache')
+
+    def cull(self):
+        """
+        Remove expired entries, and evict the least recently used ones beyond ``MAX_SIZE``.
+        """
+        with self._transaction() as conn:
+            conn.execute('DELETE FROM cache WHERE expires <= ?', (time.time(),))
+            (total,) = conn.execute('SELECT COALESCE(SUM(size), 0) FROM cache').fetchone()
+            if total <= self._max_size:
+                return
+            target = total - self._max_size * _cull_target
+            evicted = []
+            for (key, size) in conn.execute('SELECT key, size FROM cache ORDER BY accessed'):
+                if target <= 0:
+                    break
+                evicted.append((key,))
+                target -= size
+            conn.executemany('DELETE FROM cache WHERE key = ?', evicted)
+
+    def close(self, **kwargs):
+        # Keep the connection: it's cheap to hold, and expensive to reopen per request.
+        pass
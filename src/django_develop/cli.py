@@ -1,17 +1,19 @@
 from __future__ import print_function, unicode_literals
 
+import argparse
 import importlib
 import os
 import sys
 from pathlib import Path
 
 from attr import attributes, attr
-from django.conf import settings, ENVIRONMENT_VARIABLE
-from django.core.management import ManagementUtility
 
 from configparser import RawConfigParser
 
-from django_develop import utils
+# Keep these imports light: the other modules, and Django, are imported when needed, so that
+# the early exits (and autocompletion from the cache) don't pay for them.
+# tests/test_cli.py checks this.
+from django_develop import completion, instances, profiling, utils
 
 
 @attributes
@@ -19,10 +21,26 @@ class DjangoDevelop(object):
 
     instance_path = attr(convert=Path)  # type: Path
 
+    # After activate_dev_settings(): the settings_snapshot.environ_fingerprint() of the
+    # environment variables that the base settings module read.
+    settings_environ = attr(default=None, init=False, cmp=False, repr=False)  # type: dict
+
     @property
     def _config_path(self):
         return self.instance_path / 'django-develop.ini'
 
+    @property
+    def _settings_snapshot_path(self):
+        return self.instance_path / 'dev-settings.pickle'
+
+    @property
+    def _startup_profile_path(self):
+        return self.instance_path / 'startup-profile.json'
+
+    @property
+    def _candidate_index_path(self):
+        return self.instance_path / 'candidate-index.json'
+
     def read_config(self):
         config = RawConfigParser()
         config.read([str(self._config_path)])
@@ -48,19 +66,26 @@ class DjangoDevelop(object):
 
         self.write_config(config)
 
-    def activate_dev_settings(self):
-        """
-        Prepare `django_develop.dev_settings`, and point DJANGO_SETTINGS_MODULE at it.
+    def _resolve_dev_settings(self, config, profiler):
         """
-        assert not settings.configured, 'Django settings already configured!'
+        Import the base settings module, and layer django-develop's defaults under its settings.
 
-        from django_develop import dev_settings
+        :return:
+            (list of settings layers in decreasing order of precedence,
+            source file fingerprint of the imported modules,
+            fingerprint of the environment variables they read)
+        """
+        from django_develop import database_modes, dev_mailbox, overrides, settings_snapshot
+        from django_develop import sqlite, test_databases
 
         # Import the base settings module
-        config = self.read_config()
         base_settings_module = config.get('django-develop', 'base_settings_module')
+        modules_before = set(sys.modules)
         try:
-            base_mod = importlib.import_module(base_settings_module)
+            with profiler.phase('base settings import'), \
+                    profiler.trace_imports(base_settings_module), \
+                    settings_snapshot.recording_environ() as environ_read:
+                base_mod = importlib.import_module(base_settings_module)
         except ImportError:
             print('Failed to import Django settings module {!r}. Try django-develop-config?'
                   .format(base_settings_module),
@@ -68,11 +93,15 @@ class DjangoDevelop(object):
             print('', file=sys.stderr)
             # Re-raise the error so that the user can see and diagnose the traceback.
             raise
+        imported_modules = [sys.modules[name] for name in set(sys.modules) - modules_before
+                            if sys.modules[name] is not None]
+        source_files = settings_snapshot.source_files(imported_modules + [base_mod])
+        environ = environ_read()
 
-        for name in dir(base_mod):
-            if name.isupper():
-                value = getattr(base_mod, name)
-                setattr(dev_settings, name, value)
+        # The base module's settings are read through, not copied.
+        # Names in `hidden` are left to the defaults.
+        base = overrides.ModuleLayer(base_mod)
+        hidden = set()
 
         # Special-case handling: If any of these core settings are explicitly
         # set to an empty value in the base settings module, unset them here
@@ -89,8 +118,8 @@ class DjangoDevelop(object):
             'MEDIA_ROOT',
         ]
         for name in empty_specials_in_global_settings:
-            if hasattr(dev_settings, name) and not getattr(dev_settings, name):
-                delattr(dev_settings, name)
+            if name in base and not base[name]:
+                hidden.add(name)
 
         # Similar to the above, if all the email settings are explicitly set
         # and equal to Django's global default values, then clear them.
@@ -107,10 +136,9 @@ class DjangoDevelop(object):
             'EMAIL_SSL_KEYFILE': None,
             'EMAIL_TIMEOUT': None,
         }
-        if all(hasattr(dev_settings, name) and getattr(dev_settings, name) == value
+        if all(name in base and base[name] == value
                for (name, value) in email_defaults_in_global_settings.items()):
-            for name in email_defaults_in_global_settings.keys():
-                delattr(dev_settings, name)
+            hidden.update(email_defaults_in_global_settings.keys())
 
         # Add django-development defaults
         defaults = {
@@ -119,24 +147,94 @@ class DjangoDevelop(object):
             'ROOT_URLCONF': 'django_develop.dev_urls',
             'DATABASES': {
                 'default': {
-                    'ENGINE': 'django.db.backends.sqlite3',
-                    'NAME': str(self.instance_path / 'db.sqlite3'),
+                    'ENGINE': 'django_develop.db.backends.sqlite3',
+                    'NAME': database_modes.database_name(
+                        self.instance_path, database_modes.mode_from_config(config)),
                     'ATOMIC_REQUESTS': True,
+                    'OPTIONS': {
+                        'pragmas': sqlite.pragmas_from_config(config),
+                    },
+                    'TEST': test_databases.dev_test_settings(self.instance_path, config),
                 },
             },
             # Generally useful for development
-            'EMAIL_BACKEND': 'django.core.mail.backends.console.EmailBackend',
             'STATIC_ROOT': str(self.instance_path / 'static_files'),
             'MEDIA_ROOT': str(self.instance_path / 'media_files'),
         }
-        for (name, value) in defaults.items():
-            if not hasattr(dev_settings, name):
-                setattr(dev_settings, name, value)
+        # Keep sent email in the instance mailbox.
+        defaults.update(dev_mailbox.email_settings(self.instance_path, config))
+
+        # Enable DEBUG by default.
+        # This overrides any "DEBUG = False" that the base settings module may have imported;
+        # use the [overrides] section of the config to change it.
+        forced = {'DEBUG': True}
+
+        layers = [forced, overrides.ModuleLayer(base_mod, hidden), defaults]
+        return (layers, source_files, environ)
+
+    def activate_dev_settings(self, profiler=None):
+        """
+        Prepare `django_develop.dev_settings`, and point DJANGO_SETTINGS_MODULE at it.
 
-        # For now, always enable DEBUG.
-        # This overrides any "DEBUG = False" that the base settings module may have imported.
-        # TODO: Provide a convenient way to toggle this? (Would that really be useful?)
-        dev_settings.DEBUG = True
+        The settings are a layered view, in decreasing order of precedence: the request
+        profiling and instrumentation (see `django_develop.request_profiling` and
+        `django_develop.instrumentation`), the dev caches,
+        the config's override layers (see `django_develop.overrides`), the base settings module,
+        and django-develop's defaults.
+
+        If ``snapshot_settings`` is enabled in the config, the resolved settings are saved in the
+        instance directory, and loaded from there while their inputs remain unchanged.
+
+        :param profiler: Optional `django_develop.profiling.StartupProfiler`
+        """
+        from django.conf import settings, ENVIRONMENT_VARIABLE
+        assert not settings.configured, 'Django settings already configured!'
+
+        if profiler is None:
+            profiler = profiling.NullProfiler()
+
+        from django_develop import dev_caches, dev_settings, instrumentation, overrides
+        from django_develop import request_profiling, settings_snapshot
+
+        config = self.read_config()
+        use_snapshot = config.getboolean('django-develop', 'snapshot_settings', fallback=False)
+
+        layers = None
+        if use_snapshot:
+            snapshot_key = settings_snapshot.snapshot_key(self.instance_path, config)
+            with profiler.phase('settings snapshot load'):
+                snapshot = settings_snapshot.load(self._settings_snapshot_path, snapshot_key)
+            if snapshot is not None:
+                (settings_dict, self.settings_environ) = snapshot
+                layers = [settings_dict]
+
+        if layers is None:
+            (layers, source_files, self.settings_environ) = self._resolve_dev_settings(
+                config, profiler)
+            if use_snapshot:
+                try:
+                    settings_snapshot.save(self._settings_snapshot_path, snapshot_key,
+                                           overrides.merge(layers), source_files,
+                                           self.settings_environ)
+                except Exception as e:
+                    print('django-develop warning: cannot snapshot settings ({}: {})'.format(
+                        type(e).__name__, e), file=sys.stderr)
+
+        # The config's override layers take precedence over the resolved settings.
+        layers = overrides.layers_from_config(config) + layers
+
+        # Not part of the snapshot: these depend on which cache servers are currently running,
+        # and on the current MIDDLEWARE.
+        layers.insert(0, dev_caches.dev_cache_settings(self.instance_path, config, layers))
+        layers.insert(0, instrumentation.instrumentation_settings(self.instance_path, config,
+                                                                  layers))
+        profiling_layer = request_profiling.profiling_settings(self.instance_path, config, layers)
+        layers.insert(0, profiling_layer)
+        if profiling_layer:
+            # While this is the main thread: runserver serves requests from other threads.
+            request_profiling.install_sampler(profiling_layer[request_profiling.SETTING_NAME])
+
+        dev_settings.set_layers(layers)
 
         # Set DJANGO_SETTINGS_MODULE
         if (ENVIRONMENT_VARIABLE in os.environ and
@@ -158,29 +256,189 @@ def _fail(*lines):
 
 def _get_DjangoDevelop():
     virtualenv_path = Path(sys.prefix)
-    return DjangoDevelop(virtualenv_path / 'django-develop-instance')
+    try:
+        return DjangoDevelop(instances.instance_path(
+            virtualenv_path, instances.current_name(virtualenv_path)))
+    except ValueError as e:
+        _fail(str(e))
+
+
+def _mail(dd, args):
+    from django_develop import dev_mailbox
+    try:
+        dev_mailbox.main_mail(dd, args)
+    except ValueError as e:
+        _fail(str(e))
+
+
+def _perf_report(dd, args):
+    from django_develop import instrumentation
+    instrumentation.main_perf_report(dd, args)
+
+
+def _serve_commands(dd, args):
+    from django_develop import command_server
+    command_server.serve(dd)
+
+
+def _db_snapshot(dd, args):
+    from django_develop import snapshots
+    try:
+        snapshots.main_snapshot(dd, args)
+    except snapshots.SnapshotError as e:
+        _fail(str(e))
+
+
+def _db_restore(dd, args):
+    from django_develop import snapshots
+    try:
+        snapshots.main_restore(dd, args)
+    except snapshots.SnapshotError as e:
+        _fail(str(e))
+
+
+# django-develop's own subcommands, which are handled before handing over to Django.
+# Names with hyphens can't clash with Django management commands (which are module names);
+# the others yield to a management command of the same name (see `run_command()`).
+_commands = {
+    'db-restore': _db_restore,
+    'db-snapshot': _db_snapshot,
+    'mail': _mail,
+    'perf-report': _perf_report,
+    'serve-commands': _serve_commands,
+}
+
+
+def _management_utility(profiler, argv=None):
+    """
+    :rtype: django.core.management.ManagementUtility
+    """
+    with profiler.phase('ManagementUtility'):
+        from django.core.management import ManagementUtility
+        return ManagementUtility(argv)
+
+
+def run_command(dd, argv, profiler, activate=True):
+    """
+    Run a django-develop subcommand, or set up and hand over to Django.
+
+    This is the dispatch of `main()` after the global flags have been removed from `argv`,
+    which `django_develop.command_server` shares.
+
+    :param activate: False if the dev settings are already active.
+    """
+    try:
+        _run_command(dd, argv, profiler, activate)
+    finally:
+        profiler.report(dd._startup_profile_path)
+
+
+def _run_command(dd, argv, profiler, activate):
+    from django_develop import database_modes
+    if not (argv[1:2] and '-' in argv[1] and argv[1] in _commands):
+        config = dd.read_config()
+        try:
+            database_modes.check_config(dd.instance_path, config)
+            if argv[1:2] == ['collectstatic']:
+                from django_develop import static_files
+                static_files.check_config(config)
+        except ValueError as e:
+            _fail(str(e))
+
+    if argv[1:2] and argv[1] in _commands:
+        if '-' in argv[1]:
+            with profiler.phase(argv[1]):
+                _commands[argv[1]](dd, argv[2:])
+            return
+        # A project's management command of the same name takes precedence: finding out
+        # requires setting up Django.
+        if activate:
+            with profiler.phase('activate_dev_settings'):
+                dd.activate_dev_settings(profiler=profiler)
+            activate = False
+        import django
+        from django.core.management import get_commands
+        with profiler.phase('django.setup()'):
+            django.setup()
+        if argv[1] not in get_commands():
+            with profiler.phase(argv[1]):
+                _commands[argv[1]](dd, argv[2:])
+            return
+
+    if activate:
+        with profiler.phase('activate_dev_settings'):
+            dd.activate_dev_settings(profiler=profiler)
+
+    utility = _management_utility(profiler, argv)
+    with database_modes.activated(dd, argv):
+        if argv[1:2] == ['migrate']:
+            from django_develop import migration_templates
+            migration_templates.migrate(dd, argv[2:], lambda: profiler.execute(utility))
+        elif argv[1:2] == ['collectstatic']:
+            from django_develop import static_files
+            static_files.collectstatic(dd, argv[2:], lambda: profiler.execute(utility))
+        elif argv[1:2] == ['runserver']:
+            from django_develop import reloader
+            reloader.install(dd)
+            profiler.execute(utility)
+        else:
+            profiler.execute(utility)
 
 
 def main():
     """
     django-develop CLI entry point.
     """
-    # XXX: Bail out early if being invoked for autocompletion.
-    utility = ManagementUtility()
-    utility.autocomplete()
+    instances.pop_instance_flag(sys.argv)
+
+    # Answer autocompletion requests from the cache without importing Django, if possible.
+    if utils.is_inside_virtual_env():
+        dd = _get_DjangoDevelop()
+        if dd.instance_path.exists():
+            completion.autocomplete(dd.instance_path)
+
+    if profiling.pop_profile_startup_flag(sys.argv):
+        profiler = profiling.StartupProfiler()
+    else:
+        profiler = profiling.NullProfiler()
+
+    from django_develop import database_modes
+    database_modes.pop_db_mode_flag(sys.argv)
+
+    # Django's own autocompletion exits here, so the ManagementUtility is only made this early
+    # when invoked for autocompletion. Otherwise, the exits below don't import Django.
+    if 'DJANGO_AUTO_COMPLETE' in os.environ:
+        _management_utility(profiler).autocomplete()
 
     if not utils.is_inside_virtual_env():
         _fail('Run django-develop inside a virtualenv')
 
+    if sys.argv[1:2] == ['use-instance']:
+        try:
+            instances.main_use_instance(sys.argv[2:])
+        except ValueError as e:
+            _fail(str(e))
+        return
+
     dd = _get_DjangoDevelop()
 
     if not dd.instance_path.exists():
         _fail('django-develop not configured, try "django-develop-config"')
-    else:
-        # Set up and hand over to Django
-        dd.activate_dev_settings()
+    run_command(dd, sys.argv, profiler)
 
-        utility.execute()
+
+def _config_argument_parser():
+    parser = argparse.ArgumentParser(
+        prog='django-develop-config',
+        description='Configure the base settings module for django-develop.',
+    )
+    parser.add_argument('base_settings_module', nargs='?',
+                        help='If omitted, show the current configuration and candidate modules.')
+    parser.add_argument('--rebuild', action='store_true',
+                        help='Ignore and rebuild the candidate settings module index.')
+    parser.add_argument('--instance', metavar='NAME',
+                        help='Configure this named instance (default: the current instance).')
+    return parser
 
 
 def main_config():
@@ -190,17 +448,24 @@ def main_config():
     if not utils.is_inside_virtual_env():
         _fail('Run django-develop-config inside a virtualenv')
 
+    parser = _config_argument_parser()
+    args = parser.parse_args(sys.argv[1:])
+    if args.instance is not None:
+        os.environ[instances.ENVIRONMENT_VARIABLE] = args.instance
     dd = _get_DjangoDevelop()  # type: DjangoDevelop
-    try:
-        [base_settings_module] = sys.argv[1:2]
-    except ValueError:
-        print('Usage: django-develop-config <base_settings_module>')
+    base_settings_module = args.base_settings_module
+    if base_settings_module is None:
+        parser.print_usage()
         print()
 
         # Show current configuration
+        index = None
         if dd.instance_path.exists():
             print('Instance directory: {}'.format(dd.instance_path))
             print()
+            from django_develop.index import CandidateIndex
+            index = (CandidateIndex(dd._candidate_index_path) if args.rebuild else
+                     CandidateIndex.load(dd._candidate_index_path))
         config = dd.read_config()
         base_settings_module = config.get('django-develop', 'base_settings_module', fallback=None)
         print('Current base settings module: {}'.format(
@@ -209,8 +474,11 @@ def main_config():
         print()
 
         # TODO: Add CLI flag for include_problems?
-        utils.print_candidate_settings()
+        utils.print_candidate_settings(index=index, rules=utils.DiscoveryRules.from_config(config))
 
         raise SystemExit(2)
     else:
         dd.init_instance(base_settings_module)
+        if args.instance is not None:
+            print('Use it with "django-develop --instance={0} ...", or switch to it with '
+                  '"django-develop use-instance {0}"'.format(args.instance))
@@ -0,0 +1,319 @@
+"""
+A warm management command server for django-develop.
+
+``django-develop serve-commands`` activates the dev settings and sets up Django's app registry
+once, then listens on a Unix socket in the instance directory. For each request, it forks a
+pre-warmed child process that runs the requested management command.
+
+The ``django-develop-client`` entry point forwards its arguments, environment, working directory
+and standard streams (as file descriptors) to the server, and exits with the command's exit code.
+The child handles the arguments like ``django-develop`` does, including the global flags and
+django-develop's own subcommands.
+
+The client runs the command itself, like ``django-develop``, if no server is running, or if the
+server's settings can't serve it: when the instance, config, `sys.path`, ``DJANGO_*``
+environment variables (including the ``--db-mode`` and ``--instance`` flags), or the environment
+variables that the base settings module read differ from those the server resolved its settings
+with (see `django_develop.settings_snapshot`), or for commands that need a fresh process
+(see `_client_commands`). The server logs the reason for each such fallback.
+
+This requires a platform with Unix sockets and `os.fork()` (and Python 3).
+"""
+from __future__ import print_function, unicode_literals
+
+import array
+import errno
+import json
+import os
+import signal
+import socket
+import sys
+import traceback
+
+
+SOCKET_NAME = 'command-server.sock'
+
+# The file descriptors forwarded by the client: stdin, stdout, stderr.
+_forwarded_fds = [0, 1, 2]
+
+# Commands that the client runs itself: runserver's autoreloader restarts it in fresh processes,
+# and the others don't need Django at all.
+_client_commands = {'runserver', 'serve-commands', 'use-instance'}
+
+
+def is_supported():
+    return (hasattr(socket, 'AF_UNIX') and hasattr(os, 'fork') and
+            hasattr(socket.socket, 'sendmsg'))
+
+
+def socket_path(instance_path):
+    return os.path.join(str(instance_path), SOCKET_NAME)
+
+
+def _send_fds(sock, fds):
+    sock.sendmsg([b'F'], [(socket.SOL_SOCKET, socket.SCM_RIGHTS, array.array('i', fds))])
+
+
+def _recv_fds(sock, max_fds):
+    fds = array.array('i')
+    (_, ancdata, _, _) = sock.recvmsg(1, socket.CMSG_LEN(max_fds * fds.itemsize))
+    for (level, type_, data) in ancdata:
+        if level == socket.SOL_SOCKET and type_ == socket.SCM_RIGHTS:
+            fds.frombytes(data[:len(data) - (len(data) % fds.itemsize)])
+    return list(fds)
+
+
+def _send_json(sock, value):
+    sock.sendall(json.dumps(value).encode('utf-8') + b'\n')
+
+
+def _read_json(f):
+    line = f.readline()
+    if not line:
+        raise EOFError('connection closed')
+    return json.loads(line.decode('utf-8'))
+
+
+def _exit_code(e):
+    """
+    Convert a SystemExit's code to a process exit code, like the interpreter does.
+    """
+    if e.code is None:
+        return 0
+    elif isinstance(e.code, int):
+        return e.code
+    print(e.code, file=sys.stderr)
+    return 1
+
+
+def _settings_key(dd):
+    """
+    Fingerprint the inputs of the settings that `dd` would resolve in this environment and
+    `sys.path`, other than the variables that the base settings module read.
+    """
+    from django_develop import settings_snapshot
+    return settings_snapshot.snapshot_key(dd.instance_path, dd.read_config())
+
+
+def _fallback_reason(dd, argv, settings_key):
+    """
+    :return: Why the client should run the command in `argv` itself, or None.
+    """
+    from django_develop import profiling, settings_snapshot
+
+    if profiling.pop_profile_startup_flag(argv):
+        return 'startup profiling measures a cold start'
+    elif argv[1:2] and argv[1] in _client_commands:
+        return '{} runs in the client'.format(argv[1])
+    elif _settings_key(dd) != settings_key:
+        return "the instance, config, sys.path or DJANGO_* variables differ from the server's"
+    elif not settings_snapshot.environ_is_current(dd.settings_environ):
+        return "environment variables that the settings read differ from the server's"
+    return None
+
+
+def _handle_request(conn, dd, settings_key):
+    """
+    Run one request's command. This runs in a forked child of the server.
+
+    The client connects to the socket in its current instance's directory, so the instance is
+    the server's, unless selected in the forwarded environment (which `settings_key` checks).
+
+    :param settings_key: `_settings_key()` of the server's settings
+    :return: The exit code, or None if the client should run the command itself.
+    """
+    from django_develop import cli, database_modes, instances, profiling
+
+    fds = _recv_fds(conn, len(_forwarded_fds))
+    request = _read_json(conn.makefile('rb'))
+
+    os.chdir(request['cwd'])
+    environ = dict(request['env'], DJANGO_SETTINGS_MODULE=os.environ['DJANGO_SETTINGS_MODULE'])
+    os.environ.clear()
+    os.environ.update(environ)
+    sys.path[:] = request['path']
+    sys.argv = request['argv']
+
+    # Handle the global flags like cli.main() does, before checking the settings inputs.
+    instances.pop_instance_flag(sys.argv)
+    database_modes.pop_db_mode_flag(sys.argv)
+    reason = _fallback_reason(dd, sys.argv, settings_key)
+    if reason is not None:
+        for fd in fds:
+            os.close(fd)
+        print('Leaving {!r} to the client: {}'.format(' '.join(sys.argv[1:]), reason))
+        sys.stdout.flush()
+        _send_json(conn, {'fallback': reason})
+        return None
+
+    # Take over the client's standard streams.
+    for stream in [sys.stdout, sys.stderr]:
+        stream.flush()
+    for (target_fd, fd) in zip(_forwarded_fds, fds):
+        os.dup2(fd, target_fd)
+        os.close(fd)
+
+    _send_json(conn, {'pid': os.getpid()})
+
+    try:
+        cli.run_command(dd, sys.argv, profiling.NullProfiler(), activate=False)
+        code = 0
+    except SystemExit as e:
+        code = _exit_code(e)
+    except BaseException:
+        traceback.print_exc()
+        code = 1
+    finally:
+        for stream in [sys.stdout, sys.stderr]:
+            stream.flush()
+    return code
+
+
+def _reap_children(signum=None, frame=None):
+    while True:
+        try:
+            (pid, _) = os.waitpid(-1, os.WNOHANG)
+        except OSError:  # No more children
+            return
+        if pid == 0:
+            return
+
+
+def _warm_up():
+    """
+    Import the management commands, so that the children don't have to.
+    """
+    from django.core.management import get_commands, load_command_class
+    for (name, app_name) in get_commands().items():
+        try:
+            load_command_class(app_name, name)
+        except Exception:
+            pass
+
+
+def _bind(path):
+    """
+    Bind the server socket at `path`, replacing a stale socket file.
+    """
+    if os.path.exists(path):
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(path)
+        except socket.error:
+            os.remove(path)
+        else:
+            raise SystemExit('django-develop: a command server is already running at {}'
+                             .format(path))
+        finally:
+            probe.close()
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    old_umask = os.umask(0o077)
+    try:
+        sock.bind(path)
+    finally:
+        os.umask(old_umask)
+    sock.listen(16)
+    return sock
+
+
+def serve(dd):
+    """
+    Set up Django once, and serve management command requests until interrupted.
+
+    :type dd: django_develop.cli.DjangoDevelop
+    """
+    if not is_supported():
+        raise SystemExit('django-develop: serve-commands requires Unix sockets and os.fork()')
+
+    dd.activate_dev_settings()
+    settings_key = _settings_key(dd)
+    import django
+    django.setup()
+    _warm_up()
+
+    path = socket_path(dd.instance_path)
+    sock = _bind(path)
+    signal.signal(signal.SIGCHLD, _reap_children)
+    # Clean up the socket when terminated, too.
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    print('Serving django-develop commands at {} (press CTRL-C to stop)'.format(path))
+    sys.stdout.flush()
+    try:
+        while True:
+            (conn, _) = sock.accept()
+            pid = os.fork()
+            if pid == 0:
+                # Child
+                signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+                signal.signal(signal.SIGINT, signal.default_int_handler)
+                signal.signal(signal.SIGTERM, signal.SIG_DFL)
+                sock.close()
+                code = 1
+                try:
+                    code = _handle_request(conn, dd, settings_key)
+                    if code is not None:
+                        _send_json(conn, {'exit': code})
+                finally:
+                    os._exit(code or 0)
+            conn.close()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sock.close()
+        os.remove(path)
+
+
+def run_client(path, argv):
+    """
+    Forward a command to the server at `path`.
+
+    :return: The command's exit code, or None if no server is running, or if the server
+        leaves the command to the client.
+    """
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+    except socket.error as e:
+        sock.close()
+        if e.errno in (errno.ENOENT, errno.ECONNREFUSED):
+            return None
+        raise
+
+    with sock:
+        _send_fds(sock, _forwarded_fds)
+        _send_json(sock, {'argv': list(argv), 'env': dict(os.environ), 'cwd': os.getcwd(),
+                          'path': sys.path})
+        f = sock.makefile('rb')
+        reply = _read_json(f)
+        if 'fallback' in reply:
+            return None
+        pid = reply['pid']
+        while True:
+            try:
+                return _read_json(f)['exit']
+            except KeyboardInterrupt:
+                # Pass interrupts on to the command, and wait for it to exit.
+                os.kill(pid, signal.SIGINT)
+            except EOFError:
+                # The child died without reporting back.
+                return 1
+
+
+def client_main():
+    """
+    django-develop-client CLI entry point.
+    """
+    from django_develop import cli, instances
+
+    instances.pop_instance_flag(sys.argv)
+    code = None
+    if is_supported():
+        dd = cli._get_DjangoDevelop()
+        code = run_client(socket_path(dd.instance_path), ['django-develop'] + sys.argv[1:])
+    if code is None:
+        # No server: run the command here.
+        sys.argv[0] = 'django-develop'
+        cli.main()
+    else:
+        raise SystemExit(code)
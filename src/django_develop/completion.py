@@ -0,0 +1,229 @@
+"""
+Fast-path shell completion for django-develop.
+
+Django's bash completion (``DJANGO_AUTO_COMPLETE``) normally needs the management machinery,
+and for subcommand options, the command classes themselves.
+This caches the command names and their options in ``completion-cache.json`` in the instance
+directory, keyed by the base settings module and a fingerprint of the installed packages,
+so that completion requests can be answered without importing Django.
+
+A stale or missing cache is rebuilt in a background process (``python -m
+django_develop.completion <instance_path>``), while the current request falls back to Django.
+
+Note: this module must not import Django at module level.
+"""
+from __future__ import print_function, unicode_literals
+
+import io
+import json
+import os
+import subprocess
+import sys
+import sysconfig
+import time
+
+from configparser import RawConfigParser
+
+
+# Bump this to invalidate existing caches after format changes.
+_cache_version = 1
+
+# Don't start another background rebuild while one started less than this many seconds ago.
+_rebuild_interval = 60
+
+# Commands that Django completes with the installed app labels, too.
+_app_label_commands = {'dumpdata', 'sqlmigrate', 'sqlsequencereset', 'test'}
+
+
+def _cache_path(instance_path):
+    return os.path.join(str(instance_path), 'completion-cache.json')
+
+
+def _marker_path(instance_path):
+    return _cache_path(instance_path) + '.building'
+
+
+def cache_key(instance_path):
+    """
+    Key the cache by the base settings module, and the mtimes of the site-packages directories.
+
+    Installing, upgrading or removing a package (including editable installs) changes the
+    site-packages directory's mtime.
+
+    :rtype: list
+    """
+    config = RawConfigParser()
+    config.read([os.path.join(str(instance_path), 'django-develop.ini')])
+    base_settings_module = config.get('django-develop', 'base_settings_module', fallback=None)
+
+    paths = sysconfig.get_paths()
+    site_dirs = sorted({paths['purelib'], paths['platlib']})
+    stamps = []
+    for site_dir in site_dirs:
+        try:
+            stamps.append([site_dir, os.stat(site_dir).st_mtime])
+        except OSError:
+            stamps.append([site_dir, None])
+    return [base_settings_module, stamps]
+
+
+def load_cache(instance_path):
+    """
+    Load the completion cache, if it exists and is current.
+
+    :rtype: dict or None
+    """
+    try:
+        with io.open(_cache_path(instance_path), encoding='utf-8') as f:
+            cache = json.load(f)
+    except (IOError, OSError, ValueError):
+        return None
+    if not (isinstance(cache, dict) and
+            cache.get('version') == _cache_version and
+            cache.get('key') == cache_key(instance_path)):
+        return None
+    return cache
+
+
+def _parser_options(parser):
+    """
+    Return a command parser's [option, requires argument] pairs, like Django's autocomplete().
+    """
+    actions = getattr(parser, '_actions', None)
+    if actions is not None:
+        return [[min(action.option_strings), action.nargs != 0]
+                for action in actions if action.option_strings]
+    # Django 1.8-1.9: optparse-based commands
+    return [[min(option._long_opts + option._short_opts), bool(option.nargs)]
+            for option in getattr(parser, 'option_list', [])]
+
+
+def build_cache(dd):
+    """
+    Activate the dev settings and set up Django, then write the completion cache.
+
+    :type dd: django_develop.cli.DjangoDevelop
+    """
+    key = cache_key(dd.instance_path)
+
+    dd.activate_dev_settings()
+    import django
+    django.setup()
+    from django.apps import apps
+    from django.core.management import BaseCommand, get_commands, load_command_class
+
+    commands = {}
+    for (name, app_name) in get_commands().items():
+        try:
+            command = (app_name if isinstance(app_name, BaseCommand) else
+                       load_command_class(app_name, name))
+            commands[name] = sorted(_parser_options(command.create_parser('', name)))
+        except Exception:
+            # Completion doesn't need to know about broken commands.
+            commands[name] = []
+
+    cache = {
+        'version': _cache_version,
+        'key': key,
+        'commands': commands,
+        'app_labels': sorted(app_config.label for app_config in apps.get_app_configs()),
+    }
+    temp_path = '{}.tmp'.format(_cache_path(dd.instance_path))
+    with io.open(temp_path, 'w', encoding='utf-8') as f:
+        f.write(json.dumps(cache, sort_keys=True))
+    getattr(os, 'replace', os.rename)(temp_path, _cache_path(dd.instance_path))
+
+
+def rebuild_in_background(instance_path):
+    """
+    Start rebuilding the cache in a detached process, unless one was started recently.
+    """
+    marker_path = _marker_path(instance_path)
+    try:
+        if time.time() - os.stat(marker_path).st_mtime < _rebuild_interval:
+            return
+    except OSError:
+        pass
+    with io.open(marker_path, 'w', encoding='utf-8'):
+        pass
+
+    env = {k: v for (k, v) in os.environ.items()
+           if k not in ('DJANGO_AUTO_COMPLETE', 'COMP_WORDS', 'COMP_CWORD')}
+    kwargs = {'start_new_session': True} if sys.version_info >= (3, 2) else {}
+    with io.open(os.devnull, 'r+b') as devnull:
+        subprocess.Popen(
+            [sys.executable, '-m', 'django_develop.completion', str(instance_path)],
+            env=env, stdin=devnull, stdout=devnull, stderr=devnull, close_fds=True, **kwargs)
+
+
+def complete(cache, comp_words, comp_cword):
+    """
+    Return the completions for a request, following Django's `ManagementUtility.autocomplete()`.
+
+    :param comp_words: The COMP_WORDS value
+    :param comp_cword: The COMP_CWORD value
+    :rtype: list of str
+    """
+    cwords = comp_words.split()[1:]
+    cword = int(comp_cword)
+    try:
+        curr = cwords[cword - 1]
+    except IndexError:
+        curr = ''
+
+    commands = cache['commands']
+    subcommands = list(commands) + ['help']
+    if cword == 1:
+        return sorted(name for name in subcommands if name.startswith(curr))
+    elif cwords and cwords[0] in commands:
+        options = [('--help', False)]
+        if cwords[0] in _app_label_commands:
+            options.extend((label, False) for label in cache['app_labels'])
+        options.extend((option, requires_arg) for (option, requires_arg) in commands[cwords[0]])
+
+        # Filter out previously specified options, and by the current input.
+        prev_opts = {x.split('=')[0] for x in cwords[1:cword - 1]}
+        options = sorted((k, v) for (k, v) in options if k not in prev_opts and k.startswith(curr))
+        return [label + '=' if requires_arg else label for (label, requires_arg) in options]
+    return []
+
+
+def autocomplete(instance_path):
+    """
+    Answer a ``DJANGO_AUTO_COMPLETE`` request from the cache, if possible.
+
+    If the cache is missing or stale, start rebuilding it and return,
+    so that the caller can fall back to Django's own completion.
+
+    :raise SystemExit: if the request was answered.
+    """
+    if 'DJANGO_AUTO_COMPLETE' not in os.environ:
+        return
+    cache = load_cache(instance_path)
+    if cache is None:
+        rebuild_in_background(instance_path)
+        return
+    for line in complete(cache, os.environ.get('COMP_WORDS', ''),
+                         os.environ.get('COMP_CWORD', '0')):
+        print(line)
+    # Like Django, always exit with 0: the completion function never passes it on.
+    raise SystemExit(0)
+
+
+def main():
+    """
+    Background rebuild entry point.
+    """
+    from django_develop.cli import DjangoDevelop
+    [instance_path] = sys.argv[1:]
+    try:
+        build_cache(DjangoDevelop(instance_path))
+    finally:
+        try:
+            os.remove(_marker_path(instance_path))
+        except OSError:
+            pass
+
+
+if __name__ == '__main__':
+    main()
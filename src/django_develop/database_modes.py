@@ -0,0 +1,200 @@
+"""
+Where the generated instance database lives: on disk, on tmpfs, or in memory.
+
+The mode is selected in the ``[database]`` section of ``django-develop.ini``, or per invocation
+with ``django-develop --db-mode=MODE ...`` (or the ``DJANGO_DEVELOP_DB_MODE`` environment
+variable)::
+
+    [database]
+    # One of: file (the default), shm, memory
+    mode = shm
+    # Snapshot to populate a new database from. By default, the latest snapshot.
+    seed = seeded
+    # Snapshot to save the database to on exit. By default, the database is not saved.
+    write_back = latest
+
+``file`` keeps the database in the instance directory.
+``shm`` keeps it on ``/dev/shm`` (tmpfs), where it lasts until reboot, and avoids the cost of
+syncing to disk.
+``memory`` uses a shared-cache in-memory database, which lasts for a single process.
+
+Databases in the ``shm`` and ``memory`` modes start as a copy of the seed snapshot
+(see `django_develop.snapshots`), or of the instance directory's database if there are no
+snapshots.
+They are written back after commands that can change the database, by the process that ran
+the command: with runserver's autoreloader, that is the child process that serves requests.
+"""
+from __future__ import unicode_literals
+
+import hashlib
+import os
+import sqlite3
+import tempfile
+from contextlib import contextmanager
+
+from django_develop import snapshots, sqlite
+
+
+ENVIRONMENT_VARIABLE = 'DJANGO_DEVELOP_DB_MODE'
+
+FLAG = '--db-mode'
+
+MODES = ('file', 'shm', 'memory')
+
+DEFAULT_MODE = 'file'
+
+_section = 'database'
+
+_shm_directory = '/dev/shm'
+
+# Management commands that don't change the database: there's nothing to write back after them.
+_read_only_commands = {
+    'check',
+    'diffsettings',
+    'dumpdata',
+    'findstatic',
+    'help',
+    'inspectdb',
+    'makemigrations',
+    'sendtestemail',
+    'showmigrations',
+    'sqlflush',
+    'sqlmigrate',
+    'sqlsequencereset',
+    'test',
+    'version',
+}
+
+# Set by Django's autoreloader in the child process that runs the command.
+_autoreload_variable = 'RUN_MAIN'
+
+
+def pop_db_mode_flag(argv):
+    """
+    Check for, and remove, ``--db-mode=MODE`` flags in `argv` (in-place).
+
+    The selected mode is passed on in the environment, so that it also applies to subprocesses,
+    such as runserver's autoreloader.
+    """
+    prefix = FLAG + '='
+    for arg in argv[1:]:
+        if arg.startswith(prefix):
+            argv.remove(arg)
+            os.environ[ENVIRONMENT_VARIABLE] = arg[len(prefix):]
+
+
+def mode_from_config(config):
+    """
+    Return the selected database mode.
+
+    :type config: configparser.RawConfigParser
+    :raise ValueError: for unknown modes.
+    """
+    mode = (os.environ.get(ENVIRONMENT_VARIABLE) or
+            config.get(_section, 'mode', fallback=DEFAULT_MODE))
+    if mode not in MODES:
+        raise ValueError('Unknown database mode {!r} (choose from: {})'
+                         .format(mode, ', '.join(MODES)))
+    return mode
+
+
+def database_name(instance_path, mode):
+    """
+    Return the database ``NAME`` for the given mode.
+    """
+    if mode == 'file':
+        return str(snapshots.database_path(instance_path))
+
+    # Distinguish the databases of different instances.
+    tag = hashlib.sha1(str(instance_path).encode('utf-8')).hexdigest()[:12]
+    if mode == 'shm':
+        directory = _shm_directory if os.path.isdir(_shm_directory) else tempfile.gettempdir()
+        return os.path.join(directory, 'django-develop-{}.sqlite3'.format(tag))
+    elif mode == 'memory':
+        return 'file:django-develop-{}?mode=memory&cache=shared'.format(tag)
+    else:
+        raise ValueError(mode)
+
+
+def check_config(instance_path, config):
+    """
+    Check the ``[database]`` section, before anything is set up.
+
+    :raise ValueError: for an unknown mode or missing seed snapshot.
+    """
+    if mode_from_config(config) != 'file':
+        seed_path(instance_path, config)
+
+
+def _is_reloader_parent(argv):
+    """
+    Is this runserver's autoreloader process, which only restarts the serving child process?
+    """
+    return (argv[1:2] == ['runserver'] and '--noreload' not in argv and
+            os.environ.get(_autoreload_variable) != 'true')
+
+
+def seed_path(instance_path, config):
+    """
+    Return the path of the database to populate new databases from, or None.
+
+    :raise ValueError: if the configured seed snapshot does not exist.
+    """
+    seed = config.get(_section, 'seed', fallback=None)
+    if seed == '':
+        return None
+    elif seed is not None:
+        path = snapshots.snapshot_path(instance_path, seed)
+        if not path.exists():
+            raise ValueError('No snapshot named {!r} to seed the database from'.format(seed))
+        return path
+
+    available = [path for (name, path) in snapshots.list_snapshots(instance_path)]
+    if available:
+        return max(available, key=lambda path: path.stat().st_mtime)
+    path = snapshots.database_path(instance_path)
+    return path if path.exists() else None
+
+
+@contextmanager
+def activated(dd, argv=None):
+    """
+    Prepare the database of the selected mode while in this context, and save it on exit.
+
+    :param dd: `django_develop.cli.DjangoDevelop`
+    :param argv: The management command's argv, if known.
+    :raise ValueError: see `check_config()`.
+    """
+    config = dd.read_config()
+    mode = mode_from_config(config)
+    if mode == 'file' or (argv is not None and _is_reloader_parent(argv)):
+        yield
+        return
+
+    name = database_name(dd.instance_path, mode)
+    seed = seed_path(dd.instance_path, config)
+    keeper = None
+    if mode == 'memory':
+        # Keep the in-memory database alive while Django opens and closes its connections.
+        keeper = sqlite3.connect(name, uri=True, check_same_thread=False)
+        if seed is not None:
+            sqlite.load_database(seed, keeper)
+    elif seed is not None and not os.path.exists(name):
+        sqlite.copy_database(seed, name)
+
+    try:
+        yield
+    finally:
+        write_back = config.get(_section, 'write_back', fallback='')
+        if argv is not None and (argv[1:2] or ['help'])[0] in _read_only_commands:
+            write_back = ''
+        if write_back:
+            target = snapshots.snapshot_path(dd.instance_path, write_back)
+            if not target.parent.exists():
+                target.parent.mkdir(parents=True)
+            if keeper is not None:
+                sqlite.backup_connection(keeper, target)
+            elif os.path.exists(name):
+                sqlite.copy_database(name, target)
+        if keeper is not None:
+            keeper.close()
@@ -0,0 +1,32 @@
+"""
+Django's SQLite database backend, with PRAGMAs applied to each new connection.
+
+django-develop uses this for the database it generates in the instance directory.
+The PRAGMAs are given as a ``pragmas`` dict in the database's ``OPTIONS``
+(see `django_develop.sqlite.pragmas_from_config()`).
+
+Test databases are created from templates, and cloned with reflinks where possible
+(see `django_develop.test_databases`).
+"""
+from __future__ import unicode_literals
+
+from django.db.backends.sqlite3 import base
+
+from django_develop.db.backends.sqlite3.creation import DatabaseCreation
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    creation_class = DatabaseCreation
+
+    def get_connection_params(self):
+        # The OPTIONS are passed on to sqlite3.connect(), which doesn't know about the pragmas.
+        params = super(DatabaseWrapper, self).get_connection_params()
+        params.pop('pragmas', None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        conn = super(DatabaseWrapper, self).get_new_connection(conn_params)
+        for (name, value) in sorted(self.settings_dict['OPTIONS'].get('pragmas', {}).items()):
+            conn.execute('PRAGMA {} = {}'.format(name, value))
+        return conn
@@ -0,0 +1,76 @@
+"""
+Test database creation from migrated templates, with per-worker clones made by
+`django_develop.sqlite.copy_database()` (see `django_develop.test_databases`).
+"""
+from __future__ import unicode_literals
+
+import os
+
+from django.db.backends.sqlite3 import creation
+
+from django_develop import sqlite, test_databases
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+
+    _save_template = False
+
+    _keepdb = False
+
+    def _instance_path(self):
+        """
+        The instance directory with the test templates, if they apply to this database.
+        """
+        settings_dict = self.connection.settings_dict
+        if settings_dict['TEST'].get('MIGRATE') is False:
+            return None
+        return test_databases.instance_path_from_settings(settings_dict)
+
+    def _get_test_db_name(self):
+        test_database_name = super(DatabaseCreation, self)._get_test_db_name()
+        if (self._keepdb or self._instance_path() is None or
+                self.is_in_memory_db(test_database_name)):
+            return test_database_name
+        return test_databases.process_database_name(test_database_name)
+
+    def _create_test_db(self, verbosity, autoclobber, keepdb=False):
+        self._keepdb = keepdb
+        test_database_name = super(DatabaseCreation, self)._create_test_db(
+            verbosity, autoclobber, keepdb)
+        instance_path = self._instance_path()
+        if keepdb or instance_path is None or self.is_in_memory_db(test_database_name):
+            return test_database_name
+
+        template = test_databases.seed_test_database(instance_path, test_database_name)
+        if template is not None and verbosity >= 1:
+            self.log('Copied test database from template {}...'.format(template.name[:12]))
+        # Save the result as a test template, unless it came from one already.
+        self._save_template = template is None or template.parent != (
+            test_databases.templates_path(instance_path))
+        return test_database_name
+
+    def create_test_db(self, verbosity=1, autoclobber=False, serialize=True, keepdb=False):
+        self._save_template = False
+        test_database_name = super(DatabaseCreation, self).create_test_db(
+            verbosity, autoclobber, serialize, keepdb)
+        if self._save_template:
+            self.connection.close()
+            test_databases.save_template(
+                self._instance_path(), test_database_name,
+                test_databases.limits_from_settings(self.connection.settings_dict))
+        return test_database_name
+
+    def _clone_test_db(self, suffix, verbosity, keepdb=False):
+        source_database_name = self.connection.settings_dict['NAME']
+        if self._instance_path() is None or self.is_in_memory_db(source_database_name):
+            return super(DatabaseCreation, self)._clone_test_db(suffix, verbosity, keepdb)
+        target_database_name = self.get_test_db_clone_settings(suffix)['NAME']
+        if keepdb and os.path.exists(target_database_name):
+            return
+        self.connection.close()
+        sqlite.copy_database(source_database_name, target_database_name)
+
+    def _destroy_test_db(self, test_database_name, verbosity):
+        if self._instance_path() is None or self.is_in_memory_db(test_database_name):
+            return super(DatabaseCreation, self)._destroy_test_db(test_database_name, verbosity)
+        sqlite.remove_database(test_database_name)
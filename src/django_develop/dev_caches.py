@@ -0,0 +1,194 @@
+"""
+Development cache backends, used when the base settings' caches are missing or unreachable.
+
+This is configured in the ``[cache]`` section of ``django-develop.ini``::
+
+    [cache]
+    # When to use the dev cache instead of the base settings' CACHES:
+    # auto (if they are unset or unreachable; the default), always, or never
+    use_dev_cache = auto
+    # shared: an SQLite file in the instance directory, shared between processes,
+    # which survives runserver's autoreload restarts (the default)
+    # local: a bounded in-process LRU cache
+    backend = shared
+    # The size limit of the shared cache, in MiB
+    max_size = 256
+    # The entry limit of the local cache
+    max_entries = 10000
+    # Use cached database sessions when the sessions' cache is a dev cache,
+    # unless the settings set SESSION_ENGINE (off by default)
+    cached_sessions = false
+
+In ``auto`` mode, the Memcached and Redis servers of the configured caches are probed
+with a short timeout, and caches whose servers can't be reached are replaced.
+"""
+from __future__ import print_function, unicode_literals
+
+import socket
+import sys
+
+try:
+    from urllib.parse import urlsplit
+except ImportError:  # Python 2
+    from urlparse import urlsplit
+
+from django_develop import overrides
+
+
+USE_DEV_CACHE_CHOICES = ('auto', 'always', 'never')
+
+BACKEND_CHOICES = ('shared', 'local')
+
+DEFAULT_MAX_SIZE = 256  # MiB
+
+DEFAULT_MAX_ENTRIES = 10000
+
+# Seconds to wait for cache servers to accept a connection.
+PROBE_TIMEOUT = 0.25
+
+_section = 'cache'
+
+# Backends that talk to a server, by a substring of their import path, and the default port.
+_server_backends = [
+    ('memcached', 11211),
+    ('redis', 6379),
+]
+
+
+def _choice(config, option, choices, default):
+    value = config.get(_section, option, fallback=default)
+    if value not in choices:
+        raise ValueError('Unknown cache {} {!r} in django-develop.ini (choose from: {})'
+                         .format(option, value, ', '.join(choices)))
+    return value
+
+
+def dev_cache(instance_path, config, alias):
+    """
+    Return the dev cache configuration for the cache `alias`.
+
+    :type config: configparser.RawConfigParser
+    :raise ValueError: for invalid configuration.
+    """
+    backend = _choice(config, 'backend', BACKEND_CHOICES, 'shared')
+    if backend == 'shared':
+        max_size = config.getint(_section, 'max_size', fallback=DEFAULT_MAX_SIZE)
+        return {
+            'BACKEND': 'django_develop.cache.backends.sqlite.SQLiteCache',
+            'LOCATION': str(instance_path / 'cache' / '{}.sqlite3'.format(alias)),
+            'OPTIONS': {'MAX_SIZE': max_size * 1024 * 1024},
+        }
+    else:
+        return {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'django-develop-{}'.format(alias),
+            'OPTIONS': {
+                'MAX_ENTRIES': config.getint(_section, 'max_entries',
+                                             fallback=DEFAULT_MAX_ENTRIES),
+            },
+        }
+
+
+def server_addresses(cache):
+    """
+    Return the socket addresses of the servers a cache configuration uses.
+
+    :return: List of (family, address), or None if the backend doesn't use servers.
+    """
+    backend = cache.get('BACKEND', '').lower()
+    default_ports = [port for (name, port) in _server_backends if name in backend]
+    if not default_ports:
+        return None
+    [default_port] = default_ports
+
+    locations = cache.get('LOCATION', '')
+    if not isinstance(locations, (list, tuple)):
+        locations = [location for location in locations.split(';') if location]
+
+    addresses = []
+    for location in locations:
+        location = location.strip()
+        if '://' in location:
+            url = urlsplit(location)
+            if url.scheme == 'unix':
+                addresses.append((socket.AF_UNIX, url.path))
+            else:
+                addresses.append((socket.AF_INET, (url.hostname or 'localhost',
+                                                   url.port or default_port)))
+        elif location.startswith('unix:') or location.startswith('/'):
+            addresses.append((socket.AF_UNIX, location[len('unix:'):]
+                              if location.startswith('unix:') else location))
+        else:
+            (host, _, port) = location.rpartition(':')
+            if not host:
+                (host, port) = (port, '')
+            addresses.append((socket.AF_INET, (host.strip('[]'),
+                                               int(port) if port else default_port)))
+    return addresses
+
+
+def is_reachable(family, address, timeout=PROBE_TIMEOUT):
+    """
+    Does a server accept connections at `address`?
+    """
+    try:
+        if family == socket.AF_UNIX:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(timeout)
+            try:
+                sock.connect(address)
+            finally:
+                sock.close()
+        else:
+            socket.create_connection(address, timeout=timeout).close()
+    except (socket.error, socket.timeout, ValueError):
+        return False
+    return True
+
+
+def dev_cache_settings(instance_path, config, layers):
+    """
+    Return a settings layer that sets up the dev caches, as configured.
+
+    If ``cached_sessions`` is enabled, this also defaults ``SESSION_ENGINE`` to cached database
+    sessions, when the sessions' cache is a dev cache and the settings don't set it.
+
+    :param layers: The settings layers, in decreasing order of precedence.
+    :return: Dict of the settings to override.
+    :raise ValueError: for invalid configuration.
+    """
+    use_dev_cache = _choice(config, 'use_dev_cache', USE_DEV_CACHE_CHOICES, 'auto')
+    if use_dev_cache == 'never':
+        return {}
+
+    def get(name, default=None):
+        try:
+            return overrides.lookup(layers, name)
+        except KeyError:
+            return default
+
+    caches = dict(get('CACHES') or {})
+    if use_dev_cache == 'always' or not caches:
+        replace = sorted(caches) or ['default']
+    else:
+        replace = []
+        for (alias, cache) in sorted(caches.items()):
+            addresses = server_addresses(cache)
+            unreachable = [address for (family, address) in addresses or []
+                           if not is_reachable(family, address)]
+            if unreachable:
+                print('django-develop warning: cache {!r} unreachable at {}, using a dev cache'
+                      .format(alias, ', '.join(str(address) for address in unreachable)),
+                      file=sys.stderr)
+                replace.append(alias)
+    if not replace:
+        return {}
+
+    for alias in replace:
+        caches[alias] = dev_cache(instance_path, config, alias)
+    settings = {'CACHES': caches}
+    if (config.getboolean(_section, 'cached_sessions', fallback=False) and
+            get('SESSION_CACHE_ALIAS', 'default') in replace and
+            'SESSION_ENGINE' not in overrides.names(layers)):
+        settings['SESSION_ENGINE'] = 'django.contrib.sessions.backends.cached_db'
+    return settings
@@ -0,0 +1,344 @@
+"""
+A local mailbox for the email sent by dev instances: ``django-develop mail``.
+
+When the base settings leave email at Django's SMTP defaults, django-develop sends it to
+`django_develop.mail.backends.mailbox.EmailBackend`, which stores each message in
+``mailbox.sqlite3`` in the instance directory instead of dumping it to standard output.
+Messages are written in batches by a background thread, so sending doesn't wait for the disk.
+Searches use a trigram full-text index where SQLite has one, so they stay fast in a full mailbox.
+
+List, search and show the messages with::
+
+    django-develop mail [SEARCH] [--limit N]
+    django-develop mail --show ID [--raw]
+    django-develop mail --clear
+
+This is configured in the ``[mail]`` section of ``django-develop.ini``::
+
+    [mail]
+    # "mailbox", or "console" for Django's console backend.
+    backend = mailbox
+    # Remove the oldest messages beyond this many.
+    max_messages = 10000
+"""
+from __future__ import print_function, unicode_literals
+
+import argparse
+import atexit
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+try:
+    import queue
+except ImportError:  # Python 2
+    import Queue as queue
+
+
+BACKEND_CHOICES = {
+    'mailbox': 'django_develop.mail.backends.mailbox.EmailBackend',
+    'console': 'django.core.mail.backends.console.EmailBackend',
+}
+
+# The setting that passes the configuration on to the backend.
+SETTING_NAME = 'DJANGO_DEVELOP_MAILBOX'
+
+DEFAULT_MAX_MESSAGES = 10000
+
+_section = 'mail'
+
+# Most messages to write in one transaction.
+_batch_size = 500
+
+# Seconds to wait for the writer to finish when the process exits.
+_exit_timeout = 10
+
+_schema = """
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY,
+    sent REAL NOT NULL,
+    from_email TEXT NOT NULL,
+    recipients TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    body TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    message BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS messages_sent ON messages (sent);
+CREATE INDEX IF NOT EXISTS messages_recipients ON messages (recipients);
+CREATE INDEX IF NOT EXISTS messages_subject ON messages (subject);
+"""
+
+# A trigram full-text index for substring search, where SQLite supports it (3.34 and later).
+# It indexes the messages table's columns, and triggers keep it up to date.
+_search_schema = """
+CREATE VIRTUAL TABLE messages_search USING fts5(
+    from_email, recipients, subject, body,
+    content='messages', content_rowid='id', tokenize='trigram'
+);
+CREATE TRIGGER messages_search_insert AFTER INSERT ON messages BEGIN
+    INSERT INTO messages_search (rowid, from_email, recipients, subject, body)
+    VALUES (new.id, new.from_email, new.recipients, new.subject, new.body);
+END;
+CREATE TRIGGER messages_search_delete AFTER DELETE ON messages BEGIN
+    INSERT INTO messages_search (messages_search, rowid, from_email, recipients, subject, body)
+    VALUES ('delete', old.id, old.from_email, old.recipients, old.subject, old.body);
+END;
+INSERT INTO messages_search (messages_search) VALUES ('rebuild');
+"""
+
+# Trigrams can only find search terms of at least this many characters.
+_search_min_length = 3
+
+
+def mailbox_path(instance_path):
+    return instance_path / 'mailbox.sqlite3'
+
+
+def email_settings(instance_path, config):
+    """
+    Return the email settings that replace Django's SMTP defaults.
+
+    :raise ValueError: For an unknown backend in the config.
+    """
+    backend = config.get(_section, 'backend', fallback='mailbox')
+    if backend not in BACKEND_CHOICES:
+        raise ValueError('Unknown mail backend {!r} in django-develop.ini (choose from: {})'
+                         .format(backend, ', '.join(sorted(BACKEND_CHOICES))))
+    return {
+        'EMAIL_BACKEND': BACKEND_CHOICES[backend],
+        SETTING_NAME: {
+            'PATH': str(mailbox_path(instance_path)),
+            'MAX_MESSAGES': config.getint(_section, 'max_messages',
+                                          fallback=DEFAULT_MAX_MESSAGES),
+        },
+    }
+
+
+def connect(path):
+    connection = sqlite3.connect(str(path), timeout=30)
+    connection.execute('PRAGMA journal_mode = WAL')
+    connection.executescript(_schema)
+    if not _has_search_index(connection):
+        try:
+            connection.executescript('BEGIN;' + _search_schema + 'COMMIT;')
+        except sqlite3.OperationalError:
+            # No FTS5, or no trigram tokenizer: search with LIKE instead.
+            connection.rollback()
+    return connection
+
+
+def _has_search_index(connection):
+    return connection.execute(
+        "SELECT count(*) FROM sqlite_master WHERE type = 'table' AND name = 'messages_search'"
+    ).fetchone()[0] > 0
+
+
+def write_messages(connection, rows, max_messages=DEFAULT_MAX_MESSAGES):
+    """
+    Store message rows ``(sent, from_email, recipients, subject, body, message)`` in one
+    transaction, and remove the oldest messages beyond `max_messages`.
+    """
+    with connection:
+        connection.executemany(
+            'INSERT INTO messages (sent, from_email, recipients, subject, body, size, message) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?)',
+            [(sent, from_email, recipients, subject, body, len(message), sqlite3.Binary(message))
+             for (sent, from_email, recipients, subject, body, message) in rows])
+        connection.execute(
+            'DELETE FROM messages WHERE id <= '
+            '(SELECT id FROM messages ORDER BY id DESC LIMIT 1 OFFSET ?)', (max_messages,))
+
+
+class MailboxWriter(object):
+    """
+    A background thread that writes queued messages to a mailbox in batches.
+    """
+
+    def __init__(self, path, max_messages):
+        self.path = path
+        self.max_messages = max_messages
+        self.pid = os.getpid()
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self._run, name='django-develop mailbox')
+        self.thread.daemon = True
+        self.thread.start()
+
+    def _run(self):
+        connection = None
+        done = False
+        while not done:
+            batch = [self.queue.get()]
+            while len(batch) < _batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            done = None in batch
+            rows = [row for row in batch if row is not None]
+            if not rows:
+                continue
+            try:
+                if connection is None:
+                    connection = connect(self.path)
+                write_messages(connection, rows, self.max_messages)
+            except Exception as e:
+                print('django-develop warning: cannot store {} messages in {} ({}: {})'.format(
+                    len(rows), self.path, type(e).__name__, e), file=sys.stderr)
+        if connection is not None:
+            connection.close()
+
+    def put(self, rows):
+        for row in rows:
+            self.queue.put(row)
+
+    def close(self, timeout=_exit_timeout):
+        """
+        Write the queued messages, and stop the thread.
+        """
+        self.queue.put(None)
+        self.thread.join(timeout)
+
+
+_writers = {}
+_writers_lock = threading.Lock()
+
+
+def get_writer(path, max_messages=DEFAULT_MAX_MESSAGES):
+    """
+    Return this process's writer for the mailbox at `path`, starting it if needed.
+    """
+    with _writers_lock:
+        writer = _writers.get(path)
+        # A forked process inherits the writer, but not its thread.
+        if writer is None or writer.pid != os.getpid():
+            writer = _writers[path] = MailboxWriter(path, max_messages)
+        return writer
+
+
+@atexit.register
+def _close_writers():
+    with _writers_lock:
+        writers = [writer for writer in _writers.values() if writer.pid == os.getpid()]
+        _writers.clear()
+    for writer in writers:
+        writer.close()
+
+
+def _search_clause(connection, search):
+    if not search:
+        return ('', [])
+    if len(search) >= _search_min_length and _has_search_index(connection):
+        return (' WHERE id IN (SELECT rowid FROM messages_search WHERE messages_search MATCH ?)',
+                ['"{}"'.format(search.replace('"', '""'))])
+    pattern = '%{}%'.format(search.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_'))
+    columns = ['from_email', 'recipients', 'subject', 'body']
+    return (' WHERE ' + ' OR '.join("{} LIKE ? ESCAPE '\\'".format(column) for column in columns),
+            [pattern] * len(columns))
+
+
+def list_messages(connection, search=None, limit=20):
+    """
+    :return: Rows ``(id, sent, from_email, recipients, subject, size)``, newest first.
+    """
+    (where, params) = _search_clause(connection, search)
+    return connection.execute(
+        'SELECT id, sent, from_email, recipients, subject, size FROM messages' + where +
+        ' ORDER BY id DESC LIMIT ?', params + [limit]).fetchall()
+
+
+def count_messages(connection, search=None):
+    (where, params) = _search_clause(connection, search)
+    return connection.execute('SELECT count(*) FROM messages' + where, params).fetchone()[0]
+
+
+def get_message(connection, message_id):
+    """
+    :return: The message's MIME bytes, or None.
+    """
+    row = connection.execute('SELECT message FROM messages WHERE id = ?',
+                             (message_id,)).fetchone()
+    return None if row is None else bytes(row[0])
+
+
+def format_message(raw):
+    """
+    Format a message for the terminal: its main headers, text body, and attachment names.
+    """
+    import email
+    from email import policy
+    message = email.message_from_bytes(raw, policy=policy.default)
+    lines = ['{}: {}'.format(name, message[name])
+             for name in ['Date', 'From', 'To', 'Cc', 'Reply-To', 'Subject']
+             if message[name] is not None]
+    body = message.get_body(preferencelist=('plain', 'html'))
+    lines.append('')
+    lines.append(body.get_content().rstrip('\n') if body is not None else '(no text body)')
+    attachments = [part.get_filename() or part.get_content_type()
+                   for part in message.iter_attachments()]
+    if attachments:
+        lines.append('')
+        lines.append('Attachments: {}'.format(', '.join(attachments)))
+    return '\n'.join(lines)
+
+
+def _clip(text, width):
+    return text if len(text) <= width else text[:width - 3] + '...'
+
+
+def _print_messages(connection, search, limit):
+    rows = list_messages(connection, search, limit)
+    total = count_messages(connection, search)
+    if not rows:
+        print('No messages.' if not search else 'No messages matching {!r}.'.format(search))
+        return
+    for (message_id, sent, from_email, recipients, subject, size) in rows:
+        print('{:>6}  {}  {:<30} -> {:<30}  {}'.format(
+            message_id, time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(sent)),
+            _clip(from_email, 30), _clip(recipients, 30), subject))
+    if total > len(rows):
+        print('({} of {} messages: use --limit to see more)'.format(len(rows), total))
+
+
+def main_mail(dd, args):
+    """
+    ``django-develop mail [SEARCH] [--limit N] [--show ID [--raw]] [--clear]``
+
+    :raise ValueError: For a message that isn't in the mailbox.
+    """
+    parser = argparse.ArgumentParser(
+        prog='django-develop mail',
+        description='List, search and show the messages in the instance mailbox.')
+    parser.add_argument('search', nargs='?',
+                        help='Only list messages with this text in their sender, recipients, '
+                             'subject or body.')
+    parser.add_argument('--limit', type=int, default=20, help='Number of messages to list.')
+    parser.add_argument('--show', type=int, metavar='ID', help='Show a message.')
+    parser.add_argument('--raw', action='store_true', help='With --show, print the raw message.')
+    parser.add_argument('--clear', action='store_true', help='Remove all messages.')
+    options = parser.parse_args(args)
+
+    path = mailbox_path(dd.instance_path)
+    if not path.exists():
+        print('No messages.')
+        return
+    connection = connect(path)
+    try:
+        if options.clear:
+            with connection:
+                count = connection.execute('DELETE FROM messages').rowcount
+            print('Removed {} messages.'.format(count))
+        elif options.show is not None:
+            raw = get_message(connection, options.show)
+            if raw is None:
+                raise ValueError('No message {} in the mailbox'.format(options.show))
+            if options.raw:
+                print(raw.decode('utf-8', 'replace'))
+            else:
+                print(format_message(raw))
+        else:
+            _print_messages(connection, options.search, options.limit)
+    finally:
+        connection.close()
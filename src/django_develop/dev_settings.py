@@ -1,3 +1,50 @@
 """
 This module is dynamically populated by django-develop for use as a DJANGO_SETTINGS_MODULE.
+
+Its settings are a layered view (see `set_layers()`): they are looked up in the layers when
+first read, through the module's ``__getattr__``, instead of being copied in up front.
+
+Listing the module only collects the names in the layers, without evaluating any values.
+Django's `Settings` loader still reads every setting it lists, once, so each `overrides.Lazy`
+value is evaluated during ``django.setup()``, as it is read.
 """
+import sys
+
+from django_develop import overrides
+
+_layers = []
+
+
+def set_layers(layers):
+    """
+    Set the layers to look settings up in, in decreasing order of precedence.
+
+    :param layers: Mappings of setting names to values, which may be `overrides.Lazy`.
+    """
+    global _layers
+    namespace = globals()
+    own = {name: namespace[name] for name in _own_names}
+    namespace.clear()
+    namespace.update(own)
+    _layers = list(layers)
+
+    if sys.version_info < (3, 7):  # No module __getattr__ (PEP 562): copy the settings in.
+        overrides.merge(_layers, into=namespace)
+
+
+def __getattr__(name):
+    try:
+        value = overrides.lookup(_layers, name)
+    except KeyError:
+        raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
+    # Keep the value, so that later reads don't go through the layers (or resolve it) again.
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | overrides.names(_layers))
+
+
+# The module's own names, which set_layers() keeps.
+_own_names = [name for name in globals() if not name.isupper()] + ['_own_names']
@@ -1,6 +1,18 @@
 """
 This module is the default ROOT_URLCONF provided by django-develop.
+
+It serves the request profiles (see `django_develop.request_profiling`) at ``/__profiles__/``,
+if request profiling is enabled.
 """
+from django.conf import settings
+
+from django.urls import include, re_path
+
+from django_develop import request_profiling
 
 
 urlpatterns = []
+
+if getattr(settings, request_profiling.SETTING_NAME, None) is not None:
+    urlpatterns.append(
+        re_path(r'^__profiles__/', include('django_develop.request_profiling_urls')))
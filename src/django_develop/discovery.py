@@ -0,0 +1,398 @@
+"""
+Parallel, process-isolated discovery of candidate Django settings modules.
+
+`sys.path` entries are walked concurrently in a thread pool, and each candidate module is
+classified statically where possible (see `django_develop.static_analysis`).
+Otherwise, it is checked with `utils.find_potential_problems()` in a worker process,
+so that a slow or crashing import can neither stall nor pollute the calling interpreter.
+"""
+from __future__ import print_function, unicode_literals
+
+import multiprocessing
+import multiprocessing.connection
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from django_develop import utils
+from django_develop.index import probe_fingerprint, probe_fingerprint_is_current
+from django_develop.static_analysis import find_potential_problems_statically
+
+
+# Default number of seconds to wait for any single candidate module's probe.
+DEFAULT_TIMEOUT = 10.0
+
+# Maximum number of threads to walk sys.path entries with.
+_max_scan_threads = 32
+
+# The sys.path that spawned worker processes start with.
+_worker_sys_path = list(sys.path)
+
+# Failed imports of candidate modules:
+# module name -> ((sys.path entry, path, `index.probe_fingerprint()`), problems).
+# Probes run in throwaway worker processes, so failures are remembered here, in the calling
+# process, and later runs (without a CandidateIndex) skip them until the path or the files they
+# depend on change, like the index does.
+_failed_imports = {}
+
+
+def _remember_failed_imports(sys_path_entry, probed, paths):
+    for (modname, problems) in probed:
+        if any(problem.startswith('import raised') for problem in problems):
+            fingerprint = probe_fingerprint(sys_path_entry, modname, problems, paths)
+            if fingerprint is not None:
+                _failed_imports[modname] = ((sys_path_entry, tuple(paths), fingerprint),
+                                            frozenset(problems))
+
+
+def _remembered_failed_import(sys_path_entry, modname, paths):
+    """
+    :return: The remembered problems of `modname`, or None.
+    """
+    failed = _failed_imports.get(modname)
+    if failed is None:
+        return None
+    ((failed_entry, failed_paths, fingerprint), problems) = failed
+    if (failed_entry, failed_paths) != (sys_path_entry, tuple(paths)):
+        return None
+    if not probe_fingerprint_is_current(sys_path_entry, modname, fingerprint):
+        return None
+    return set(problems)
+
+
+def _scan_path_entry(sys_path_entry, index, rules):
+    """
+    Discover the candidates in one path entry, consulting and updating `index` if given.
+    """
+    if index is None:
+        return utils.discover_candidates_in_path_entry(sys_path_entry, rules)
+
+    modnames = index.lookup_entry(sys_path_entry, rules.key())
+    if modnames is None:
+        fingerprint = []
+        modnames = utils.discover_candidates_in_path_entry(sys_path_entry, rules, fingerprint)
+        index.store_entry(sys_path_entry, rules.key(), fingerprint, modnames)
+    return modnames
+
+
+def scan_path_entries(paths=None, max_workers=None, index=None, rules=None):
+    """
+    Discover candidate settings modules by name, walking the path entries concurrently.
+
+    This is a parallel version of `utils.discover_candidate_settings()`:
+    results are yielded in path order, as soon as each entry's walk completes.
+
+    :param paths: Path entries to walk (default: a copy of `sys.path`)
+    :param index: Optional `CandidateIndex` to skip walking unchanged entries
+    :param rules: `utils.DiscoveryRules` (default: the built-in rules)
+    :return: Iterator of (sys.path entry, [module names])
+    """
+    paths = list(sys.path if paths is None else paths)
+    if not paths:
+        return
+    if max_workers is None:
+        max_workers = min(_max_scan_threads, len(paths))
+    if rules is None:
+        rules = utils.DiscoveryRules()
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = executor.map(lambda entry: _scan_path_entry(entry, index, rules), paths)
+        for (sys_path_entry, modnames) in zip(paths, results):
+            if 0 < len(modnames):
+                yield (sys_path_entry, modnames)
+
+
+def _probe(modname, path):
+    """
+    Check `modname` against the caller's `path`, in a worker process.
+    """
+    sys.path[:] = path
+    return utils.find_potential_problems(modname)
+
+
+def _worker(connection):
+    """
+    Worker process entry point: probe each (modname, path) received, until None or EOF.
+    """
+    while True:
+        try:
+            task = connection.recv()
+        except EOFError:
+            return
+        if task is None:
+            return
+        try:
+            result = (True, _probe(*task))
+        except Exception as e:
+            result = (False, 'probe raised {}'.format(type(e).__name__))
+        try:
+            connection.send(result)
+        except Exception as e:
+            # For example, an unpicklable result.
+            connection.send((False, 'probe raised {}'.format(type(e).__name__)))
+
+
+def _context():
+    """
+    :return: The multiprocessing context to start a worker process with now.
+    """
+    methods = multiprocessing.get_all_start_methods()
+    # Prefer fork: the worker inherits the already-imported modules. But forking a
+    # multi-threaded process (such as while the scanning threads run) can deadlock the child,
+    # so workers are spawned instead then, where possible.
+    if 'fork' in methods and (threading.active_count() == 1 or 'spawn' not in methods):
+        return multiprocessing.get_context('fork')
+    return multiprocessing.get_context('spawn')
+
+
+class _Worker(object):
+    """
+    A probing worker process, and the probe it is running (if any).
+    """
+
+    def __init__(self):
+        ctx = _context()
+        (self.connection, child_connection) = ctx.Pipe()
+        self.process = ctx.Process(target=_worker, args=(child_connection,))
+        self.process.daemon = True
+        if ctx.get_start_method() == 'fork':
+            self.process.start()
+        else:
+            # Spawned workers start with the caller's sys.path, and must import this package
+            # from it (the worker then replaces it for each probe).
+            caller_sys_path = sys.path[:]
+            sys.path[:] = _worker_sys_path
+            try:
+                self.process.start()
+            finally:
+                sys.path[:] = caller_sys_path
+        child_connection.close()
+        self.probe = None
+        self.deadline = None
+
+    def kill(self):
+        self.process.terminate()
+        self.process.join()
+        self.connection.close()
+
+
+class _Probe(object):
+    """
+    A probe that is waiting for, or running in, a `_Workers` process.
+    """
+
+    def __init__(self, workers, modname, path):
+        self.workers = workers
+        self.modname = modname
+        self.path = path
+        self.done = False
+        self.value = None
+
+    def ready(self):
+        self.workers.poll()
+        return self.done
+
+    def get(self):
+        # The probe's own deadline applies, from when it was dispatched to a worker.
+        while not self.done:
+            self.workers.poll(wait=True)
+        return self.value
+
+
+class _Workers(object):
+    """
+    Up to `jobs` worker processes that run probes, each with a deadline.
+
+    Workers are only started once probes are waiting for them.
+    A probe that misses its deadline has its worker killed, so that it can't hold up the probes
+    queued behind it.
+    """
+
+    def __init__(self, jobs, timeout):
+        self.jobs = jobs or multiprocessing.cpu_count()
+        self.timeout = timeout
+        self.workers = []
+        self.waiting = deque()
+
+    def submit(self, modname, path):
+        probe = _Probe(self, modname, path)
+        self.waiting.append(probe)
+        self._dispatch()
+        return probe
+
+    def _dispatch(self):
+        idle = [worker for worker in self.workers if worker.probe is None]
+        while self.waiting and (idle or len(self.workers) < self.jobs):
+            if idle:
+                worker = idle.pop()
+            else:
+                worker = _Worker()
+                self.workers.append(worker)
+            probe = self.waiting.popleft()
+            worker.connection.send((probe.modname, probe.path))
+            (worker.probe, worker.deadline) = (probe, time.time() + self.timeout)
+
+    def _finish(self, worker, value):
+        (worker.probe.value, worker.probe.done) = (value, True)
+        (worker.probe, worker.deadline) = (None, None)
+
+    def poll(self, wait=False):
+        """
+        Collect finished probes, and kill the workers of probes past their deadline.
+
+        :param wait: Wait until some running probe finishes or reaches its deadline.
+        """
+        busy = [worker for worker in self.workers if worker.probe is not None]
+        if wait and busy:
+            remaining = max(0, min(worker.deadline for worker in busy) - time.time())
+            multiprocessing.connection.wait(
+                [worker.connection for worker in busy] +
+                [worker.process.sentinel for worker in busy], remaining)
+        for worker in list(self.workers):
+            if worker.probe is None:
+                continue
+            if worker.connection.poll():
+                try:
+                    (ok, value) = worker.connection.recv()
+                except (EOFError, OSError):
+                    pass  # The worker exited: see below.
+                else:
+                    self._finish(worker, value if ok else {value})
+                    continue
+            if not worker.process.is_alive():
+                worker.process.join()
+                self._finish(worker, {'probe exited with code {}'.format(
+                    worker.process.exitcode)})
+                worker.connection.close()
+                self.workers.remove(worker)
+            elif time.time() >= worker.deadline:
+                worker.kill()
+                self._finish(worker, {'import timed out'})
+                self.workers.remove(worker)
+        self._dispatch()
+
+    def close(self):
+        # Don't wait for stuck or slow probes: their results are no longer wanted.
+        for worker in self.workers:
+            if worker.probe is None:
+                worker.connection.send(None)
+                worker.process.join()
+                worker.connection.close()
+            else:
+                worker.kill()
+
+
+class _Resolved(object):
+    """
+    Stand-in for a `_Probe` whose value is already known.
+    """
+
+    def __init__(self, value, from_index=False):
+        self.value = value
+        self.from_index = from_index
+
+    def ready(self):
+        return True
+
+    def get(self):
+        return self.value
+
+
+class _PendingGroup(object):
+    """
+    Probe results pending for a single path entry.
+    """
+
+    def __init__(self, sys_path_entry, async_results):
+        self.sys_path_entry = sys_path_entry
+        self.async_results = async_results  # [(modname, _Probe or _Resolved)]
+
+    def ready(self):
+        return all(result.ready() for (_, result) in self.async_results)
+
+    def resolve(self, paths, index=None):
+        """
+        :param paths: The full path that the modules were probed with.
+        :return: (sys.path entry, [(module name, problems)])
+        """
+        probed = []
+        for (modname, result) in self.async_results:
+            problems = result.get()
+            if index is not None and not getattr(result, 'from_index', False):
+                index.store_probe(self.sys_path_entry, modname, problems, paths)
+            probed.append((modname, problems))
+        return (self.sys_path_entry, probed)
+
+
+def discover_and_probe(paths=None, jobs=None, timeout=None, index=None, static=True, rules=None):
+    """
+    Discover candidate settings modules, and probe each one.
+
+    If `static` is true, each candidate is first classified without importing it,
+    and only probed in a worker process if the static result is inconclusive.
+
+    Probing of each path entry's candidates starts as soon as its walk completes, and results are
+    yielded in path order as soon as they are all available.
+
+    A probe that takes longer than `timeout` seconds, counted from when a worker process starts
+    it, is reported with an "import timed out" problem; its worker is killed.
+    Worker processes are only started for candidates that need probing.
+
+    If `index` is given, unchanged path entries and modules are looked up in it instead of being
+    walked and probed again, and the index is saved once all results have been yielded.
+
+    Each module name is probed at most once per run: probes import from the full path, so a
+    module name found again in a later (shadowed) path entry gets the same result.
+    Failed imports are not probed again by later runs in the same process with the same path,
+    until the files they depend on change (see `index.probe_fingerprint()`).
+
+    :param paths: Path entries to search (default: a copy of `sys.path`)
+    :param jobs: Maximum number of worker processes (default: CPU count)
+    :param timeout: Seconds to wait for any single candidate's probe (default: `DEFAULT_TIMEOUT`)
+    :param index: Optional `CandidateIndex`
+    :param static: Classify candidates statically where possible
+    :param rules: `utils.DiscoveryRules` (default: the built-in rules)
+    :return: Iterator of (sys.path entry, [(module name, problems)])
+    """
+    paths = list(sys.path if paths is None else paths)
+    if timeout is None:
+        timeout = DEFAULT_TIMEOUT
+
+    probed = {}  # module name -> result, for this run
+
+    def probe(sys_path_entry, modname):
+        cached = None if index is None else index.lookup_probe(sys_path_entry, modname)
+        if cached is not None:
+            return _Resolved(cached, from_index=True)
+        if modname not in probed:
+            problems = _remembered_failed_import(sys_path_entry, modname, paths)
+            if problems is None and static:
+                problems = find_potential_problems_statically(modname, paths)
+            probed[modname] = (_Resolved(problems) if problems is not None else
+                               workers.submit(modname, paths))
+        return probed[modname]
+
+    def resolve(group):
+        (sys_path_entry, probed_modules) = group.resolve(paths, index)
+        _remember_failed_imports(sys_path_entry, probed_modules, paths)
+        return (sys_path_entry, probed_modules)
+
+    workers = _Workers(jobs, timeout)
+    try:
+        pending = deque()
+        for (sys_path_entry, modnames) in scan_path_entries(paths, index=index, rules=rules):
+            pending.append(_PendingGroup(sys_path_entry, [
+                (modname, probe(sys_path_entry, modname))
+                for modname in modnames
+            ]))
+            while pending and pending[0].ready():
+                yield resolve(pending.popleft())
+        while pending:
+            yield resolve(pending.popleft())
+    finally:
+        workers.close()
+
+    if index is not None:
+        index.save()
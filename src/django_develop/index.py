@@ -0,0 +1,199 @@
+"""
+Persistent on-disk index of candidate settings modules.
+
+The index records, per `sys.path` entry, a modification-time fingerprint of the directories that
+discovery walked in the entry (see `fingerprint_is_current()`), along with the candidate module
+names discovered in it, and the probe verdicts of those modules (including
+failed imports), keyed by the modification times of the files they depend on
+(see `probe_fingerprint()`).
+Later scans only re-walk entries whose fingerprint changed, and only re-probe modules whose
+dependencies changed, so broken candidates are skipped until they (or the path) are edited.
+"""
+from __future__ import unicode_literals
+
+import io
+import json
+import os
+import threading
+
+from attr import attributes, attr, Factory
+
+from django_develop import utils
+from django_develop.static_analysis import find_module_source, source_dependencies
+
+
+# Bump this to invalidate existing index files after format changes.
+_index_version = 4
+
+# Python 2: os.replace() is not available.
+_replace = getattr(os, 'replace', os.rename)
+
+# Transient problems that should not be remembered across runs.
+_uncacheable_problem_prefixes = (
+    'import timed out',
+    'probe exited',
+    'probe raised',
+)
+
+
+def fingerprint_is_current(fingerprint):
+    """
+    Check a fingerprint from `utils.discover_candidates_in_path_entry()`.
+
+    This only stats the recorded paths (the directories that discovery walked, not the whole
+    tree), so it is much cheaper than walking the entry again.
+
+    :rtype: bool
+    """
+    return all(utils.path_stamp(path) == stamp for (path, stamp) in fingerprint)
+
+
+def probe_fingerprint(sys_path_entry, modname, problems, paths):
+    """
+    Return the [path, `utils.path_stamp()`] pairs that a probe verdict depends on, or None.
+
+    These are the source files of `modname` and of the modules it imports from its own
+    `sys.path` entry (see `static_analysis.source_dependencies()`), starting with its own.
+    A failed import might also be fixed by installing a missing module, so its verdict also
+    depends on the directories of `paths` (which installing modules into changes).
+
+    :param paths: The full path that the module was probed with.
+    :rtype: list or None
+    """
+    source_paths = source_dependencies(modname, [sys_path_entry])
+    if not source_paths:
+        return None
+    if any(problem.startswith('import raised') for problem in problems):
+        source_paths += [path for path in paths if path]
+    return [[path, utils.path_stamp(path)] for path in source_paths]
+
+
+def probe_fingerprint_is_current(sys_path_entry, modname, fingerprint):
+    """
+    Check a fingerprint from `probe_fingerprint()`.
+
+    :rtype: bool
+    """
+    return (find_module_source(modname, [sys_path_entry]) == fingerprint[0][0] and
+            fingerprint_is_current(fingerprint))
+
+
+def _is_cacheable(problems):
+    return not any(problem.startswith(_uncacheable_problem_prefixes) for problem in problems)
+
+
+@attributes
+class CandidateIndex(object):
+    """
+    Index of discovered candidate settings modules, stored as JSON at `path`.
+
+    Hits and misses are counted for path entries and module probes separately,
+    for `summary()`.
+    """
+
+    path = attr(convert=str)  # type: str
+    entries = attr(default=Factory(dict))  # type: dict
+
+    entry_hits = attr(default=0)
+    entry_misses = attr(default=0)
+    probe_hits = attr(default=0)
+    probe_misses = attr(default=0)
+
+    _lock = attr(default=Factory(threading.Lock), repr=False, cmp=False)
+    _seen = attr(default=Factory(set), repr=False, cmp=False)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load the index at `path`, or start an empty one if it is missing, unreadable, or stale.
+        """
+        try:
+            with io.open(str(path), encoding='utf-8') as f:
+                data = json.load(f)
+        except (IOError, OSError, ValueError):
+            return cls(path)
+        if not isinstance(data, dict) or data.get('version') != _index_version:
+            return cls(path)
+        return cls(path, entries=data.get('entries', {}))
+
+    def save(self):
+        """
+        Write the index, dropping entries that were not looked up during this run.
+        """
+        entries = {k: v for (k, v) in self.entries.items() if k in self._seen}
+        data = json.dumps({'version': _index_version, 'entries': entries}, sort_keys=True)
+        temp_path = '{}.tmp'.format(self.path)
+        with io.open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(data)
+        _replace(temp_path, self.path)
+
+    def lookup_entry(self, sys_path_entry, rules_key):
+        """
+        Return the cached candidate module names for `sys_path_entry`, or None on a miss.
+
+        :param rules_key: `utils.DiscoveryRules.key()`: changing the rules invalidates the entry.
+        """
+        with self._lock:
+            self._seen.add(sys_path_entry)
+            cached = self.entries.get(sys_path_entry)
+        hit = (cached is not None and cached['rules'] == rules_key and
+               fingerprint_is_current(cached['fingerprint']))
+        with self._lock:
+            if hit:
+                self.entry_hits += 1
+                return list(cached['modnames'])
+            self.entry_misses += 1
+            return None
+
+    def store_entry(self, sys_path_entry, rules_key, fingerprint, modnames):
+        """
+        :param fingerprint: From `utils.discover_candidates_in_path_entry()`
+        """
+        with self._lock:
+            previous = self.entries.get(sys_path_entry, {})
+            self.entries[sys_path_entry] = {
+                'rules': rules_key,
+                'fingerprint': fingerprint,
+                'modnames': list(modnames),
+                # Keep the verdicts of modules that are still present.
+                'probes': {modname: probe
+                           for (modname, probe) in previous.get('probes', {}).items()
+                           if modname in modnames},
+            }
+
+    def lookup_probe(self, sys_path_entry, modname):
+        """
+        Return the cached problems of `modname`, or None on a miss.
+
+        :rtype: set or None
+        """
+        with self._lock:
+            probe = self.entries.get(sys_path_entry, {}).get('probes', {}).get(modname)
+        hit = (probe is not None and
+               probe_fingerprint_is_current(sys_path_entry, modname, probe['fingerprint']))
+        with self._lock:
+            if hit:
+                self.probe_hits += 1
+                return set(probe['problems'])
+            self.probe_misses += 1
+            return None
+
+    def store_probe(self, sys_path_entry, modname, problems, paths):
+        """
+        :param paths: The full path that the module was probed with.
+        """
+        if not _is_cacheable(problems):
+            return
+        fingerprint = probe_fingerprint(sys_path_entry, modname, problems, paths)
+        if fingerprint is None:
+            return
+        with self._lock:
+            entry = self.entries.get(sys_path_entry)
+            if entry is not None:
+                entry['probes'][modname] = {'fingerprint': fingerprint,
+                                            'problems': sorted(problems)}
+
+    def summary(self):
+        return ('Candidate index: {} path entries cached, {} rescanned; '
+                '{} modules cached, {} probed.'.format(
+                    self.entry_hits, self.entry_misses, self.probe_hits, self.probe_misses))
@@ -0,0 +1,147 @@
+"""
+Named instances: several instance directories per virtualenv, each with its own config.
+
+Each instance has its own ``django-develop.ini`` (and so its own base settings module), database,
+snapshots, static and media files, caches, and settings snapshot. The instance to use is, in
+order of precedence:
+
+* selected per invocation with ``django-develop --instance=NAME ...``;
+* the ``DJANGO_DEVELOP_INSTANCE`` environment variable;
+* the current instance, switched with ``django-develop use-instance NAME``;
+* otherwise, the default instance.
+
+The default instance lives in ``django-develop-instance`` in the virtualenv, as before,
+and named instances in ``django-develop-instances/NAME``. Switching only rewrites the
+``django-develop-instances/current`` pointer file: nothing is re-imported or re-migrated.
+"""
+from __future__ import print_function, unicode_literals
+
+import argparse
+import io
+import os
+import re
+import sys
+from pathlib import Path
+
+
+ENVIRONMENT_VARIABLE = 'DJANGO_DEVELOP_INSTANCE'
+
+FLAG = '--instance'
+
+DEFAULT = 'default'
+
+_instance_name = re.compile(r'^\w[\w.-]*$')
+
+# Python 2: os.replace() is not available.
+_replace = getattr(os, 'replace', os.rename)
+
+
+def instances_path(prefix):
+    return Path(prefix) / 'django-develop-instances'
+
+
+def _pointer_path(prefix):
+    return instances_path(prefix) / 'current'
+
+
+def instance_path(prefix, name):
+    """
+    The instance directory for `name`.
+
+    :raise ValueError: for invalid names.
+    """
+    if name == DEFAULT:
+        return Path(prefix) / 'django-develop-instance'
+    if not _instance_name.match(name) or name == 'current':
+        raise ValueError('Invalid instance name {!r}: use letters, digits, "_", "-" and "."'
+                         .format(name))
+    return instances_path(prefix) / name
+
+
+def pop_instance_flag(argv):
+    """
+    Check for, and remove, ``--instance=NAME`` (or ``--instance NAME``) flags in `argv` (in-place).
+
+    The selected instance is passed on in the environment, so that it also applies to
+    subprocesses, such as runserver's autoreloader.
+    """
+    prefix = FLAG + '='
+    i = 1
+    while i < len(argv):
+        if argv[i].startswith(prefix):
+            os.environ[ENVIRONMENT_VARIABLE] = argv.pop(i)[len(prefix):]
+        elif argv[i] == FLAG and i + 1 < len(argv):
+            del argv[i]
+            os.environ[ENVIRONMENT_VARIABLE] = argv.pop(i)
+        else:
+            i += 1
+
+
+def current_name(prefix):
+    """
+    Return the name of the selected instance.
+    """
+    name = os.environ.get(ENVIRONMENT_VARIABLE)
+    if name:
+        return name
+    try:
+        with io.open(str(_pointer_path(prefix)), 'r', encoding='utf-8') as f:
+            return f.read().strip() or DEFAULT
+    except (IOError, OSError):
+        return DEFAULT
+
+
+def switch(prefix, name):
+    """
+    Make `name` the current instance.
+
+    :raise ValueError: for invalid names.
+    """
+    instance_path(prefix, name)  # Validate
+    pointer = _pointer_path(prefix)
+    if not pointer.parent.exists():
+        pointer.parent.mkdir(parents=True)
+    temp_path = '{}.tmp'.format(pointer)
+    with io.open(temp_path, 'w', encoding='utf-8') as f:
+        f.write(name + '\n')
+    _replace(temp_path, str(pointer))
+
+
+def list_instances(prefix):
+    """
+    :return: List of (name, path) of the existing instances, sorted by name.
+    """
+    found = []
+    default_path = instance_path(prefix, DEFAULT)
+    if default_path.is_dir():
+        found.append((DEFAULT, default_path))
+    if instances_path(prefix).is_dir():
+        found.extend((path.name, path) for path in instances_path(prefix).iterdir()
+                     if path.is_dir() and _instance_name.match(path.name))
+    return sorted(found)
+
+
+def main_use_instance(args):
+    """
+    ``django-develop use-instance [NAME]``
+    """
+    parser = argparse.ArgumentParser(
+        prog='django-develop use-instance',
+        description='Switch the current instance, or list the instances.')
+    parser.add_argument('name', nargs='?', help='If omitted, list the existing instances.')
+    options = parser.parse_args(args)
+
+    current = current_name(sys.prefix)
+    if options.name is None:
+        for (name, path) in list_instances(sys.prefix):
+            print('{} {} ({})'.format('*' if name == current else ' ', name, path))
+        return
+
+    if not instance_path(sys.prefix, options.name).is_dir():
+        raise ValueError('No instance named {!r}: create it with '
+                         '"django-develop-config --instance={} SETTINGS_MODULE"'
+                         .format(options.name, options.name))
+    switch(sys.prefix, options.name)
+    print('Switched to instance {!r}'.format(options.name))
+    if os.environ.get(ENVIRONMENT_VARIABLE):
+        print('Note: {} is set, and takes precedence'.format(ENVIRONMENT_VARIABLE))
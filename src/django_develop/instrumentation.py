@@ -0,0 +1,299 @@
+"""
+Opt-in request latency and SQL instrumentation for dev instances.
+
+When enabled, django-develop adds `InstrumentationMiddleware` to the front of ``MIDDLEWARE``.
+This requires settings that use ``MIDDLEWARE`` rather than ``MIDDLEWARE_CLASSES``:
+otherwise, instrumentation stays disabled, with a warning.
+For each request, it records the wall time, and the number and total time of the database
+queries (through connection execute wrappers), and flags repeated queries (likely N+1 queries).
+Each request is appended as a JSON line to ``perf/requests.jsonl`` in the instance directory,
+which is rotated when it grows too large.
+
+``django-develop perf-report`` summarises the log: latency percentiles, and the worst endpoints
+and queries.
+
+This is configured in the ``[instrumentation]`` section of ``django-develop.ini``::
+
+    [instrumentation]
+    enabled = true
+    # Flag queries that run at least this many times in one request.
+    duplicate_threshold = 3
+    # Rotate the log at this size in MiB, keeping this many old logs.
+    max_size = 10
+    backups = 3
+"""
+from __future__ import print_function, division, unicode_literals
+
+import argparse
+import io
+import json
+import math
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+
+from django_develop import overrides
+
+
+# The setting that passes the configuration on to the middleware.
+SETTING_NAME = 'DJANGO_DEVELOP_INSTRUMENTATION'
+
+MIDDLEWARE = 'django_develop.instrumentation.InstrumentationMiddleware'
+
+DEFAULT_DUPLICATE_THRESHOLD = 3
+
+DEFAULT_MAX_SIZE = 10  # MiB
+
+DEFAULT_BACKUPS = 3
+
+# Number of each request's most expensive queries to record.
+_recorded_queries = 5
+
+_section = 'instrumentation'
+
+# Python 2: os.replace() is not available.
+_replace = getattr(os, 'replace', os.rename)
+
+
+def log_path(instance_path):
+    return instance_path / 'perf' / 'requests.jsonl'
+
+
+def instrumentation_settings(instance_path, config, layers):
+    """
+    Return a settings layer that adds the instrumentation middleware, if enabled.
+
+    :param layers: The settings layers, in decreasing order of precedence.
+    :return: Dict of the settings to override.
+    """
+    if not config.getboolean(_section, 'enabled', fallback=False):
+        return {}
+    try:
+        middleware = overrides.prepend_middleware(layers, MIDDLEWARE)
+    except ValueError as e:
+        print('django-develop warning: instrumentation is disabled ({})'.format(e),
+              file=sys.stderr)
+        return {}
+    return {
+        'MIDDLEWARE': middleware,
+        SETTING_NAME: {
+            'LOG': str(log_path(instance_path)),
+            'DUPLICATE_THRESHOLD': config.getint(_section, 'duplicate_threshold',
+                                                 fallback=DEFAULT_DUPLICATE_THRESHOLD),
+            'MAX_BYTES': (config.getint(_section, 'max_size', fallback=DEFAULT_MAX_SIZE) *
+                          1024 * 1024),
+            'BACKUPS': config.getint(_section, 'backups', fallback=DEFAULT_BACKUPS),
+        },
+    }
+
+
+class RotatingLog(object):
+    """
+    Append-only JSON lines log, rotated to ``.1``, ``.2``, ... when it exceeds `max_bytes`.
+    """
+
+    def __init__(self, path, max_bytes, backups):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._lock = threading.Lock()
+
+    def _rotate(self):
+        for i in range(self.backups - 1, 0, -1):
+            source = '{}.{}'.format(self.path, i)
+            if os.path.exists(source):
+                _replace(source, '{}.{}'.format(self.path, i + 1))
+        if self.backups > 0:
+            _replace(self.path, '{}.1'.format(self.path))
+        else:
+            os.remove(self.path)
+
+    def append(self, record):
+        line = json.dumps(record, sort_keys=True) + '\n'
+        with self._lock:
+            directory = os.path.dirname(self.path)
+            if not os.path.isdir(directory):
+                os.makedirs(directory)
+            try:
+                if os.path.getsize(self.path) + len(line) > self.max_bytes:
+                    self._rotate()
+            except OSError:
+                pass
+            with io.open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line)
+
+
+class QueryRecorder(object):
+    """
+    Execute wrapper that counts and times queries, by SQL text (with parameter placeholders).
+    """
+
+    def __init__(self):
+        self.queries = defaultdict(lambda: [0, 0.0])  # sql -> [count, seconds]
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.time()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            entry = self.queries[sql]
+            entry[0] += 1
+            entry[1] += time.time() - start
+
+    def record(self, duplicate_threshold):
+        """
+        :return: Dict of the query statistics, for the log.
+        """
+        by_time = sorted(self.queries.items(), key=lambda item: item[1][1], reverse=True)
+        return {
+            'queries': sum(count for (count, seconds) in self.queries.values()),
+            'query_ms': round(sum(seconds for (count, seconds) in self.queries.values()) * 1000,
+                              3),
+            'top_queries': [[sql, count, round(seconds * 1000, 3)]
+                            for (sql, (count, seconds)) in by_time[:_recorded_queries]],
+            'duplicates': sorted([[sql, count] for (sql, (count, seconds)) in by_time
+                                  if count >= duplicate_threshold],
+                                 key=lambda item: item[1], reverse=True),
+        }
+
+
+class InstrumentationMiddleware(object):
+    """
+    Record each request's latency and queries in the instrumentation log.
+    """
+
+    def __init__(self, get_response):
+        from django.conf import settings
+        options = getattr(settings, SETTING_NAME)
+        self.get_response = get_response
+        self.duplicate_threshold = options['DUPLICATE_THRESHOLD']
+        self.log = RotatingLog(options['LOG'], options['MAX_BYTES'], options['BACKUPS'])
+
+    def __call__(self, request):
+        from contextlib import ExitStack
+        from django.db import connections
+
+        recorder = QueryRecorder()
+        start = time.time()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+        duration = time.time() - start
+
+        match = getattr(request, 'resolver_match', None)
+        record = {
+            'time': round(start, 3),
+            'method': request.method,
+            'path': request.path,
+            'view': (match.view_name or match._func_path) if match is not None else None,
+            'status': response.status_code,
+            'ms': round(duration * 1000, 3),
+        }
+        record.update(recorder.record(self.duplicate_threshold))
+        self.log.append(record)
+        return response
+
+
+def read_log(path, backups=DEFAULT_BACKUPS):
+    """
+    Read the records of the log at `path` and its rotated backups, oldest first.
+    """
+    records = []
+    for candidate in ['{}.{}'.format(path, i) for i in range(backups, 0, -1)] + [str(path)]:
+        try:
+            with io.open(candidate, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        continue  # A partially written line.
+        except (IOError, OSError):
+            continue
+    return records
+
+
+def percentile(values, fraction):
+    """
+    Nearest-rank percentile of `values` (which need not be sorted).
+    """
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    rank = max(1, int(math.ceil(fraction * len(ordered))))
+    return ordered[rank - 1]
+
+
+def report(records, top=10):
+    """
+    Summarise instrumentation records.
+
+    :return: List of report lines.
+    """
+    if not records:
+        return ['No requests recorded.']
+    latencies = [record['ms'] for record in records]
+    lines = ['{} requests: p50 {:.1f} ms, p95 {:.1f} ms, max {:.1f} ms'.format(
+        len(records), percentile(latencies, 0.5), percentile(latencies, 0.95), max(latencies))]
+
+    endpoints = defaultdict(list)
+    for record in records:
+        endpoints[(record['method'], record['view'] or record['path'])].append(record)
+    lines.extend(['', 'Slowest endpoints (by p95):'])
+    worst = sorted(endpoints.items(),
+                   key=lambda item: percentile([r['ms'] for r in item[1]], 0.95), reverse=True)
+    for ((method, name), group) in worst[:top]:
+        ms = [r['ms'] for r in group]
+        lines.append('  {:>9.1f} ms p95 {:>9.1f} ms p50 {:>6} requests {:>7.1f} queries  {} {}'
+                     .format(percentile(ms, 0.95), percentile(ms, 0.5), len(group),
+                             sum(r['queries'] for r in group) / len(group), method, name))
+
+    queries = defaultdict(lambda: [0, 0.0])  # sql -> [count, ms]
+    duplicates = defaultdict(lambda: [0, 0])  # sql -> [requests, max count]
+    for record in records:
+        for (sql, count, ms) in record.get('top_queries', []):
+            queries[sql][0] += count
+            queries[sql][1] += ms
+        for (sql, count) in record.get('duplicates', []):
+            duplicates[sql][0] += 1
+            duplicates[sql][1] = max(duplicates[sql][1], count)
+    if queries:
+        lines.extend(['', 'Most expensive queries (by total time):'])
+        for (sql, (count, ms)) in sorted(queries.items(), key=lambda item: item[1][1],
+                                         reverse=True)[:top]:
+            lines.append('  {:>9.1f} ms {:>7} times  {}'.format(ms, count, _shorten(sql)))
+    if duplicates:
+        lines.extend(['', 'Repeated queries (likely N+1):'])
+        for (sql, (requests, most)) in sorted(duplicates.items(), key=lambda item: item[1],
+                                              reverse=True)[:top]:
+            lines.append('  {:>6} requests, up to {:>5} times  {}'.format(
+                requests, most, _shorten(sql)))
+    return lines
+
+
+def _shorten(sql, width=120):
+    sql = ' '.join(sql.split())
+    return sql if len(sql) <= width else sql[:width - 3] + '...'
+
+
+def main_perf_report(dd, args):
+    """
+    ``django-develop perf-report``
+    """
+    parser = argparse.ArgumentParser(
+        prog='django-develop perf-report',
+        description='Summarise the request instrumentation log.')
+    parser.add_argument('--top', type=int, default=10, help='Number of endpoints and queries.')
+    options = parser.parse_args(args)
+
+    config = dd.read_config()
+    path = log_path(dd.instance_path)
+    records = read_log(path, config.getint(_section, 'backups', fallback=DEFAULT_BACKUPS))
+    if not records and not config.getboolean(_section, 'enabled', fallback=False):
+        print('Instrumentation is not enabled: set "enabled = true" in the [{}] section of '
+              'django-develop.ini.'.format(_section))
+        return
+    for line in report(records, top=options.top):
+        print(line)
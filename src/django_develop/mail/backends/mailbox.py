@@ -0,0 +1,37 @@
+"""
+An email backend that stores messages in the instance mailbox (see `django_develop.dev_mailbox`).
+
+The messages are rendered in the sending thread, and written by the mailbox's background
+writer.
+"""
+from __future__ import unicode_literals
+
+import time
+
+from django.conf import settings
+from django.core.mail.backends.base import BaseEmailBackend
+
+from django_develop import dev_mailbox
+
+
+class EmailBackend(BaseEmailBackend):
+
+    def send_messages(self, email_messages):
+        options = getattr(settings, dev_mailbox.SETTING_NAME)
+        rows = []
+        for message in email_messages:
+            try:
+                rows.append((
+                    time.time(),
+                    message.from_email or '',
+                    ', '.join(message.recipients()),
+                    message.subject or '',
+                    message.body if isinstance(message.body, str) else '',
+                    message.message().as_bytes(),
+                ))
+            except Exception:
+                if not self.fail_silently:
+                    raise
+        if rows:
+            dev_mailbox.get_writer(options['PATH'], options['MAX_MESSAGES']).put(rows)
+        return len(rows)
@@ -0,0 +1,186 @@
+"""
+Migrated template databases, to skip replaying the migration graph for fresh instance databases.
+
+When ``django-develop migrate`` creates the instance database from scratch, a copy of the
+migrated database is saved as a template in the ``migration-templates`` directory of the instance
+directory, keyed by a fingerprint of the migration files of the ``INSTALLED_APPS``.
+The next time the instance database is created from scratch with the same migrations, the
+template is copied into place instead of migrating.
+
+Templates are configured in the ``[migrations]`` section of ``django-develop.ini``::
+
+    [migrations]
+    template_cache = true
+    # Keep at most this many templates, and at most this many MiB of them.
+    max_templates = 5
+    max_templates_size = 1024
+
+Templates that were least recently used are evicted first.
+"""
+from __future__ import print_function, unicode_literals
+
+import hashlib
+import importlib
+import os
+import sys
+
+from django_develop import snapshots, sqlite
+
+
+DEFAULT_MAX_TEMPLATES = 5
+
+DEFAULT_MAX_TEMPLATES_SIZE = 1024  # MiB
+
+_section = 'migrations'
+
+# Options that don't affect the resulting database.
+_cacheable_options = {
+    '--no-input',
+    '--noinput',
+    '--skip-checks',
+}
+
+_suffix = '.sqlite3'
+
+
+def is_cacheable(args):
+    """
+    Are `args` the arguments of a plain ``migrate`` command, which a template can stand in for?
+    """
+    return all(arg in _cacheable_options for arg in args)
+
+
+def templates_path(instance_path):
+    return instance_path / 'migration-templates'
+
+
+def migrations_fingerprint(migration_modules):
+    """
+    Hash the names and contents of the migration files of the given migrations modules.
+
+    :param migration_modules: List of (app label, migrations module name or None)
+    :rtype: str
+    """
+    h = hashlib.sha256()
+    for (label, module_name) in migration_modules:
+        h.update('app {} {}\n'.format(label, module_name).encode('utf-8'))
+        if module_name is None:
+            continue
+        try:
+            module = importlib.import_module(module_name)
+        except ImportError:
+            continue
+        for directory in sorted(getattr(module, '__path__', [])):
+            for (dirpath, dirnames, filenames) in os.walk(directory):
+                dirnames[:] = sorted(name for name in dirnames if name != '__pycache__')
+                for name in sorted(filenames):
+                    if not name.endswith('.py'):
+                        continue
+                    path = os.path.join(dirpath, name)
+                    h.update('file {}\n'.format(os.path.relpath(path, directory)).encode('utf-8'))
+                    with open(path, 'rb') as f:
+                        h.update(hashlib.sha256(f.read()).digest())
+    return h.hexdigest()
+
+
+def current_fingerprint():
+    """
+    Fingerprint the migrations of the installed apps, and the Django version.
+
+    This requires `django.setup()`.
+    """
+    import django
+    from django.apps import apps
+    from django.db.migrations.loader import MigrationLoader
+
+    migration_modules = []
+    for app_config in apps.get_app_configs():
+        (module_name, explicit) = MigrationLoader.migrations_module(app_config.label)
+        migration_modules.append((app_config.label, module_name))
+    data = '{} {}'.format(django.get_version(), migrations_fingerprint(migration_modules))
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+
+def evict(directory, max_templates, max_size, keep=None):
+    """
+    Remove the least recently used templates in `directory` beyond the given limits.
+
+    :param max_size: Total size in bytes.
+    :param keep: Path of a template to keep regardless.
+    :return: List of removed paths.
+    """
+    if not directory.exists():
+        return []
+    templates = sorted(
+        ((path.stat(), path) for path in directory.iterdir() if path.name.endswith(_suffix)),
+        key=lambda item: item[0].st_mtime, reverse=True)
+
+    removed = []
+    (count, size) = (0, 0)
+    for (st, path) in templates:
+        if path == keep or (count < max_templates and size + st.st_size <= max_size):
+            count += 1
+            size += st.st_size
+        else:
+            sqlite.remove_database(path)
+            removed.append(path)
+    return removed
+
+
+def eviction_limits(config):
+    """
+    Return the configured template limits, as keyword arguments for `evict()`.
+
+    :type config: configparser.RawConfigParser
+    """
+    return {
+        'max_templates': config.getint(_section, 'max_templates',
+                                       fallback=DEFAULT_MAX_TEMPLATES),
+        'max_size': config.getint(_section, 'max_templates_size',
+                                  fallback=DEFAULT_MAX_TEMPLATES_SIZE) * 1024 * 1024,
+    }
+
+
+def migrate(dd, args, execute):
+    """
+    Run ``migrate`` with `execute`, or create the instance database from a template instead.
+
+    :param dd: `django_develop.cli.DjangoDevelop`, with the dev settings activated.
+    :param args: The ``migrate`` command's arguments.
+    :param execute: Callable that runs the ``migrate`` command.
+    :return: "template" if the database was created from a template, otherwise "migrated".
+    """
+    config = dd.read_config()
+    from django.conf import settings
+    db_path = snapshots.database_path(dd.instance_path)
+    if not (is_cacheable(args) and
+            config.getboolean(_section, 'template_cache', fallback=True) and
+            settings.DATABASES.get('default', {}).get('NAME') == str(db_path)):
+        execute()
+        return 'migrated'
+
+    import django
+    django.setup()
+    directory = templates_path(dd.instance_path)
+    template = directory / (current_fingerprint() + _suffix)
+
+    fresh = not db_path.exists() or db_path.stat().st_size == 0
+    if fresh and template.exists():
+        method = sqlite.copy_database(template, db_path)
+        os.utime(str(template), None)  # Mark as recently used.
+        print('Created {} from migration template {} ({})'.format(
+            db_path.name, template.name[:12], method))
+        return 'template'
+
+    execute()
+
+    if fresh:
+        try:
+            if not directory.exists():
+                directory.mkdir(parents=True)
+            sqlite.copy_database(db_path, template)
+            evict(directory, keep=template, **eviction_limits(config))
+        except Exception as e:
+            print('django-develop warning: cannot save migration template ({}: {})'.format(
+                type(e).__name__, e), file=sys.stderr)
+    return 'migrated'
@@ -0,0 +1,229 @@
+"""
+Per-instance settings override layers, applied on top of the base settings module.
+
+Overrides come from two places in ``django-develop.ini``, in increasing order of precedence:
+
+1. Override modules, listed in the ``override_modules`` option of the ``[django-develop]`` section.
+   Their uppercase names override the base settings, like in a settings module that does
+   ``from base_settings import *``.
+2. The ``[overrides]`` section. Values are Python literals, or ``import:dotted.path.name``
+   to import an object.
+
+For example::
+
+    [django-develop]
+    base_settings_module = my_app.settings
+    override_modules = my_app.dev_overrides
+
+    [overrides]
+    DEBUG = False
+    MIDDLEWARE = ['django.middleware.common.CommonMiddleware']
+    TEST_RUNNER = import:my_app.testing.FAST_RUNNER
+
+Override values are lazy: they are only evaluated (and override modules only imported) when the
+setting is first read from `django_develop.dev_settings`, and they are not saved in settings
+snapshots.
+
+This module also has the building blocks of `django_develop.dev_settings`'s layered view:
+layers are mappings of setting names to values, looked up in order of precedence.
+"""
+from __future__ import unicode_literals
+
+import ast
+import importlib
+import io
+
+from attr import attributes, attr
+
+from django_develop import static_analysis
+
+
+_import_prefix = 'import:'
+
+_missing = object()
+
+
+@attributes
+class Lazy(object):
+    """
+    A setting value that is computed when first read.
+    """
+
+    description = attr()  # type: str
+    thunk = attr(repr=False)
+
+    def resolve(self):
+        if not hasattr(self, '_value'):
+            self._value = self.thunk()
+        return self._value
+
+
+@attributes
+class ModuleLayer(object):
+    """
+    A settings layer that reads a module's uppercase names on demand, without copying them.
+
+    :param hidden: Names to leave to lower layers.
+    """
+
+    module = attr()
+    hidden = attr(convert=frozenset, default=frozenset())  # type: frozenset
+
+    def keys(self):
+        return [name for name in dir(self.module) if name.isupper() and name not in self.hidden]
+
+    def items(self):
+        module = self.module
+        return [(name, getattr(module, name)) for name in self.keys()]
+
+    def get(self, name, default=None):
+        if not name.isupper() or name in self.hidden:
+            return default
+        return getattr(self.module, name, default)
+
+    def __contains__(self, name):
+        return self.get(name, _missing) is not _missing
+
+    def __getitem__(self, name):
+        value = self.get(name, _missing)
+        if value is _missing:
+            raise KeyError(name)
+        return value
+
+
+def lookup(layers, name):
+    """
+    Look up `name` in the first layer that has it, evaluating `Lazy` values.
+
+    :param layers: Mappings, in decreasing order of precedence.
+    :raise KeyError: if no layer has `name`.
+    """
+    for layer in layers:
+        value = layer.get(name, _missing)
+        if value is not _missing:
+            return value.resolve() if isinstance(value, Lazy) else value
+    raise KeyError(name)
+
+
+def names(layers):
+    """
+    Return the set of names in `layers`, without evaluating their values.
+    """
+    return {name for layer in layers for name in layer.keys()}
+
+
+def merge(layers, into=None):
+    """
+    Flatten `layers` into a single dict, evaluating `Lazy` values.
+
+    :param into: Dict to update, instead of a new one.
+    """
+    merged = {} if into is None else into
+    # Lowest precedence first, so that higher layers overwrite lower ones.
+    for layer in reversed(layers):
+        merged.update(layer.items())
+    for name in [name for (name, value) in merged.items() if isinstance(value, Lazy)]:
+        merged[name] = merged[name].resolve()
+    return merged
+
+
+def prepend_middleware(layers, name):
+    """
+    Return the ``MIDDLEWARE`` setting of `layers`, with `name` in front (and not repeated).
+
+    :raise ValueError: If the layers use old-style ``MIDDLEWARE_CLASSES`` instead.
+    """
+    def get(setting):
+        try:
+            return lookup(layers, setting)
+        except KeyError:
+            return None
+
+    middleware = get('MIDDLEWARE')
+    if middleware is None and get('MIDDLEWARE_CLASSES'):
+        # Setting MIDDLEWARE would make Django ignore all of MIDDLEWARE_CLASSES.
+        raise ValueError('the settings use MIDDLEWARE_CLASSES, and only MIDDLEWARE is supported')
+    return [name] + [entry for entry in middleware or [] if entry != name]
+
+
+def _import_object(path):
+    (module_name, _, name) = path.rpartition('.')
+    if not module_name:
+        raise ValueError('Expected a dotted path, not {!r}'.format(path))
+    return getattr(importlib.import_module(module_name), name)
+
+
+def parse_value(text):
+    """
+    Evaluate an ``[overrides]`` value.
+    """
+    text = text.strip()
+    if text.startswith(_import_prefix):
+        return _import_object(text[len(_import_prefix):].strip())
+    return ast.literal_eval(text)
+
+
+def _config_value(name, text):
+    def thunk():
+        try:
+            return parse_value(text)
+        except (ValueError, SyntaxError) as e:
+            raise ValueError('Invalid value for {} in the [overrides] section of '
+                             'django-develop.ini: {}'.format(name, e))
+    return Lazy('[overrides] {}'.format(name), thunk)
+
+
+def config_layer(config):
+    """
+    Return the override layer of the ``[overrides]`` section.
+
+    :type config: configparser.RawConfigParser
+    :return: Dict of setting names to `Lazy` values.
+    """
+    if not config.has_section('overrides'):
+        return {}
+    # RawConfigParser lowercases option names.
+    return {name.upper(): _config_value(name.upper(), text)
+            for (name, text) in config.items('overrides')}
+
+
+def _module_value(module_name, name):
+    return Lazy('{}.{}'.format(module_name, name),
+                lambda: getattr(importlib.import_module(module_name), name))
+
+
+def module_layer(module_name):
+    """
+    Return the override layer of an override module.
+
+    The module's uppercase names are found by parsing its source, so that importing it can be
+    deferred. If that's inconclusive, the module is imported right away.
+
+    :return: Dict of setting names to values, which may be `Lazy`.
+    """
+    source_path = static_analysis.find_module_source(module_name)
+    if source_path is not None:
+        try:
+            with io.open(source_path, 'rb') as f:
+                tree = ast.parse(f.read(), source_path)
+        except (IOError, OSError, SyntaxError, ValueError, TypeError):
+            pass  # Let the import report these.
+        else:
+            (names, conclusive) = static_analysis.analyse_module(tree)
+            if conclusive:
+                return {name: _module_value(module_name, name)
+                        for name in names if name.isupper()}
+
+    module = importlib.import_module(module_name)
+    return {name: getattr(module, name) for name in dir(module) if name.isupper()}
+
+
+def layers_from_config(config):
+    """
+    Return the override layers, in decreasing order of precedence.
+
+    :rtype: list of dict
+    """
+    module_names = config.get('django-develop', 'override_modules', fallback='').split()
+    return [config_layer(config)] + [module_layer(module_name)
+                                     for module_name in reversed(module_names)]
@@ -0,0 +1,229 @@
+"""
+Startup profiling for the django-develop entry point.
+
+Enable this with ``django-develop --profile-startup ...``, or by setting the
+``DJANGO_DEVELOP_PROFILE_STARTUP`` environment variable.
+This records the time spent in each startup phase, and an ``-X importtime``-style tree of the
+imports triggered by the base settings module, writes them as JSON to ``startup-profile.json``
+in the instance directory, and prints a short summary to standard error.
+"""
+from __future__ import print_function, unicode_literals
+
+import io
+import json
+import os
+import sys
+from contextlib import contextmanager
+from timeit import default_timer
+
+if sys.version_info < (3,):
+    import __builtin__ as builtins
+else:
+    import builtins
+
+
+ENVIRONMENT_VARIABLE = 'DJANGO_DEVELOP_PROFILE_STARTUP'
+
+FLAG = '--profile-startup'
+
+# Number of imports to list in the summary.
+_summary_imports = 10
+
+
+def pop_profile_startup_flag(argv):
+    """
+    Check for, and remove, the startup profiling flag in `argv` (in-place).
+
+    The environment variable enables profiling as well.
+
+    :rtype: bool
+    """
+    enabled = os.environ.get(ENVIRONMENT_VARIABLE, '') not in ('', '0')
+    while FLAG in argv[1:]:
+        argv.remove(FLAG)
+        enabled = True
+    return enabled
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 3)
+
+
+def _resolve_import_name(name, globals, level):
+    if level == 0 or not globals:
+        return name
+    package = globals.get('__package__') or globals.get('__name__', '')
+    if '__path__' not in globals and not globals.get('__package__'):
+        package = package.rpartition('.')[0]
+    for _ in range(level - 1):
+        package = package.rpartition('.')[0]
+    return '{}.{}'.format(package, name) if name else package
+
+
+class _ImportTracer(object):
+    """
+    A `builtins.__import__` wrapper that times imports of modules not already loaded.
+
+    Each traced import becomes a node of the tree: {'module', 'self_ms', 'cumulative_ms',
+    'children'}.
+    """
+
+    def __init__(self, original_import, root):
+        self.original_import = original_import
+        self.stack = [root]
+
+    def _needs_loading(self, fullname, fromlist):
+        module = sys.modules.get(fullname)
+        if module is None:
+            return True
+        return bool(fromlist) and hasattr(module, '__path__') and any(
+            '{}.{}'.format(fullname, name) not in sys.modules and not hasattr(module, name)
+            for name in fromlist if name != '*')
+
+    def __call__(self, name, globals=None, locals=None, fromlist=(), level=0):
+        fullname = _resolve_import_name(name, globals, level)
+        if not self._needs_loading(fullname, fromlist):
+            return self.original_import(name, globals, locals, fromlist, level)
+
+        node = {'module': fullname, 'children': []}
+        self.stack[-1]['children'].append(node)
+        self.stack.append(node)
+        start = default_timer()
+        try:
+            return self.original_import(name, globals, locals, fromlist, level)
+        finally:
+            _finish_node(node, default_timer() - start)
+            self.stack.pop()
+
+
+def _finish_node(node, seconds):
+    node['cumulative_ms'] = _ms(seconds)
+    node['self_ms'] = round(node['cumulative_ms'] -
+                            sum(child['cumulative_ms'] for child in node['children']), 3)
+
+
+def _flatten(nodes):
+    for node in nodes:
+        yield node
+        for child in _flatten(node['children']):
+            yield child
+
+
+class StartupProfiler(object):
+    """
+    Collects startup phase timings and import trees.
+    """
+
+    def __init__(self):
+        self.phases = []  # [{'name', 'parent', 'ms'}]
+        self.imports = []  # Import tree roots
+        self._current_phase = None
+
+    @contextmanager
+    def phase(self, name):
+        """
+        Time a startup phase. Phases nested in others are recorded with their parent's name.
+        """
+        record = {'name': name, 'parent': self._current_phase}
+        self.phases.append(record)
+        (parent, self._current_phase) = (self._current_phase, name)
+        start = default_timer()
+        try:
+            yield
+        finally:
+            record['ms'] = _ms(default_timer() - start)
+            self._current_phase = parent
+
+    @contextmanager
+    def trace_imports(self, name):
+        """
+        Record the tree of imports triggered while importing `name` in this context.
+        """
+        root = {'module': name, 'children': []}
+        self.imports.append(root)
+        tracer = _ImportTracer(builtins.__import__, root)
+        builtins.__import__ = tracer
+        start = default_timer()
+        try:
+            yield
+        finally:
+            builtins.__import__ = tracer.original_import
+            _finish_node(root, default_timer() - start)
+
+    def execute(self, utility):
+        """
+        Run `utility.execute()` as a phase, timing the `django.setup()` call within it separately.
+
+        :type utility: django.core.management.ManagementUtility
+        """
+        import django
+        original_setup = django.setup
+
+        def setup(*args, **kwargs):
+            with self.phase('django.setup()'):
+                return original_setup(*args, **kwargs)
+
+        django.setup = setup
+        try:
+            with self.phase('execute'):
+                utility.execute()
+        finally:
+            django.setup = original_setup
+
+    def as_dict(self):
+        return {
+            'argv': list(sys.argv),
+            'phases': self.phases,
+            'imports': self.imports,
+        }
+
+    def write(self, path):
+        with io.open(str(path), 'w', encoding='utf-8') as f:
+            f.write(json.dumps(self.as_dict(), indent=2, sort_keys=True))
+
+    def summary_lines(self):
+        lines = ['Startup phases:']
+        depths = {None: 0}
+        for record in self.phases:
+            depth = depths.get(record['parent'], 0) + 1
+            depths[record['name']] = depth
+            lines.append('{}{:<{}} {:>10.1f} ms'.format(
+                '  ' * depth, record['name'], 32 - 2 * depth, record.get('ms', 0)))
+
+        heaviest = sorted((node for root in self.imports for node in _flatten(root['children'])),
+                          key=lambda node: node['cumulative_ms'], reverse=True)
+        if heaviest:
+            lines.append('Heaviest imports (cumulative / self):')
+            for node in heaviest[:_summary_imports]:
+                lines.append('  {:<30} {:>10.1f} ms {:>10.1f} ms'.format(
+                    node['module'], node['cumulative_ms'], node['self_ms']))
+        return lines
+
+    def report(self, path):
+        """
+        Write the profile to `path`, and print a summary to standard error.
+        """
+        self.write(path)
+        for line in self.summary_lines():
+            print(line, file=sys.stderr)
+        print('Startup profile written to {}'.format(path), file=sys.stderr)
+
+
+class NullProfiler(object):
+    """
+    A `StartupProfiler` stand-in that records nothing.
+    """
+
+    @contextmanager
+    def phase(self, name):
+        yield
+
+    @contextmanager
+    def trace_imports(self, name):
+        yield
+
+    def execute(self, utility):
+        utility.execute()
+
+    def report(self, path):
+        pass
@@ -0,0 +1,402 @@
+"""
+``runserver`` autoreloading scoped to the project's source roots.
+
+Django's ``StatReloader`` polls every module in ``sys.modules`` (and every template directory)
+once per second, which includes thousands of files in the virtualenv's site-packages that never
+change. For ``django-develop runserver``, this replaces Django's reloader with one that only
+watches files under the project's source roots:
+
+* ``inotify`` (the default on Linux, through ctypes): no polling at all;
+* ``stat``: Django's ``StatReloader``, restricted to the same files.
+
+The source roots are worked out from the base settings module's location: the ``sys.path`` entry
+it is imported from, or its top-level package directory if that entry is site-packages.
+The instance directory (with ``db.sqlite3``, ``static_files``, and ``media_files``), the Python
+installation and virtualenv, site-packages, and VCS and cache directories are always excluded.
+
+This is configured in the ``[reloader]`` section of ``django-develop.ini``::
+
+    [reloader]
+    # auto (inotify where available, otherwise stat), inotify, stat, or django (Django's own)
+    backend = auto
+    # Extra directories to watch, one per line.
+    watch = /path/to/shared/templates
+    # Directories to exclude: paths, or name patterns matched against each directory name.
+    exclude =
+        node_modules
+        /path/to/project/docs
+"""
+from __future__ import print_function, unicode_literals
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import site
+import struct
+import sys
+import sysconfig
+from fnmatch import fnmatchcase
+from pathlib import Path
+
+from attr import attributes, attr
+
+from django_develop import static_analysis, utils
+
+
+BACKEND_CHOICES = ('auto', 'inotify', 'stat', 'django')
+
+_section = 'reloader'
+
+# Directory names that are never watched.
+_excluded_names = ('.git', '.hg', '.svn', '.tox', '.nox', '__pycache__', 'node_modules')
+
+# inotify(7) constants.
+_IN_ATTRIB = 0x00000004
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_DELETE_SELF = 0x00000400
+_IN_MOVE_SELF = 0x00000800
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ONLYDIR = 0x01000000
+_IN_ISDIR = 0x40000000
+_IN_CLOEXEC = 0o2000000
+_IN_NONBLOCK = 0o4000
+
+_watch_mask = (_IN_ATTRIB | _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE |
+               _IN_DELETE | _IN_DELETE_SELF | _IN_MOVE_SELF | _IN_ONLYDIR)
+
+# struct inotify_event: int wd; uint32_t mask, cookie, len; char name[len];
+_event_header = struct.Struct(str('iIII'))
+
+
+def _load_libc():
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        libc.inotify_init1
+        libc.inotify_add_watch
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+
+class Inotify(object):
+    """
+    Minimal ctypes binding for Linux's inotify: watch directories, and read change events.
+    """
+
+    def __init__(self):
+        self._libc = _load_libc()
+        if self._libc is None:
+            raise OSError(errno.ENOSYS, 'inotify is not available')
+        self._fd = self._libc.inotify_init1(_IN_CLOEXEC | _IN_NONBLOCK)
+        if self._fd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error))
+        self._paths = {}  # watch descriptor -> directory path
+
+    def fileno(self):
+        return self._fd
+
+    def add_watch(self, directory):
+        """
+        Watch `directory` (not recursively).
+
+        :return: False if the directory can't be watched (for example, if it doesn't exist).
+        """
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), _watch_mask)
+        if wd < 0:
+            return False
+        self._paths[wd] = directory
+        return True
+
+    def read_events(self):
+        """
+        Read the pending events, without blocking.
+
+        :return: List of (path, mask). On queue overflow, the path is None.
+        """
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except OSError as e:
+            if e.errno in (errno.EAGAIN, errno.EINTR):
+                return []
+            raise
+        events = []
+        offset = 0
+        while offset < len(data):
+            (wd, mask, _cookie, length) = _event_header.unpack_from(data, offset)
+            offset += _event_header.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+            offset += length
+            if mask & _IN_Q_OVERFLOW:
+                events.append((None, mask))
+                continue
+            directory = self._paths.get(wd)
+            if mask & _IN_IGNORED:
+                self._paths.pop(wd, None)
+            if directory is not None:
+                events.append((os.path.join(directory, name) if name else directory, mask))
+        return events
+
+    def close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+def inotify_available():
+    return sys.platform.startswith('linux') and _load_libc() is not None
+
+
+def _site_packages_dirs():
+    paths = sysconfig.get_paths()
+    dirs = {paths['purelib'], paths['platlib']}
+    if hasattr(site, 'getsitepackages'):  # Not in old virtualenv's site.py
+        dirs.update(site.getsitepackages())
+    if hasattr(site, 'getusersitepackages'):
+        dirs.add(site.getusersitepackages())
+    return {os.path.realpath(d) for d in dirs}
+
+
+def _is_environment_path(path, site_dirs):
+    return utils._is_stdlib_path_entry(path) or any(utils._is_within(path, d) for d in site_dirs)
+
+
+@attributes
+class WatchScope(object):
+    """
+    The directories to watch files in, and the directories and names to exclude.
+    """
+
+    roots = attr(convert=tuple)  # type: Tuple[str, ...]
+    excluded_paths = attr(convert=tuple, default=())  # type: Tuple[str, ...]
+    excluded_names = attr(convert=tuple, default=_excluded_names)  # type: Tuple[str, ...]
+
+    def _excluded_name(self, path, root):
+        relative = os.path.relpath(path, root)
+        return any(fnmatchcase(part, pattern)
+                   for part in relative.split(os.sep) for pattern in self.excluded_names)
+
+    def includes(self, path):
+        """
+        Check whether `path` (a file or directory) is in scope.
+        """
+        path = os.path.abspath(str(path))
+        for root in self.roots:
+            if utils._is_within(path, root):
+                # Exclusions only apply within the root: a project installed into
+                # site-packages is still watched.
+                return not (self._excluded_name(path, root) or any(
+                    utils._is_within(path, excluded) and not utils._is_within(root, excluded)
+                    for excluded in self.excluded_paths))
+        return False
+
+
+def source_roots(base_settings_module, site_dirs=None):
+    """
+    Work out the project's source roots from the location of `base_settings_module`.
+
+    This does not import the module.
+
+    :return: List of directory paths (empty if the module can't be found)
+    """
+    if site_dirs is None:
+        site_dirs = _site_packages_dirs()
+    top = base_settings_module.split('.')[0]
+    for sys_path_entry in sys.path:
+        if static_analysis.find_module_source(base_settings_module, [sys_path_entry]) is None:
+            continue
+        entry = os.path.realpath(sys_path_entry or os.curdir)
+        if _is_environment_path(entry, site_dirs):
+            # Installed into the environment: only the settings module's own package.
+            package = os.path.join(entry, top)
+            return [package] if os.path.isdir(package) else []
+        return [entry]
+    return []
+
+
+def _config_lines(config, option):
+    return [line.strip() for line in config.get(_section, option, fallback='').splitlines()
+            if line.strip()]
+
+
+def scope_from_config(instance_path, config):
+    """
+    Build the `WatchScope` for the instance's base settings module and ``[reloader]`` config.
+    """
+    site_dirs = _site_packages_dirs()
+    base_settings_module = config.get('django-develop', 'base_settings_module')
+    roots = source_roots(base_settings_module, site_dirs)
+    roots.extend(os.path.abspath(os.path.expanduser(path))
+                 for path in _config_lines(config, 'watch'))
+
+    excluded_paths = [os.path.abspath(str(instance_path)), os.path.realpath(sys.prefix),
+                      os.path.realpath(sys.base_prefix if hasattr(sys, 'base_prefix') else
+                                       sys.prefix)]
+    excluded_paths.extend(sorted(site_dirs))
+    excluded_names = list(_excluded_names)
+    for pattern in _config_lines(config, 'exclude'):
+        if os.sep in pattern or pattern.startswith('~'):
+            excluded_paths.append(os.path.abspath(os.path.expanduser(pattern)))
+        else:
+            excluded_names.append(pattern)
+    return WatchScope(roots, excluded_paths, excluded_names)
+
+
+def _scoped_reloader_classes():
+    """
+    Define the reloader classes (this imports Django's autoreload module).
+    """
+    from django.utils import autoreload
+
+    class ScopedStatReloader(autoreload.StatReloader):
+        """
+        Django's ``StatReloader``, only polling files in scope.
+        """
+
+        scope = None  # type: WatchScope
+
+        def watched_files(self, include_globs=True):
+            for path in super(ScopedStatReloader, self).watched_files(include_globs=False):
+                if self.scope.includes(path):
+                    yield path
+            if include_globs:
+                for (directory, patterns) in self.directory_globs.items():
+                    if self.scope.includes(directory):
+                        for pattern in patterns:
+                            for path in directory.glob(pattern):
+                                yield path
+
+    class InotifyReloader(autoreload.BaseReloader):
+        """
+        Reload on inotify events for files in scope, without polling.
+        """
+
+        scope = None  # type: WatchScope
+        SLEEP_TIME = 1  # Wake up to check for stopping, and newly imported modules.
+
+        def __init__(self):
+            super(InotifyReloader, self).__init__()
+            self._inotify = None
+            self._files = set()
+            self._globbed = {}  # directory -> patterns
+            self._watch_key = None
+
+        @classmethod
+        def check_availability(cls):
+            if not inotify_available():
+                raise autoreload.WatchmanUnavailable('inotify is not available')
+            return True
+
+        def _add_tree(self, directory):
+            for (dirpath, dirnames, _filenames) in os.walk(directory):
+                dirnames[:] = [name for name in dirnames
+                               if self.scope.includes(os.path.join(dirpath, name))]
+                self._inotify.add_watch(dirpath)
+
+        def update_watches(self):
+            """
+            Watch the directories of the files in scope, if the watched files may have changed.
+            """
+            key = (len(sys.modules), len(self.extra_files),
+                   sum(len(patterns) for patterns in self.directory_globs.values()))
+            if key == self._watch_key:
+                return
+            self._watch_key = key
+            files = {str(path) for path in self.watched_files(include_globs=False)}
+            globbed = {str(directory): tuple(patterns)
+                       for (directory, patterns) in self.directory_globs.items()}
+            for path in files - self._files:
+                if self.scope.includes(path):
+                    self._inotify.add_watch(os.path.dirname(path))
+            for directory in set(globbed) - set(self._globbed):
+                if self.scope.includes(directory):
+                    self._add_tree(directory)
+            self._files = {path for path in files if self.scope.includes(path)}
+            self._globbed = {directory: patterns for (directory, patterns) in globbed.items()
+                             if self.scope.includes(directory)}
+
+        def is_watched(self, path):
+            if path in self._files:
+                return True
+            for (directory, patterns) in self._globbed.items():
+                if utils._is_within(path, directory) and path != directory:
+                    relative = Path(os.path.relpath(path, directory))
+                    if any(relative.match(pattern) for pattern in patterns):
+                        return True
+            return False
+
+        def process_events(self, events):
+            changed = []
+            for (path, mask) in events:
+                if path is None:
+                    # Events were lost: reload to be safe.
+                    autoreload.trigger_reload('inotify event queue overflow')
+                elif mask & _IN_ISDIR:
+                    if mask & (_IN_CREATE | _IN_MOVED_TO) and self.scope.includes(path) and any(
+                            utils._is_within(path, d) for d in self._globbed):
+                        self._add_tree(path)
+                elif path not in changed and self.is_watched(path):
+                    changed.append(path)
+            for path in changed:
+                self.notify_file_changed(Path(path))
+
+        def tick(self):
+            self._inotify = Inotify()
+            try:
+                while True:
+                    self.update_watches()
+                    (readable, _, _) = select.select([self._inotify], [], [], self.SLEEP_TIME)
+                    if readable:
+                        self.process_events(self._inotify.read_events())
+                    yield
+            finally:
+                self._inotify.close()
+
+    return (ScopedStatReloader, InotifyReloader)
+
+
+def get_reloader(instance_path, config):
+    """
+    Return the reloader to use for ``runserver``, or None to use Django's own.
+
+    :raise ValueError: For an unknown backend in the config.
+    """
+    backend = config.get(_section, 'backend', fallback='auto')
+    if backend not in BACKEND_CHOICES:
+        raise ValueError('Unknown reloader backend {!r} in django-develop.ini '
+                         '(choose from: {})'.format(backend, ', '.join(BACKEND_CHOICES)))
+    if backend == 'django':
+        return None
+    scope = scope_from_config(instance_path, config)
+    if not scope.roots:
+        print("django-develop warning: cannot locate the project's source roots, "
+              "using Django's reloader", file=sys.stderr)
+        return None
+    (ScopedStatReloader, InotifyReloader) = _scoped_reloader_classes()
+    if backend == 'inotify' or (backend == 'auto' and inotify_available()):
+        reloader = InotifyReloader()
+    else:
+        reloader = ScopedStatReloader()
+    reloader.scope = scope
+    return reloader
+
+
+def install(dd):
+    """
+    Make ``runserver`` use the scoped reloader, if configured.
+
+    :param dd: `django_develop.cli.DjangoDevelop`
+    :return: The reloader, or None if Django's own is used.
+    """
+    reloader = get_reloader(dd.instance_path, dd.read_config())
+    if reloader is not None:
+        from django.utils import autoreload
+        autoreload.get_reloader = lambda: reloader
+    return reloader
@@ -0,0 +1,476 @@
+"""
+Opt-in sampling profiler for individual requests.
+
+When enabled, django-develop adds `ProfilingMiddleware` to the front of ``MIDDLEWARE``
+(for settings that use ``MIDDLEWARE`` rather than ``MIDDLEWARE_CLASSES``).
+Requests marked with the ``X-Django-Develop-Profile`` header, or the ``django-develop-profile``
+query parameter, are profiled by sampling their thread's stack on a timer signal
+(``setitimer()``), which costs little beyond the samples themselves.
+
+Each profile is saved in the ``profiles`` directory of the instance directory, as collapsed
+stacks (``<id>.folded``, one ``frame;frame;... count`` line per distinct stack, ready for
+``flamegraph.pl`` or speedscope) with its metadata (``<id>.json``).
+Older profiles are removed beyond ``max_profiles``.
+
+To browse and diff the captured profiles, `django_develop.dev_urls` mounts the views of
+`django_develop.request_profiling_urls` at ``/__profiles__/`` while profiling is enabled.
+Mount them in a project's URLconf with::
+
+    path('__profiles__/', include('django_develop.request_profiling_urls')),
+
+This is configured in the ``[request_profiling]`` section of ``django-develop.ini``::
+
+    [request_profiling]
+    enabled = true
+    # Sampling interval in milliseconds.
+    interval = 5
+    # "wall" samples on wall-clock time (including I/O waits), "cpu" on process CPU time.
+    clock = wall
+    max_profiles = 50
+
+The timer signal handler can only be installed from the main thread, while runserver serves
+requests from other threads, so django-develop installs it when it activates the settings
+(see `install_sampler()`). On platforms without ``setitimer()``, marked requests are served
+without profiling.
+"""
+from __future__ import print_function, division, unicode_literals
+
+import io
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+from django_develop import overrides
+
+
+# The setting that passes the configuration on to the middleware and views.
+SETTING_NAME = 'DJANGO_DEVELOP_REQUEST_PROFILING'
+
+MIDDLEWARE = 'django_develop.request_profiling.ProfilingMiddleware'
+
+HEADER = 'X-Django-Develop-Profile'
+
+QUERY_PARAMETER = 'django-develop-profile'
+
+# clock name -> (timer, signal name)
+CLOCK_CHOICES = {
+    'wall': ('ITIMER_REAL', 'SIGALRM'),
+    'cpu': ('ITIMER_PROF', 'SIGPROF'),
+}
+
+DEFAULT_INTERVAL = 5  # ms
+
+DEFAULT_MAX_PROFILES = 50
+
+_section = 'request_profiling'
+
+_profile_id_pattern = re.compile(r'^[0-9]{8}-[0-9]{6}-[0-9]{6}-[A-Za-z0-9_.-]*$')
+
+# Number of functions to list in the detail and diff views.
+_listed_functions = 50
+
+
+def profiles_path(instance_path):
+    return instance_path / 'profiles'
+
+
+def profiling_settings(instance_path, config, layers):
+    """
+    Return a settings layer that adds the profiling middleware, if enabled.
+
+    :param layers: The settings layers, in decreasing order of precedence.
+    :return: Dict of the settings to override.
+    :raise ValueError: For an unknown clock in the config.
+    """
+    if not config.getboolean(_section, 'enabled', fallback=False):
+        return {}
+    clock = config.get(_section, 'clock', fallback='wall')
+    if clock not in CLOCK_CHOICES:
+        raise ValueError('Unknown profiling clock {!r} in django-develop.ini (choose from: {})'
+                         .format(clock, ', '.join(sorted(CLOCK_CHOICES))))
+    try:
+        middleware = overrides.prepend_middleware(layers, MIDDLEWARE)
+    except ValueError as e:
+        print('django-develop warning: request profiling is disabled ({})'.format(e),
+              file=sys.stderr)
+        return {}
+    return {
+        'MIDDLEWARE': middleware,
+        SETTING_NAME: {
+            'DIRECTORY': str(profiles_path(instance_path)),
+            'INTERVAL': config.getfloat(_section, 'interval', fallback=DEFAULT_INTERVAL) / 1000,
+            'CLOCK': clock,
+            'MAX_PROFILES': config.getint(_section, 'max_profiles',
+                                          fallback=DEFAULT_MAX_PROFILES),
+        },
+    }
+
+
+def frame_name(code):
+    """
+    The collapsed-stack name of a frame's code object.
+    """
+    return '{} ({}:{})'.format(code.co_name, code.co_filename, code.co_firstlineno)
+
+
+class Sampler(object):
+    """
+    Samples the stacks of the profiled threads on a timer signal.
+
+    There is one sampler per process: the signal handler is installed once (from the main
+    thread), and the timer runs only while some thread is being profiled.
+    """
+
+    def __init__(self, interval, clock='wall'):
+        import signal
+        (timer_name, signal_name) = CLOCK_CHOICES[clock]
+        self.interval = interval
+        self._signal = signal
+        self._timer = getattr(signal, timer_name)
+        self.active = {}  # thread ident -> (stop frame, Counter of stacks)
+        self._lock = threading.Lock()
+        signal.signal(getattr(signal, signal_name), self._handle)
+
+    def _handle(self, signum, frame):
+        frames = sys._current_frames()
+        # The handler runs in the main thread, on top of the frame it interrupted.
+        frames[threading.current_thread().ident] = frame
+        for (ident, (stop, stacks)) in list(self.active.items()):
+            current = frames.get(ident)
+            names = []
+            while current is not None and current is not stop:
+                names.append(frame_name(current.f_code))
+                current = current.f_back
+            if names:
+                stacks[';'.join(reversed(names))] += 1
+
+    def start(self, stop_frame):
+        """
+        Start sampling the current thread, below `stop_frame`.
+        """
+        with self._lock:
+            self.active[threading.current_thread().ident] = (stop_frame, Counter())
+            if len(self.active) == 1:
+                self._signal.setitimer(self._timer, self.interval, self.interval)
+
+    def stop(self):
+        """
+        Stop sampling the current thread.
+
+        :return: Counter of the collapsed stacks sampled.
+        """
+        with self._lock:
+            (stop_frame, stacks) = self.active.pop(threading.current_thread().ident)
+            if not self.active:
+                self._signal.setitimer(self._timer, 0)
+        return stacks
+
+
+_sampler = None
+
+
+def get_sampler(interval, clock):
+    """
+    Return the process's `Sampler`, creating it if needed.
+
+    :raise ValueError: If the signal handler cannot be installed from this thread.
+    """
+    global _sampler
+    if _sampler is None:
+        _sampler = Sampler(interval, clock)
+    return _sampler
+
+
+def install_sampler(options):
+    """
+    Create the process's `Sampler` from the main thread, before any requests are served.
+
+    :param options: The `SETTING_NAME` setting.
+    """
+    try:
+        get_sampler(options['INTERVAL'], options['CLOCK'])
+    except (ValueError, AttributeError) as e:
+        print('django-develop warning: request profiling is unavailable ({}: {})'.format(
+            type(e).__name__, e), file=sys.stderr)
+
+
+def _slug(path):
+    return re.sub(r'[^A-Za-z0-9_.-]+', '_', path).strip('_')[:60]
+
+
+def write_profile(directory, metadata, stacks, max_profiles=DEFAULT_MAX_PROFILES):
+    """
+    Save a profile's collapsed stacks and metadata in `directory`, and evict the oldest.
+
+    :return: The profile's id.
+    """
+    started = metadata['started']
+    profile_id = '{}-{:06d}-{}'.format(time.strftime('%Y%m%d-%H%M%S', time.localtime(started)),
+                                       int(started % 1 * 1000000), _slug(metadata['path']))
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    with io.open(os.path.join(directory, profile_id + '.folded'), 'w', encoding='utf-8') as f:
+        for (stack, count) in sorted(stacks.items()):
+            f.write('{} {}\n'.format(stack, count))
+    with io.open(os.path.join(directory, profile_id + '.json'), 'w', encoding='utf-8') as f:
+        f.write(json.dumps(dict(metadata, id=profile_id), indent=2, sort_keys=True))
+
+    for old in list_profiles(directory)[max_profiles:]:
+        for suffix in ['.folded', '.json']:
+            try:
+                os.remove(os.path.join(directory, old['id'] + suffix))
+            except OSError:
+                pass
+    return profile_id
+
+
+def list_profiles(directory):
+    """
+    :return: The metadata of the saved profiles, newest first.
+    """
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return []
+    profiles = []
+    for name in sorted(names, reverse=True):
+        if name.endswith('.json') and _profile_id_pattern.match(name[:-len('.json')]):
+            try:
+                with io.open(os.path.join(directory, name), encoding='utf-8') as f:
+                    profiles.append(json.load(f))
+            except (IOError, OSError, ValueError):
+                continue
+    return profiles
+
+
+def read_stacks(directory, profile_id):
+    """
+    :return: Counter of the collapsed stacks of a saved profile.
+    :raise ValueError: For an invalid profile id.
+    """
+    if not _profile_id_pattern.match(profile_id):
+        raise ValueError('Invalid profile id {!r}'.format(profile_id))
+    stacks = Counter()
+    with io.open(os.path.join(directory, profile_id + '.folded'), encoding='utf-8') as f:
+        for line in f:
+            (stack, _, count) = line.rstrip('\n').rpartition(' ')
+            stacks[stack] += int(count)
+    return stacks
+
+
+def function_totals(stacks):
+    """
+    :return: (self samples, inclusive samples), as Counters by frame name.
+    """
+    self_samples = Counter()
+    inclusive_samples = Counter()
+    for (stack, count) in stacks.items():
+        names = stack.split(';')
+        self_samples[names[-1]] += count
+        for name in set(names):
+            inclusive_samples[name] += count
+    return (self_samples, inclusive_samples)
+
+
+def diff_stacks(base, other):
+    """
+    Compare two profiles' stacks, by the share of samples of each function.
+
+    :return: List of (frame name, base %, other %), by decreasing absolute difference.
+    """
+    totals = []
+    for stacks in [base, other]:
+        (self_samples, _) = function_totals(stacks)
+        total = sum(self_samples.values()) or 1
+        totals.append({name: 100 * count / total for (name, count) in self_samples.items()})
+    names = set(totals[0]) | set(totals[1])
+    rows = [(name, totals[0].get(name, 0.0), totals[1].get(name, 0.0)) for name in names]
+    return sorted(rows, key=lambda row: (-abs(row[2] - row[1]), row[0]))
+
+
+def diff_folded(base, other):
+    """
+    Differential collapsed stacks (``stack base_count other_count``), for ``difffolded.pl``-style
+    tools such as ``flamegraph.pl``.
+    """
+    return ''.join('{} {} {}\n'.format(stack, base.get(stack, 0), other.get(stack, 0))
+                   for stack in sorted(set(base) | set(other)))
+
+
+def _is_marked(request):
+    return (request.META.get('HTTP_' + HEADER.upper().replace('-', '_'), '') not in ('', '0') or
+            QUERY_PARAMETER in request.GET)
+
+
+class ProfilingMiddleware(object):
+    """
+    Profile the requests marked with `HEADER` or `QUERY_PARAMETER`.
+    """
+
+    def __init__(self, get_response):
+        from django.conf import settings
+        self.get_response = get_response
+        self.options = getattr(settings, SETTING_NAME)
+        # This finds the sampler that install_sampler() made, if this isn't the main thread.
+        try:
+            self.sampler = get_sampler(self.options['INTERVAL'], self.options['CLOCK'])
+        except (ValueError, AttributeError) as e:
+            print('django-develop warning: request profiling is unavailable ({}: {})'.format(
+                type(e).__name__, e), file=sys.stderr)
+            self.sampler = None
+
+    def __call__(self, request):
+        if self.sampler is None or not _is_marked(request):
+            return self.get_response(request)
+
+        started = time.time()
+        self.sampler.start(sys._getframe())
+        try:
+            response = self.get_response(request)
+        finally:
+            stacks = self.sampler.stop()
+        duration = time.time() - started
+        profile_id = write_profile(self.options['DIRECTORY'], {
+            'started': started,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'ms': round(duration * 1000, 3),
+            'samples': sum(stacks.values()),
+            'interval_ms': self.sampler.interval * 1000,
+            'clock': self.options['CLOCK'],
+        }, stacks, self.options['MAX_PROFILES'])
+        response[HEADER] = profile_id
+        return response
+
+
+# Views: see `django_develop.request_profiling_urls`.
+
+def _directory():
+    from django.conf import settings
+    from django.http import Http404
+    if not settings.DEBUG:
+        raise Http404('Profiles are only available with DEBUG enabled.')
+    options = getattr(settings, SETTING_NAME, None)
+    if options is None:
+        raise Http404('Request profiling is not enabled in django-develop.ini.')
+    return options['DIRECTORY']
+
+
+def _stacks_or_404(directory, profile_id):
+    from django.http import Http404
+    try:
+        return read_stacks(directory, profile_id)
+    except (ValueError, IOError, OSError):
+        raise Http404('No profile {!r}'.format(profile_id))
+
+
+def _page(title, body):
+    from django.http import HttpResponse
+    from django.utils.html import format_html
+    return HttpResponse(format_html(
+        '<!DOCTYPE html><html><head><title>{}</title><style>'
+        'body {{ font-family: sans-serif; }} td, th {{ padding: 0 0.5em; text-align: left; }} '
+        'td.n {{ text-align: right; }} code {{ font-size: 90%; }}'
+        '</style></head><body><h1>{}</h1>{}</body></html>', title, title, body))
+
+
+def _rows(rows):
+    from django.utils.html import format_html, format_html_join
+    return format_html('<table>{}</table>', format_html_join('', '<tr>{}</tr>', (
+        (format_html_join('', '<td class="{}">{}</td>', (
+            ('n' if isinstance(cell, (int, float)) else '', cell) for cell in row)),)
+        for row in rows)))
+
+
+def index_view(request):
+    """
+    List the saved profiles, with a form to diff two of them.
+    """
+    from django.urls import reverse
+    from django.utils.html import format_html, format_html_join
+    profiles = list_profiles(_directory())
+    if not profiles:
+        return _page('Request profiles', format_html(
+            '<p>No profiles yet: add the <code>{}</code> header or the <code>?{}</code> query '
+            'parameter to a request.</p>', HEADER, QUERY_PARAMETER))
+    rows = format_html_join('', (
+        '<tr><td><input type="radio" name="base" value="{0}"></td>'
+        '<td><input type="radio" name="other" value="{0}"></td>'
+        '<td><a href="{1}">{2}</a></td><td>{3}</td><td>{4}</td><td>{5}</td>'
+        '<td class="n">{6}</td><td class="n">{7}</td>'
+        '<td><a href="{8}">folded</a></td></tr>'), (
+        (profile['id'],
+         reverse('django_develop_profile', args=[profile['id']]),
+         time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(profile['started'])),
+         profile['method'], profile['path'], profile['status'],
+         '{:.1f} ms'.format(profile['ms']), profile['samples'],
+         reverse('django_develop_profile_folded', args=[profile['id']]))
+        for profile in profiles))
+    return _page('Request profiles', format_html(
+        '<form action="{}"><table><tr><th>base</th><th>other</th><th>started</th>'
+        '<th>method</th><th>path</th><th>status</th><th>time</th><th>samples</th><th></th></tr>'
+        '{}</table><p><input type="submit" value="Diff"></p></form>',
+        reverse('django_develop_profile_diff'), rows))
+
+
+def detail_view(request, profile_id):
+    """
+    The functions of a profile, by self samples.
+    """
+    from django.urls import reverse
+    from django.utils.html import format_html
+    stacks = _stacks_or_404(_directory(), profile_id)
+    (self_samples, inclusive_samples) = function_totals(stacks)
+    total = sum(stacks.values()) or 1
+    rows = [('self %', 'total %', 'function')] + [
+        ('{:.1f}'.format(100 * count / total),
+         '{:.1f}'.format(100 * inclusive_samples[name] / total), name)
+        for (name, count) in self_samples.most_common(_listed_functions)]
+    return _page('Profile {}'.format(profile_id), format_html(
+        '<p>{} samples. <a href="{}">Collapsed stacks</a> &middot; <a href="{}">All profiles</a>'
+        '</p>{}', sum(stacks.values()),
+        reverse('django_develop_profile_folded', args=[profile_id]),
+        reverse('django_develop_profiles'), _rows(rows)))
+
+
+def folded_view(request, profile_id):
+    """
+    A profile's collapsed stacks, as plain text.
+    """
+    from django.http import HttpResponse
+    stacks = _stacks_or_404(_directory(), profile_id)
+    return HttpResponse(''.join('{} {}\n'.format(stack, count)
+                                for (stack, count) in sorted(stacks.items())),
+                        content_type='text/plain; charset=utf-8')
+
+
+def diff_view(request):
+    """
+    Compare the profiles ``base`` and ``other`` (add ``format=folded`` for differential stacks).
+    """
+    from django.http import HttpResponse
+    from django.urls import reverse
+    from django.utils.html import format_html
+    directory = _directory()
+    (base_id, other_id) = (request.GET.get('base', ''), request.GET.get('other', ''))
+    base = _stacks_or_404(directory, base_id)
+    other = _stacks_or_404(directory, other_id)
+    if request.GET.get('format') == 'folded':
+        return HttpResponse(diff_folded(base, other), content_type='text/plain; charset=utf-8')
+    rows = [('base %', 'other %', 'change', 'function')] + [
+        ('{:.1f}'.format(base_share), '{:.1f}'.format(other_share),
+         '{:+.1f}'.format(other_share - base_share), name)
+        for (name, base_share, other_share) in diff_stacks(base, other)[:_listed_functions]]
+    return _page('Profile diff', format_html(
+        '<p><a href="{}">{}</a> ({} samples) against <a href="{}">{}</a> ({} samples), by share '
+        'of self samples. <a href="{}?base={}&amp;other={}&amp;format=folded">Differential '
+        'collapsed stacks</a> &middot; <a href="{}">All profiles</a></p>{}',
+        reverse('django_develop_profile', args=[other_id]), other_id, sum(other.values()),
+        reverse('django_develop_profile', args=[base_id]), base_id, sum(base.values()),
+        reverse('django_develop_profile_diff'), base_id, other_id,
+        reverse('django_develop_profiles'), _rows(rows)))
@@ -0,0 +1,18 @@
+"""
+The views for browsing and diffing request profiles (see `django_develop.request_profiling`).
+
+Mount these in a URLconf with ``path('__profiles__/', include(...))``.
+"""
+from django.urls import re_path
+
+from django_develop import request_profiling
+
+
+urlpatterns = [
+    re_path(r'^$', request_profiling.index_view, name='django_develop_profiles'),
+    re_path(r'^diff/$', request_profiling.diff_view, name='django_develop_profile_diff'),
+    re_path(r'^(?P<profile_id>[^/]+)/$', request_profiling.detail_view,
+            name='django_develop_profile'),
+    re_path(r'^(?P<profile_id>[^/]+)/folded/$', request_profiling.folded_view,
+            name='django_develop_profile_folded'),
+]
@@ -0,0 +1,192 @@
+"""
+Cached snapshots of django-develop's resolved dev settings.
+
+A snapshot stores the settings resolved by `DjangoDevelop.activate_dev_settings()` together with
+a fingerprint of their inputs: the source files of the modules imported by the base settings
+module, the django-develop config, `sys.path`, the ``DJANGO_*`` environment variables,
+and the other environment variables that the base settings module read (see `recording_environ()`).
+While the fingerprint still matches, the snapshot can be loaded instead of importing the base
+settings module and merging its settings again.
+"""
+from __future__ import unicode_literals
+
+import hashlib
+import io
+import json
+import os
+import pickle
+import sys
+from contextlib import contextmanager
+
+try:
+    from collections.abc import MutableMapping
+except ImportError:  # Python < 3.3
+    from collections import MutableMapping
+
+
+# Bump this to invalidate existing snapshots after format changes.
+_snapshot_version = 2
+
+# DJANGO_* environment variables that vary between invocations, but don't affect settings.
+_volatile_environ_names = {
+    'DJANGO_AUTO_COMPLETE',
+    'DJANGO_SETTINGS_MODULE',
+}
+
+# Python 2: os.replace() is not available.
+_replace = getattr(os, 'replace', os.rename)
+
+
+def snapshot_key(instance_path, config):
+    """
+    Hash the inputs of the resolved settings, other than the base settings module's sources.
+
+    :type config: configparser.RawConfigParser
+    :rtype: str
+    """
+    config_text = io.StringIO()
+    config.write(config_text)
+    environ = sorted((k, v) for (k, v) in os.environ.items()
+                     if k.startswith('DJANGO_') and k not in _volatile_environ_names)
+    data = json.dumps([
+        str(instance_path),
+        config_text.getvalue(),
+        environ,
+        list(sys.path),
+        sys.version,
+    ])
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+
+def _file_stamp(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime, st.st_size)
+
+
+def source_files(modules):
+    """
+    Return the (path, stamp) fingerprint of the given modules' files.
+    """
+    paths = {getattr(mod, '__file__', None) for mod in modules}
+    return sorted((path, _file_stamp(path)) for path in paths if path)
+
+
+class _RecordingEnviron(MutableMapping):
+    """
+    Stand-in for `os.environ` that records the names read through it.
+    """
+
+    def __init__(self, environ):
+        self.environ = environ
+        self.names = set()
+        self.read_all = False
+
+    def __getitem__(self, name):
+        self.names.add(name)
+        return self.environ[name]
+
+    def __contains__(self, name):
+        self.names.add(name)
+        return name in self.environ
+
+    def __iter__(self):
+        self.read_all = True
+        return iter(self.environ)
+
+    def __len__(self):
+        self.read_all = True
+        return len(self.environ)
+
+    def __setitem__(self, name, value):
+        self.environ[name] = value
+
+    def __delitem__(self, name):
+        del self.environ[name]
+
+    def copy(self):
+        return dict(self)
+
+
+@contextmanager
+def recording_environ():
+    """
+    Record the environment variables read through `os.environ` (or `os.getenv()`) in this context.
+
+    Modules that keep a reference to ``os.environ`` from this context keep working afterwards.
+
+    :return: Context yielding a callable, which returns the `environ_fingerprint()` of the reads.
+    """
+    environ = os.environ
+    recorder = os.environ = _RecordingEnviron(environ)
+    try:
+        yield lambda: environ_fingerprint(None if recorder.read_all else recorder.names)
+    finally:
+        os.environ = environ
+
+
+def environ_fingerprint(names):
+    """
+    :param names: Environment variable names, or None for the whole environment.
+    :return: Dict of the current values of the named variables (None if unset).
+    """
+    if names is None:
+        return dict(os.environ)
+    return {name: os.environ.get(name) for name in names}
+
+
+def environ_is_current(fingerprint):
+    """
+    Check an `environ_fingerprint()`.
+
+    :rtype: bool
+    """
+    return all(os.environ.get(name) == value for (name, value) in fingerprint.items())
+
+
+def load(path, key):
+    """
+    Load the snapshotted settings at `path`, if the snapshot exists and is still current.
+
+    :return: (dict of settings, `environ_fingerprint()` of the variables they read), or None.
+    """
+    try:
+        with io.open(str(path), 'rb') as f:
+            snapshot = pickle.load(f)
+    except Exception:
+        # Missing, corrupt, or referring to objects that can no longer be imported.
+        return None
+
+    if not (isinstance(snapshot, dict) and
+            snapshot.get('version') == _snapshot_version and
+            snapshot.get('key') == key):
+        return None
+    for (file_path, stamp) in snapshot['files']:
+        if _file_stamp(file_path) != stamp:
+            return None
+    if not environ_is_current(snapshot['environ']):
+        return None
+    return (snapshot['settings'], snapshot['environ'])
+
+
+def save(path, key, settings, files, environ):
+    """
+    Save a snapshot of `settings` to `path`.
+
+    :param files: The (path, stamp) fingerprint from `source_files()`
+    :param environ: The `environ_fingerprint()` of the variables that the settings read
+    :raise pickle.PicklingError: (or others) if the settings can't be pickled.
+    """
+    data = pickle.dumps({
+        'version': _snapshot_version,
+        'key': key,
+        'files': files,
+        'environ': environ,
+        'settings': settings,
+    }, pickle.HIGHEST_PROTOCOL)
+    temp_path = '{}.tmp'.format(path)
+    with io.open(temp_path, 'wb') as f:
+        f.write(data)
+    _replace(temp_path, str(path))
@@ -0,0 +1,127 @@
+"""
+Snapshots of the instance database: ``django-develop db-snapshot`` and ``db-restore``.
+
+Snapshots are stored in the ``snapshots`` directory of the instance directory.
+They are made and restored with `sqlite.copy_database()`, so on filesystems with copy-on-write
+support, both are near-instant, and snapshots only take disk space for the pages that differ.
+
+Stop any running servers before restoring a snapshot: connections that are still open will keep
+using the replaced database.
+"""
+from __future__ import print_function, unicode_literals
+
+import argparse
+import datetime
+import re
+
+from django_develop import sqlite
+
+
+_snapshot_name = re.compile(r'^\w[\w.-]*$')
+
+_suffix = '.sqlite3'
+
+
+class SnapshotError(Exception):
+    """
+    A snapshot operation failed, with a message for the user.
+    """
+
+
+def database_path(instance_path):
+    """
+    The path of the database django-develop generates in the instance directory.
+    """
+    return instance_path / 'db.sqlite3'
+
+
+def snapshots_path(instance_path):
+    return instance_path / 'snapshots'
+
+
+def snapshot_path(instance_path, name):
+    if not _snapshot_name.match(name):
+        raise SnapshotError('Invalid snapshot name {!r}: use letters, digits, "_", "-" and "."'
+                            .format(name))
+    return snapshots_path(instance_path) / (name + _suffix)
+
+
+def list_snapshots(instance_path):
+    """
+    :return: List of (name, path), sorted by name.
+    """
+    directory = snapshots_path(instance_path)
+    if not directory.exists():
+        return []
+    return sorted((path.name[:-len(_suffix)], path)
+                  for path in directory.iterdir() if path.name.endswith(_suffix))
+
+
+def snapshot(instance_path, name):
+    """
+    Save the instance database as snapshot `name`, replacing any existing one.
+
+    :return: The copy method used.
+    """
+    source = database_path(instance_path)
+    if not source.exists():
+        raise SnapshotError('No instance database to snapshot at {}'.format(source))
+    target = snapshot_path(instance_path, name)
+    if not target.parent.exists():
+        target.parent.mkdir(parents=True)
+    return sqlite.copy_database(source, target)
+
+
+def restore(instance_path, name):
+    """
+    Replace the instance database with snapshot `name`.
+
+    :return: The copy method used.
+    """
+    source = snapshot_path(instance_path, name)
+    if not source.exists():
+        raise SnapshotError('No snapshot named {!r}'.format(name))
+    return sqlite.copy_database(source, database_path(instance_path))
+
+
+def _print_snapshots(instance_path):
+    snapshots = list_snapshots(instance_path)
+    if not snapshots:
+        print('No snapshots.')
+    for (name, path) in snapshots:
+        st = path.stat()
+        print('{:<30} {:>10.1f} MiB  {}'.format(
+            name, st.st_size / (1024.0 * 1024),
+            datetime.datetime.fromtimestamp(st.st_mtime).strftime('%Y-%m-%d %H:%M:%S')))
+
+
+def main_snapshot(dd, args):
+    """
+    ``django-develop db-snapshot [NAME]``
+    """
+    parser = argparse.ArgumentParser(
+        prog='django-develop db-snapshot',
+        description='Save a snapshot of the instance database, or list the snapshots.')
+    parser.add_argument('name', nargs='?', help='If omitted, list the existing snapshots.')
+    options = parser.parse_args(args)
+
+    if options.name is None:
+        _print_snapshots(dd.instance_path)
+    else:
+        method = snapshot(dd.instance_path, options.name)
+        print('Saved snapshot {!r} ({})'.format(options.name, method))
+
+
+def main_restore(dd, args):
+    """
+    ``django-develop db-restore NAME``
+    """
+    parser = argparse.ArgumentParser(
+        prog='django-develop db-restore',
+        description='Replace the instance database with a snapshot. '
+                    'Stop any running servers first.')
+    parser.add_argument('name')
+    options = parser.parse_args(args)
+
+    method = restore(dd.instance_path, options.name)
+    print('Restored snapshot {!r} ({})'.format(options.name, method))
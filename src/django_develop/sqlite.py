@@ -0,0 +1,217 @@
+"""
+SQLite tuning and copying for the database django-develop generates in the instance directory.
+
+The performance profile is selected in the ``[sqlite]`` section of ``django-develop.ini``,
+and individual PRAGMAs can be overridden there too::
+
+    [sqlite]
+    # One of: default, fast (the default), unsafe
+    profile = fast
+    cache_size = -131072
+
+``default`` leaves SQLite's own defaults alone (rollback journal, synchronous FULL).
+``fast`` uses WAL journaling with synchronous NORMAL, which avoids most "database is locked"
+errors under runserver, and only risks losing the last transactions on power loss.
+``unsafe`` additionally disables syncing and journaling to disk entirely, which is only suitable
+for throwaway databases.
+
+`copy_database()` makes consistent copies of SQLite database files, using copy-on-write clones
+(reflinks) where the filesystem supports them, and SQLite's online backup API otherwise.
+"""
+from __future__ import unicode_literals
+
+import errno
+import os
+import re
+import shutil
+import sqlite3
+import sys
+
+
+# The PRAGMAs that can be configured.
+PRAGMA_NAMES = (
+    'busy_timeout',
+    'cache_size',
+    'journal_mode',
+    'mmap_size',
+    'synchronous',
+    'temp_store',
+)
+
+PROFILES = {
+    'default': {},
+    'fast': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -65536,  # KiB: 64 MiB
+        'mmap_size': 268435456,  # 256 MiB
+        'busy_timeout': 5000,  # milliseconds
+        'temp_store': 'MEMORY',
+    },
+    'unsafe': {
+        'journal_mode': 'MEMORY',
+        'synchronous': 'OFF',
+        'cache_size': -65536,
+        'mmap_size': 268435456,
+        'busy_timeout': 5000,
+        'temp_store': 'MEMORY',
+    },
+}
+
+DEFAULT_PROFILE = 'fast'
+
+_pragma_value = re.compile(r'^-?\w+$')
+
+
+def pragmas_from_config(config):
+    """
+    Return the PRAGMAs selected by the ``[sqlite]`` section of the config.
+
+    :type config: configparser.RawConfigParser
+    :raise ValueError: for unknown profiles, or invalid values.
+    :rtype: dict
+    """
+    section = 'sqlite'
+    profile = config.get(section, 'profile', fallback=DEFAULT_PROFILE)
+    if profile not in PROFILES:
+        raise ValueError('Unknown SQLite profile {!r} in django-develop.ini (choose from: {})'
+                         .format(profile, ', '.join(sorted(PROFILES))))
+
+    pragmas = dict(PROFILES[profile])
+    for name in PRAGMA_NAMES:
+        value = config.get(section, name, fallback=None)
+        if value is None:
+            continue
+        if not _pragma_value.match(value):
+            raise ValueError('Invalid SQLite {} value {!r} in django-develop.ini'
+                             .format(name, value))
+        pragmas[name] = value
+    return pragmas
+
+
+# Linux ioctl to clone a file's extents (copy-on-write), on Btrfs, XFS, and others.
+_FICLONE = 0x40049409
+
+# Python 2: os.replace() is not available.
+_replace = getattr(os, 'replace', os.rename)
+
+
+def _reflink(source_path, target_path):
+    """
+    Try to clone `source_path` to `target_path` with copy-on-write.
+
+    :return: True if cloned.
+    """
+    if not sys.platform.startswith('linux'):
+        return False
+    import fcntl
+    with open(source_path, 'rb') as source, open(target_path, 'wb') as target:
+        try:
+            fcntl.ioctl(target.fileno(), _FICLONE, source.fileno())
+            return True
+        except (IOError, OSError):
+            pass
+    os.remove(target_path)
+    return False
+
+
+def _backup(source, target_path):
+    """
+    Copy an open database to `target_path` with SQLite's online backup API.
+    """
+    if hasattr(source, 'backup'):
+        target = sqlite3.connect(target_path)
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+    else:  # Python < 3.7: copy the file while holding a write lock.
+        source.execute('BEGIN IMMEDIATE')
+        try:
+            shutil.copyfile(source.execute('PRAGMA database_list').fetchone()[2], target_path)
+        finally:
+            source.rollback()
+
+
+def remove_database(path):
+    """
+    Remove a database file, with its WAL and shared-memory files.
+    """
+    for suffix in ['', '-wal', '-shm', '-journal']:
+        try:
+            os.remove(str(path) + suffix)
+        except OSError:
+            pass
+
+
+def copy_database(source_path, target_path):
+    """
+    Consistently copy the SQLite database at `source_path` to `target_path`, replacing it.
+
+    This checkpoints the source's WAL (if any), then clones the file under a write lock if the
+    filesystem supports it, so that unchanged pages share disk space.
+    Otherwise, it uses SQLite's online backup API.
+
+    Connections that still have `target_path` open will not see the new database.
+
+    :return: The method used: "reflink" or "backup".
+    :raise IOError: if the source database does not exist.
+    """
+    (source_path, target_path) = (str(source_path), str(target_path))
+    if not os.path.isfile(source_path):
+        # Don't let sqlite3.connect() create an empty one.
+        raise IOError(errno.ENOENT, 'No such database', source_path)
+    temp_path = '{}.tmp'.format(target_path)
+    remove_database(temp_path)
+
+    source = sqlite3.connect(source_path, isolation_level=None, timeout=30)
+    try:
+        # Move everything into the main database file, and block writers while cloning it.
+        source.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        source.execute('BEGIN IMMEDIATE')
+        try:
+            wal_path = source_path + '-wal'
+            wal_empty = not os.path.exists(wal_path) or os.path.getsize(wal_path) == 0
+            method = 'reflink' if wal_empty and _reflink(source_path, temp_path) else None
+        finally:
+            source.execute('ROLLBACK')
+        if method is None:
+            _backup(source, temp_path)
+            method = 'backup'
+    finally:
+        source.close()
+
+    _replace_database(temp_path, target_path)
+    return method
+
+
+def _replace_database(temp_path, target_path):
+    remove_database(target_path)
+    _replace(temp_path, target_path)
+
+
+def backup_connection(source, target_path):
+    """
+    Copy the database of an open connection to `target_path`, replacing it.
+
+    This works for in-memory databases too.
+    """
+    target_path = str(target_path)
+    temp_path = '{}.tmp'.format(target_path)
+    remove_database(temp_path)
+    _backup(source, temp_path)
+    _replace_database(temp_path, target_path)
+
+
+def load_database(source_path, target):
+    """
+    Copy the database at `source_path` into the open connection `target`.
+    """
+    source = sqlite3.connect(str(source_path))
+    try:
+        if hasattr(source, 'backup'):
+            source.backup(target)
+        else:  # Python < 3.7
+            target.executescript('\n'.join(source.iterdump()))
+    finally:
+        source.close()
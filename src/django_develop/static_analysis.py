@@ -0,0 +1,569 @@
+"""
+Static classification of candidate settings modules, without importing them.
+
+This parses a module's source with `ast` to find the names it binds at module level,
+which is usually enough to tell a likely settings module apart from other modules.
+When it isn't (star imports, dynamic namespace manipulation, names that look like they would
+fail at import time), the result is inconclusive, and callers should fall back to
+`utils.find_potential_problems()`.
+
+Probing also reports modules that fail to import, so probes are only answered statically for
+modules that would certainly import: their imports must resolve to modules that pass the same
+check (or are already imported), and their statements must be simple enough to be sure they
+don't raise (see `_ImportCheck`).
+"""
+from __future__ import unicode_literals
+
+import ast
+import io
+import os
+import sys
+from collections import deque
+
+from django_develop import utils
+
+if sys.version_info < (3,):
+    import __builtin__ as builtins
+else:
+    import builtins
+
+
+# Names that are always defined in a module's namespace.
+_module_names = {
+    '__builtins__',
+    '__cached__',
+    '__doc__',
+    '__file__',
+    '__loader__',
+    '__name__',
+    '__package__',
+    '__path__',
+    '__spec__',
+}
+
+_builtin_names = set(dir(builtins)) | _module_names
+
+# Calls that can populate the module namespace in ways static analysis can't follow.
+_dynamic_calls = {
+    'exec',
+    'execfile',
+    'globals',
+    'locals',
+    'setattr',
+    'vars',
+}
+
+# Nodes that introduce their own scopes: their bodies don't run at module level.
+_scope_nodes = tuple(getattr(ast, name) for name in [
+    'AsyncFunctionDef',
+    'ClassDef',
+    'DictComp',
+    'FunctionDef',
+    'GeneratorExp',
+    'Lambda',
+    'ListComp',
+    'SetComp',
+] if hasattr(ast, name))
+
+# Compound statements whose bodies do run at module level.
+_block_fields = ['body', 'orelse', 'handlers', 'finalbody']
+
+
+def find_module_source(modname, path=None):
+    """
+    Locate the source file that importing `modname` from `path` would use, without importing.
+
+    This only understands plain directory path entries, and returns None otherwise
+    (for example, for modules in zip files, or without source).
+
+    :param path: Path entries to search (default: `sys.path`)
+    :rtype: str or None
+    """
+    parts = modname.split('.')
+    if not all(parts):
+        return None
+    for sys_path_entry in (sys.path if path is None else path):
+        base = os.path.join(sys_path_entry or os.curdir, *parts)
+        for source_path in [base + '.py', os.path.join(base, '__init__.py')]:
+            if os.path.isfile(source_path):
+                return source_path
+        top = os.path.join(sys_path_entry or os.curdir, parts[0])
+        if os.path.isfile(os.path.join(top, '__init__.py')) or os.path.isfile(top + '.py'):
+            # A regular package or module shadows later path entries.
+            return None
+    return None
+
+
+def _target_names(target):
+    if isinstance(target, ast.Name):
+        yield target.id
+    elif isinstance(target, (ast.Tuple, ast.List)):
+        for elt in target.elts:
+            for name in _target_names(elt):
+                yield name
+    elif hasattr(ast, 'Starred') and isinstance(target, ast.Starred):
+        for name in _target_names(target.value):
+            yield name
+
+
+def _module_level_statements(body):
+    """
+    Yield the statements that run at module level, including those in compound statements.
+    """
+    for node in body:
+        yield node
+        if isinstance(node, _scope_nodes):
+            continue
+        for field in _block_fields:
+            for child in getattr(node, field, None) or []:
+                if isinstance(child, ast.stmt):
+                    for stmt in _module_level_statements([child]):
+                        yield stmt
+                elif isinstance(child, ast.excepthandler):
+                    for stmt in _module_level_statements(child.body):
+                        yield stmt
+
+
+def _bound_names(stmt):
+    """
+    Yield the module-level names bound by a single statement.
+    """
+    if isinstance(stmt, ast.Assign):
+        for target in stmt.targets:
+            for name in _target_names(target):
+                yield name
+    elif isinstance(stmt, (ast.AugAssign, ast.For)) or (
+            hasattr(ast, 'AnnAssign') and isinstance(stmt, ast.AnnAssign)):
+        for name in _target_names(stmt.target):
+            yield name
+    elif isinstance(stmt, ast.Import):
+        for alias in stmt.names:
+            yield alias.asname or alias.name.split('.')[0]
+    elif isinstance(stmt, ast.ImportFrom):
+        for alias in stmt.names:
+            if alias.name != '*':
+                yield alias.asname or alias.name
+    elif isinstance(stmt, _scope_nodes):
+        yield stmt.name
+    elif isinstance(stmt, ast.With):
+        items = stmt.items if hasattr(stmt, 'items') else [stmt]  # Python 2: no withitem
+        for item in items:
+            if item.optional_vars is not None:
+                for name in _target_names(item.optional_vars):
+                    yield name
+    for handler in getattr(stmt, 'handlers', None) or []:
+        if isinstance(getattr(handler, 'name', None), str):
+            yield handler.name
+
+
+def _module_level_loads(node):
+    """
+    Yield the Name nodes loaded by `node` when it runs at module level,
+    skipping the bodies of nested scopes and statements.
+    """
+    for child in ast.iter_child_nodes(node):
+        if isinstance(child, (ast.stmt, ast.excepthandler) + _scope_nodes):
+            continue
+        if isinstance(child, ast.Name) and isinstance(child.ctx, ast.Load):
+            yield child
+        for name in _module_level_loads(child):
+            yield name
+
+
+def analyse_module(tree):
+    """
+    Find the names a parsed module binds at module level.
+
+    :return:
+        (names, conclusive), where `conclusive` is false if importing the module might bind other
+        names than those found, or might fail.
+    :rtype: (set, bool)
+    """
+    names = set()
+    loads = set()
+    conclusive = True
+    for stmt in _module_level_statements(tree.body):
+        names.update(_bound_names(stmt))
+        if isinstance(stmt, ast.ImportFrom) and any(a.name == '*' for a in stmt.names):
+            conclusive = False
+        if hasattr(ast, 'Exec') and isinstance(stmt, ast.Exec):  # Python 2
+            conclusive = False
+        for name in _module_level_loads(stmt):
+            loads.add(name.id)
+    if loads & _dynamic_calls:
+        conclusive = False
+    if loads - names - _builtin_names:
+        # The module would likely raise NameError on import.
+        conclusive = False
+    return (names, conclusive)
+
+
+# Kinds of values that the import check tracks. Other safe values are of kind "object".
+_str_like = frozenset(['str', 'path'])
+_numbers = frozenset(['int', 'float'])
+
+# Functions that can't raise given arguments of the right kinds (see `_call_kind()`).
+_path_functions = frozenset(['os.path.' + name for name in [
+    'abspath', 'basename', 'dirname', 'expanduser', 'normpath', 'realpath',
+]])
+_path_predicates = frozenset(['os.path.exists', 'os.path.isdir', 'os.path.isfile'])
+_str_methods = frozenset(['method:str.' + name for name in [
+    'lower', 'lstrip', 'rstrip', 'strip', 'upper',
+]])
+_path_methods = frozenset(['method:path.' + name for name in [
+    'absolute', 'expanduser', 'resolve',
+]])
+
+# Module attributes that can be read without calling them.
+_safe_attributes = frozenset(['os.environ', 'os.linesep', 'os.pathsep', 'os.sep'])
+
+# Most modules to parse while checking one candidate's imports.
+_max_checked_modules = 20
+
+
+def _call_kind(func, args):
+    """
+    Return the kind of the result of calling `func` with arguments of kinds `args`,
+    or None if the call might raise.
+
+    :param func: Dotted name of a function, or "method:<kind>.<name>" for methods.
+    """
+    if func in _path_functions:
+        return 'str' if len(args) == 1 and args[0] in _str_like else None
+    elif func in _path_predicates:
+        return 'bool' if len(args) == 1 and args[0] in _str_like else None
+    elif func == 'os.path.join':
+        return 'str' if args and all(kind in _str_like for kind in args) else None
+    elif func in ('os.environ.get', 'os.getenv'):
+        if not 1 <= len(args) <= 2 or args[0] != 'str':
+            return None
+        return 'str' if args[1:] == ['str'] else 'object'
+    elif func == 'os.getcwd':
+        return 'str' if not args else None
+    elif func in ('pathlib.Path', 'pathlib.PurePath'):
+        return 'path' if all(kind in _str_like for kind in args) else None
+    elif func in ('str', 'bool', 'repr'):
+        return func if len(args) <= 1 else None
+    elif func in ('list', 'tuple', 'set'):
+        return func if not args or (len(args) == 1 and args[0] in (
+            'str', 'list', 'tuple', 'set', 'dict')) else None
+    elif func in _str_methods:
+        return 'str' if not args or args == ['str'] else None
+    elif func == 'method:str.split':
+        return 'list' if not args or args == ['str'] else None
+    elif func in _path_methods:
+        return 'path' if not args else None
+    elif func == 'method:path.joinpath':
+        return 'path' if all(kind in _str_like for kind in args) else None
+    return None
+
+
+def _binop_kind(op, left, right):
+    if isinstance(op, ast.Add):
+        if left == right and left in ('str', 'list', 'tuple', 'int'):
+            return left
+        if left in _numbers and right in _numbers:
+            return 'float'
+    elif isinstance(op, (ast.Sub, ast.Mult)) and left in _numbers and right in _numbers:
+        return 'int' if left == right == 'int' else 'float'
+    elif isinstance(op, ast.Mult) and left in ('str', 'list', 'tuple') and right == 'int':
+        return left
+    elif isinstance(op, ast.Div) and left == 'path' and right in _str_like:
+        return 'path'
+    return None
+
+
+class _ImportCheck(object):
+    """
+    Statically check whether importing modules would succeed, and which names they would bind.
+
+    This follows a module's imports (and its parent packages) into other source modules,
+    which must pass the same check. Modules that are already imported, or built in, pass.
+
+    Top-level statements must be imports, assignments to plain names, docstrings, and
+    undecorated function definitions; and expressions are limited to the names bound so far,
+    literals, and a few calls that settings modules commonly make, such as `os.path.join()`
+    and `pathlib.Path()`. Anything else might raise, so the module fails the check.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.names = {}  # module name -> set of bound names, or None if it might fail.
+        self.checked = 0
+
+    def importable(self, modname):
+        """
+        :return: The names that importing `modname` binds (None if unknown), and whether it
+            would certainly succeed.
+        :rtype: (set or None, bool)
+        """
+        module = sys.modules.get(modname)
+        if module is not None:
+            return (set(dir(module)), True)
+        if modname in sys.builtin_module_names:
+            return (None, True)
+        if modname not in self.names:
+            self.names[modname] = self._check(modname)
+        names = self.names[modname]
+        return (names, names is not None)
+
+    def _check(self, modname):
+        (parent, _, _) = modname.rpartition('.')
+        if parent and not self.importable(parent)[1]:
+            return None
+        source_path = find_module_source(modname, self.path)
+        if source_path is None or self.checked >= _max_checked_modules:
+            return None
+        self.checked += 1
+        tree = _parse(source_path)
+        if tree is None:
+            return None
+        # While this module is checked, imports of it (import cycles) find it empty.
+        self.names[modname] = set()
+        is_package = os.path.basename(source_path) == '__init__.py'
+        package = modname if is_package else parent
+        kinds = dict.fromkeys(_module_names, 'object')
+        kinds.update({'__file__': 'str', '__name__': 'str'})
+        for stmt in tree.body:
+            if not self._statement(stmt, kinds, package):
+                return None
+        return set(kinds)
+
+    def _statement(self, stmt, kinds, package):
+        if isinstance(stmt, ast.Import):
+            for alias in stmt.names:
+                if not self.importable(alias.name)[1]:
+                    return False
+                if alias.asname:
+                    kinds[alias.asname] = 'ref:' + alias.name
+                else:
+                    top = alias.name.split('.')[0]
+                    kinds[top] = 'ref:' + top
+            return True
+        elif isinstance(stmt, ast.ImportFrom):
+            module = _import_from(stmt, package)
+            if module is None or not self.importable(module)[1]:
+                return False
+            names = self.importable(module)[0]
+            for alias in stmt.names:
+                if alias.name == '*':
+                    return False
+                if not ((names is not None and alias.name in names) or
+                        self.importable(module + '.' + alias.name)[1]):
+                    return False
+                kinds[alias.asname or alias.name] = 'ref:{}.{}'.format(module, alias.name)
+            return True
+        elif isinstance(stmt, ast.Assign):
+            kind = self._value(stmt.value, kinds)
+            if kind is None or not all(isinstance(t, ast.Name) for t in stmt.targets):
+                return False
+            for target in stmt.targets:
+                kinds[target.id] = kind
+            return True
+        elif isinstance(stmt, ast.AugAssign):
+            if not isinstance(stmt.target, ast.Name) or stmt.target.id not in kinds:
+                return False
+            kind = _binop_kind(stmt.op, kinds[stmt.target.id], self._value(stmt.value, kinds))
+            kinds[stmt.target.id] = kind
+            return kind is not None
+        elif isinstance(stmt, ast.Expr):  # Docstrings
+            return _is_constant(stmt.value)
+        elif isinstance(stmt, ast.Pass):
+            return True
+        elif isinstance(stmt, (ast.FunctionDef,) + tuple(
+                getattr(ast, name) for name in ['AsyncFunctionDef'] if hasattr(ast, name))):
+            arguments = stmt.args
+            defaults = list(arguments.defaults) + [
+                default for default in getattr(arguments, 'kw_defaults', []) if default]
+            annotated = getattr(stmt, 'returns', None) is not None or any(
+                getattr(arg, 'annotation', None) is not None for arg in ast.walk(arguments))
+            if (stmt.decorator_list or annotated or
+                    any(self._value(default, kinds) is None for default in defaults)):
+                return False
+            kinds[stmt.name] = 'object'
+            return True
+        return False
+
+    def _value(self, node, kinds):
+        """
+        :return: The kind of the value of expression `node`, or None if it might raise.
+        """
+        kind = self._kind(node, kinds)
+        if kind is not None and kind.startswith('attr:'):
+            return kind if kind[len('attr:'):] in _safe_attributes else None
+        return kind
+
+    def _kind(self, node, kinds):
+        if _is_constant(node):
+            value = ast.literal_eval(node)
+            return 'none' if value is None else type(value).__name__
+        elif isinstance(node, ast.Name):
+            if node.id in kinds:
+                return kinds[node.id]
+            return 'ref:' + node.id if node.id in _builtin_names else None
+        elif isinstance(node, (ast.List, ast.Tuple, ast.Set)):
+            if any(self._value(elt, kinds) is None for elt in node.elts):
+                return None
+            return type(node).__name__.lower()
+        elif isinstance(node, ast.Dict):
+            if not all(key is not None and _is_constant(key) for key in node.keys):
+                return None
+            if any(self._value(value, kinds) is None for value in node.values):
+                return None
+            return 'dict'
+        elif isinstance(node, ast.Attribute):
+            base = self._kind(node.value, kinds)
+            if base is None:
+                return None
+            elif base.startswith(('ref:', 'attr:')):
+                return 'attr:{}.{}'.format(base.partition(':')[2], node.attr)
+            elif base == 'path' and node.attr == 'parent':
+                return 'path'
+            elif base == 'path' and node.attr in ('name', 'stem', 'suffix'):
+                return 'str'
+            elif base in ('str', 'path'):
+                return 'method:{}.{}'.format(base, node.attr)
+            return None
+        elif isinstance(node, ast.Call):
+            func = self._kind(node.func, kinds)
+            if func is None or not func.startswith(('ref:', 'attr:', 'method:')):
+                return None
+            if node.keywords or any(_is_starred(arg) for arg in node.args):
+                return None
+            args = [self._value(arg, kinds) for arg in node.args]
+            if None in args:
+                return None
+            return _call_kind(func if func.startswith('method:') else func.partition(':')[2], args)
+        elif isinstance(node, ast.BinOp):
+            return _binop_kind(node.op, self._value(node.left, kinds),
+                               self._value(node.right, kinds))
+        elif isinstance(node, ast.UnaryOp):
+            operand = self._value(node.operand, kinds)
+            if isinstance(node.op, ast.Not) and operand is not None:
+                return 'bool'
+            return operand if operand in _numbers else None
+        elif isinstance(node, ast.Compare):
+            values = [self._value(value, kinds) for value in [node.left] + node.comparators]
+            safe = (ast.Eq, ast.NotEq, ast.Is, ast.IsNot)
+            if None in values or not all(isinstance(op, safe) for op in node.ops):
+                return None
+            return 'bool'
+        elif type(node).__name__ == 'JoinedStr':  # f-strings
+            for value in node.values:
+                if _is_constant(value):
+                    continue
+                if value.format_spec is not None or self._value(value.value, kinds) is None:
+                    return None
+            return 'str'
+        elif isinstance(node, ast.BoolOp):
+            values = [self._value(value, kinds) for value in node.values]
+            if None in values:
+                return None
+            return values[0] if len(set(values)) == 1 else 'object'
+        elif isinstance(node, ast.IfExp):
+            values = [self._value(value, kinds) for value in [node.test, node.body, node.orelse]]
+            if None in values:
+                return None
+            return values[1] if values[1] == values[2] else 'object'
+        return None
+
+
+def _parse(source_path):
+    """
+    :return: The parsed module, or None if it can't be read or parsed.
+    """
+    try:
+        with io.open(source_path, 'rb') as f:
+            return ast.parse(f.read(), source_path)
+    except (IOError, OSError, SyntaxError, ValueError, TypeError):
+        return None
+
+
+def _import_from(stmt, package):
+    """
+    :param package: The name of the package that relative imports are relative to.
+    :return: The absolute name of the module of a ``from ... import`` statement, or None.
+    """
+    if not stmt.level:
+        return stmt.module
+    parts = package.split('.') if package else []
+    if stmt.level - 1 > len(parts) - 1 or not parts:
+        return None
+    base = '.'.join(parts[:len(parts) - (stmt.level - 1)])
+    return base + '.' + stmt.module if stmt.module else base
+
+
+def source_dependencies(modname, path):
+    """
+    Return the source files of `modname`, and of its parent packages and the modules it imports
+    (transitively), that are found in `path`.
+
+    Imports anywhere in a module count, including in functions and conditional blocks.
+    Modules that aren't found in `path` (such as installed packages) are not followed.
+
+    :return: Source paths, starting with `modname`'s own (empty if it has none).
+    :rtype: list
+    """
+    found = []
+    seen = set()
+    pending = deque([modname])
+    while pending and len(found) < _max_checked_modules:
+        name = pending.popleft()
+        if name in seen:
+            continue
+        seen.add(name)
+        source_path = find_module_source(name, path)
+        if source_path is None:
+            continue
+        found.append(source_path)
+        (parent, _, _) = name.rpartition('.')
+        if parent:
+            pending.append(parent)
+        tree = _parse(source_path)
+        if tree is None:
+            continue
+        package = name if os.path.basename(source_path) == '__init__.py' else parent
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                pending.extend(alias.name for alias in node.names)
+            elif isinstance(node, ast.ImportFrom):
+                module = _import_from(node, package)
+                if module is not None:
+                    pending.append(module)
+                    pending.extend(module + '.' + alias.name for alias in node.names
+                                   if alias.name != '*')
+    return found
+
+
+def _is_constant(node):
+    try:
+        ast.literal_eval(node)
+    except (ValueError, TypeError, SyntaxError, MemoryError, RuntimeError):
+        return False
+    return not isinstance(node, (ast.List, ast.Tuple, ast.Set, ast.Dict))
+
+
+def _is_starred(node):
+    return hasattr(ast, 'Starred') and isinstance(node, ast.Starred)
+
+
+def find_potential_problems_statically(modname, path=None):
+    """
+    Like `utils.find_potential_problems()`, but parse `modname`'s source instead of importing it.
+
+    The result is only conclusive if importing the module (including its parent packages and
+    the modules it imports) would certainly succeed: see `_ImportCheck`.
+
+    :param path: Path entries to find the source in (default: `sys.path`)
+    :return: A set of problem descriptions, or None if the result is inconclusive.
+    :rtype: set or None
+    """
+    (names, importable) = _ImportCheck(sys.path if path is None else path).importable(modname)
+    if not importable:
+        return None
+    elif utils._likely_setting_names & names:
+        return set()
+    elif not any(name.isupper() for name in names):
+        return {'no uppercase names'}
+    else:
+        return {'no likely setting names'}
@@ -0,0 +1,256 @@
+"""
+Parallel, incremental ``collectstatic`` into the instance directory's ``static_files``.
+
+When ``STATIC_ROOT`` is django-develop's default, and the static files storage doesn't
+post-process files, ``django-develop collectstatic`` uses this instead of Django's collector:
+files are hardlinked (or copied) into place by a thread pool, and a manifest of each collected
+file's source path, size, mtime, and hash is kept in ``static-manifest.json`` in the instance
+directory, so that unchanged files are not touched again.
+Files that were collected before, but no longer exist in any static files source, are removed.
+
+This is configured in the ``[static]`` section of ``django-develop.ini``::
+
+    [static]
+    # Set to false to always use Django's collector.
+    parallel = true
+    # hardlink (the default, falling back to copying), or copy
+    method = hardlink
+    # Number of threads (default: based on the number of CPUs)
+    jobs = 16
+"""
+from __future__ import print_function, unicode_literals
+
+import argparse
+import errno
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+
+METHOD_CHOICES = ('hardlink', 'copy')
+
+# Bump this to invalidate existing manifests after format changes.
+_manifest_version = 1
+
+_section = 'static'
+
+# Python 2: os.replace() is not available.
+_replace = getattr(os, 'replace', os.rename)
+
+
+def manifest_path(instance_path):
+    return instance_path / 'static-manifest.json'
+
+
+def _argument_parser():
+    # The collectstatic options that this collector supports.
+    parser = argparse.ArgumentParser(prog='collectstatic', add_help=False)
+    parser.add_argument('--noinput', '--no-input', action='store_true')
+    parser.add_argument('-v', '--verbosity', type=int, choices=[0, 1, 2, 3], default=1)
+    return parser
+
+
+def parse_args(args):
+    """
+    Parse ``collectstatic`` arguments, if this collector supports them.
+
+    :return: argparse.Namespace, or None
+    """
+    try:
+        (options, unknown) = _argument_parser().parse_known_args(args)
+    except SystemExit:
+        return None
+    return None if unknown else options
+
+
+def _file_hash(path):
+    h = hashlib.sha1()
+    with io.open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def load_manifest(path):
+    try:
+        with io.open(str(path), 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (IOError, OSError, ValueError):
+        return {}
+    if not isinstance(data, dict) or data.get('version') != _manifest_version:
+        return {}
+    return data.get('files', {})
+
+
+def save_manifest(path, files):
+    temp_path = '{}.tmp'.format(path)
+    with io.open(temp_path, 'w', encoding='utf-8') as f:
+        f.write(json.dumps({'version': _manifest_version, 'files': files}, sort_keys=True))
+    _replace(temp_path, str(path))
+
+
+def _place(source, target, method):
+    """
+    Hardlink or copy `source` to `target`, replacing it.
+
+    :return: The method used.
+    """
+    directory = os.path.dirname(target)
+    try:
+        os.makedirs(directory)
+    except OSError as e:
+        if e.errno != errno.EEXIST:
+            raise
+    temp_path = '{}.django-develop-tmp'.format(target)
+    if method == 'hardlink':
+        try:
+            if os.path.lexists(temp_path):
+                os.remove(temp_path)
+            os.link(source, temp_path)
+        except OSError:
+            method = 'copy'  # For example, across filesystems.
+    if method == 'copy':
+        shutil.copy2(source, temp_path)
+    _replace(temp_path, target)
+    return method
+
+
+def _sync_file(prefixed_path, source, root, entry, method):
+    """
+    Bring one collected file up to date.
+
+    :param entry: The file's previous manifest entry, or None.
+    :return: (manifest entry, action), where action is "unmodified" or the placing method.
+    """
+    st = os.stat(source)
+    target = os.path.join(root, prefixed_path)
+    if entry is not None and os.path.exists(target) and entry[0] == source:
+        if entry[1:3] == [st.st_size, st.st_mtime]:
+            return (entry, 'unmodified')
+        if entry[1] == st.st_size:
+            digest = _file_hash(source)
+            if digest == entry[3] and digest == _file_hash(target):
+                return ([source, st.st_size, st.st_mtime, digest], 'unmodified')
+    digest = _file_hash(source)
+    action = _place(source, target, method)
+    return ([source, st.st_size, st.st_mtime, digest], action)
+
+
+def find_static_files():
+    """
+    List the static files to collect, like Django's collector: the first file found for each
+    destination path wins.
+
+    This requires `django.setup()`.
+
+    :return: Dict of destination path to source file path.
+    """
+    from django.apps import apps
+    from django.contrib.staticfiles.finders import get_finders
+
+    ignore_patterns = apps.get_app_config('staticfiles').ignore_patterns
+    found = {}
+    for finder in get_finders():
+        for (path, storage) in finder.list(ignore_patterns):
+            prefix = getattr(storage, 'prefix', None)
+            prefixed_path = os.path.join(prefix, path) if prefix else path
+            if prefixed_path not in found:
+                found[prefixed_path] = storage.path(path)
+    return found
+
+
+def collect(root, manifest_file, sources, method='hardlink', jobs=None):
+    """
+    Bring `root` up to date with `sources`, in parallel.
+
+    :param sources: Dict of destination path to source file path.
+    :return: Dict of counts by action: "hardlink", "copy", "unmodified", "removed".
+    """
+    if jobs is None:
+        jobs = min(32, multiprocessing.cpu_count() * 4)
+    manifest = load_manifest(manifest_file)
+    counts = {'hardlink': 0, 'copy': 0, 'unmodified': 0, 'removed': 0}
+
+    files = {}
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        paths = sorted(sources)
+        results = executor.map(
+            lambda path: _sync_file(path, sources[path], root, manifest.get(path), method),
+            paths)
+        for (path, (entry, action)) in zip(paths, results):
+            files[path] = entry
+            counts[action] += 1
+
+    # Remove the files we collected before, but that have gone away since.
+    for path in set(manifest) - set(files):
+        try:
+            os.remove(os.path.join(root, path))
+            counts['removed'] += 1
+        except OSError:
+            pass
+
+    save_manifest(manifest_file, files)
+    return counts
+
+
+def _storage_is_plain():
+    """
+    Is the static files storage plain file system storage, without post-processing?
+    """
+    from django.contrib.staticfiles.storage import StaticFilesStorage, staticfiles_storage
+    return staticfiles_storage.__class__ is StaticFilesStorage
+
+
+def _method_from_config(config):
+    method = config.get(_section, 'method', fallback='hardlink')
+    if method not in METHOD_CHOICES:
+        raise ValueError('Unknown static files method {!r} in django-develop.ini '
+                         '(choose from: {})'.format(method, ', '.join(METHOD_CHOICES)))
+    return method
+
+
+def check_config(config):
+    """
+    Check the ``[static]`` section, before anything is set up.
+
+    :raise ValueError: for an unknown method.
+    """
+    _method_from_config(config)
+
+
+def collectstatic(dd, args, execute):
+    """
+    Run ``collectstatic`` with this collector if possible, or with `execute` otherwise.
+
+    :param dd: `django_develop.cli.DjangoDevelop`, with the dev settings activated.
+    :param args: The ``collectstatic`` command's arguments.
+    :param execute: Callable that runs Django's ``collectstatic`` command.
+    :return: The action counts, or None if `execute` was used.
+    """
+    config = dd.read_config()
+    options = parse_args(args)
+    if options is None or not config.getboolean(_section, 'parallel', fallback=True):
+        execute()
+        return None
+
+    import django
+    from django.conf import settings
+    django.setup()
+    root = str(dd.instance_path / 'static_files')
+    if settings.STATIC_ROOT != root or not _storage_is_plain():
+        execute()
+        return None
+
+    method = _method_from_config(config)
+    jobs = config.getint(_section, 'jobs', fallback=None)
+
+    counts = collect(root, manifest_path(dd.instance_path), find_static_files(),
+                     method=method, jobs=jobs)
+    if options.verbosity >= 1:
+        print('{} static files linked, {} copied, {} unmodified, {} removed in {!r}.'.format(
+            counts['hardlink'], counts['copy'], counts['unmodified'], counts['removed'], root))
+    return counts
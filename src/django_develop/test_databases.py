@@ -0,0 +1,141 @@
+"""
+Test databases created from migrated templates, and cloned per worker with reflinks.
+
+For the instance database, ``django-develop test`` creates the test database in tmpfs
+(``/dev/shm``) instead of in memory, so that it can be copied:
+
+* After the test database is created and migrated, it is saved as a template in the
+  ``test-templates`` directory of the instance directory, keyed by a fingerprint of the
+  migrations (see `django_develop.migration_templates`). Later runs with the same migrations
+  copy the template into place, and Django's ``migrate`` finds nothing left to do.
+  The ``[migrations]`` limits on the number and size of templates apply to test templates too.
+* Each test run names its test database after its process ID, so that concurrent runs of the
+  same instance don't share it (except with ``--keepdb``, which keeps the name stable).
+* If there is no test template yet, but ``django-develop migrate`` saved a migration template
+  for the same migrations, the test database starts from that instead.
+* ``test --parallel`` clones the test database for each worker with `sqlite.copy_database()`,
+  which uses copy-on-write reflinks where the filesystem supports them.
+
+This is configured in the ``[tests]`` section of ``django-develop.ini``::
+
+    [tests]
+    # Set to false to use Django's in-memory test database.
+    template_cache = true
+    # Where to create the test database and its clones (default: /dev/shm, if available).
+    directory = /dev/shm
+"""
+from __future__ import print_function, unicode_literals
+
+import hashlib
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+from django_develop import migration_templates, sqlite
+
+
+# The key in the database's TEST settings for the instance directory, which keeps the templates.
+INSTANCE_KEY = 'DJANGO_DEVELOP_INSTANCE'
+
+# The key in the database's TEST settings for the template limits.
+LIMITS_KEY = 'DJANGO_DEVELOP_TEMPLATE_LIMITS'
+
+_section = 'tests'
+
+_shm_directory = '/dev/shm'
+
+_suffix = '.sqlite3'
+
+
+def templates_path(instance_path):
+    return instance_path / 'test-templates'
+
+
+def dev_test_settings(instance_path, config):
+    """
+    Return the ``TEST`` settings for the instance database (empty to use Django's defaults).
+
+    :type config: configparser.RawConfigParser
+    """
+    if not config.getboolean(_section, 'template_cache', fallback=True):
+        return {}
+    directory = config.get(_section, 'directory', fallback=None)
+    if directory is None:
+        directory = _shm_directory if os.path.isdir(_shm_directory) else tempfile.gettempdir()
+    # Distinguish the test databases of different instances.
+    tag = hashlib.sha1(str(instance_path).encode('utf-8')).hexdigest()[:12]
+    return {
+        'NAME': os.path.join(directory, 'django-develop-test-{}{}'.format(tag, _suffix)),
+        INSTANCE_KEY: str(instance_path),
+        LIMITS_KEY: migration_templates.eviction_limits(config),
+    }
+
+
+def process_database_name(test_database_name):
+    """
+    Return this process's variant of the test database name, to keep concurrent runs apart.
+    """
+    (root, ext) = os.path.splitext(test_database_name)
+    return '{}-{}{}'.format(root, os.getpid(), ext)
+
+
+def template_for(instance_path):
+    """
+    Return the test template path for the current migrations.
+
+    This requires `django.setup()`.
+    """
+    return templates_path(instance_path) / (migration_templates.current_fingerprint() + _suffix)
+
+
+def seed_test_database(instance_path, test_database_name):
+    """
+    Copy the matching test template (or migration template) to `test_database_name`.
+
+    :return: The path of the template used, or None if there is none.
+    """
+    template = template_for(instance_path)
+    candidates = [template,
+                  migration_templates.templates_path(instance_path) / template.name]
+    for path in candidates:
+        if path.exists():
+            sqlite.copy_database(path, test_database_name)
+            os.utime(str(path), None)  # Mark as recently used.
+            return path
+    return None
+
+
+def save_template(instance_path, test_database_name, limits):
+    """
+    Save the migrated test database as the template for the current migrations.
+
+    :param limits: `migration_templates.evict()` limits, from `limits_from_settings()`
+    """
+    template = template_for(instance_path)
+    try:
+        if not template.parent.exists():
+            template.parent.mkdir(parents=True)
+        sqlite.copy_database(test_database_name, template)
+        migration_templates.evict(template.parent, keep=template, **limits)
+    except Exception as e:
+        print('django-develop warning: cannot save test database template ({}: {})'.format(
+            type(e).__name__, e), file=sys.stderr)
+
+
+def instance_path_from_settings(settings_dict):
+    """
+    Return the instance path that `dev_test_settings()` recorded, or None.
+    """
+    value = settings_dict.get('TEST', {}).get(INSTANCE_KEY)
+    return None if value is None else Path(value)
+
+
+def limits_from_settings(settings_dict):
+    """
+    Return the template limits that `dev_test_settings()` recorded, or the defaults.
+    """
+    return settings_dict.get('TEST', {}).get(LIMITS_KEY) or {
+        'max_templates': migration_templates.DEFAULT_MAX_TEMPLATES,
+        'max_size': migration_templates.DEFAULT_MAX_TEMPLATES_SIZE * 1024 * 1024,
+    }
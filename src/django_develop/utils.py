@@ -1,14 +1,34 @@
 from __future__ import print_function
 
+import os
 import sys
 import pkgutil
 import importlib
+import sysconfig
+from fnmatch import fnmatchcase
 
-import django
-from django.core.management.color import color_style
+from attr import attributes, attr
 
 
 def SUCCESS(s):
+    """
+    Style `s` like Django's SUCCESS messages.
+
+    Django's default palette makes this bold green, on terminals that support colour. Django is
+    only imported for what that shortcut doesn't cover: Windows consoles, and ``DJANGO_COLORS``.
+    """
+    if sys.platform == 'win32' or 'DJANGO_COLORS' in os.environ:
+        return _django_SUCCESS(s)
+    # isatty is not always implemented (see Django's supports_color()).
+    if not (hasattr(sys.stdout, 'isatty') and sys.stdout.isatty()):
+        return s
+    return '\x1b[32;1m{}\x1b[0m'.format(s)
+
+
+def _django_SUCCESS(s):
+    import django
+    from django.core.management.color import color_style
+
     style = color_style()
     # Django 1.8 does not have the SUCCESS style; use MIGRATE_SUCCESS instead.
     _SUCCESS = (style.MIGRATE_SUCCESS if django.VERSION < (1, 9) else
@@ -47,31 +67,226 @@ def is_candidate_name(modname):
     return 'settings' in modname and modname not in _ignored_settings_modules
 
 
-def discover_candidate_settings():
+# Top-level packages that are known not to contain Django settings modules,
+# but are large or slow to walk.
+_known_non_django_trees = (
+    'IPython',
+    '_pytest',
+    'django',
+    'django_develop',
+    'hypothesis',
+    'jedi',
+    'matplotlib',
+    'numpy',
+    'pandas',
+    'pip',
+    'pkg_resources',
+    'scipy',
+    'setuptools',
+)
+
+
+def _is_within(path, directory):
+    return path == directory or path.startswith(directory.rstrip(os.sep) + os.sep)
+
+
+def _is_stdlib_path_entry(sys_path_entry):
+    """
+    Check whether `sys_path_entry` belongs to the Python installation rather than the environment.
+
+    This covers the standard library (including lib-dynload and its zip file), and in a virtual
+    environment, anything else under `sys.base_prefix` (such as system site-packages).
+    """
+    real_path = os.path.realpath(sys_path_entry)
+    paths = sysconfig.get_paths()
+    site_dirs = {os.path.realpath(paths[k]) for k in ['purelib', 'platlib']}
+    stdlib_dirs = {os.path.realpath(paths[k]) for k in ['stdlib', 'platstdlib']}
+
+    if any(_is_within(real_path, d) for d in site_dirs):
+        return False
+    if any(_is_within(real_path, d) for d in stdlib_dirs):
+        return True
+    base_prefix = getattr(sys, 'real_prefix', getattr(sys, 'base_prefix', sys.prefix))
+    return (os.path.realpath(base_prefix) != os.path.realpath(sys.prefix) and
+            _is_within(real_path, os.path.realpath(base_prefix)) and
+            not _is_within(real_path, os.path.realpath(sys.prefix)))
+
+
+def _split_patterns(value):
+    return tuple(value.split())
+
+
+@attributes
+class DiscoveryRules(object):
+    """
+    Rules for pruning the walk of `sys.path` entries during discovery.
+
+    These can be configured in the ``[discovery]`` section of ``django-develop.ini``::
+
+        [discovery]
+        # Glob patterns of top-level packages and modules to walk.
+        include = my_project*
+        # Glob patterns of dotted package and module names to skip, with their subpackages.
+        exclude = legacy_app vendored.*
+        # Skip the standard library and anything else outside the virtualenv (default: true)
+        exclude_stdlib = true
+
+    The exclusions extend a built-in list of known non-Django packages.
+    """
+
+    include = attr(default=('*',), convert=tuple)
+    exclude = attr(default=(), convert=tuple)
+    exclude_stdlib = attr(default=True)
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        :type config: configparser.RawConfigParser
+        """
+        section = 'discovery'
+        if not config.has_section(section):
+            return cls()
+        return cls(
+            include=_split_patterns(config.get(section, 'include', fallback='*')),
+            exclude=_split_patterns(config.get(section, 'exclude', fallback='')),
+            exclude_stdlib=config.getboolean(section, 'exclude_stdlib', fallback=True),
+        )
+
+    def key(self):
+        """
+        A JSON-compatible value identifying these rules, for caching discovery results.
+        """
+        return [list(self.include), list(self.exclude), self.exclude_stdlib]
+
+    def excludes_path_entry(self, sys_path_entry):
+        return self.exclude_stdlib and _is_stdlib_path_entry(sys_path_entry)
+
+    def includes(self, modname):
+        """
+        Check whether `modname` (and for packages, its subtree) should be walked.
+        """
+        top = modname.split('.')[0]
+        return (any(fnmatchcase(top, pattern) for pattern in self.include) and
+                not any(fnmatchcase(modname, pattern)
+                        for pattern in _known_non_django_trees + self.exclude))
+
+
+def discover_candidate_settings(rules=None):
     """
     Discover candidate settings modules by name.
 
     This does not import or inspect the contents of the modules.
 
+    :param rules: `DiscoveryRules` (default: the built-in rules)
     :return: List of (sys.path entry, [module names])
     """
 
-    def report_candidate(modname):
-        if is_candidate_name(modname):
-            print('Warning: import failed for {}'.format(modname))
-
     # XXX: Copy sys.path with list(), to avoid weird effects from mutation while we iterate.
     for sys_path_entry in list(sys.path):
-        modnames = [
-            modname
-            for (finder, modname, is_pkg) in pkgutil.walk_packages([sys_path_entry],
-                                                                   onerror=report_candidate)
-            if not is_pkg and is_candidate_name(modname)
-        ]
+        modnames = discover_candidates_in_path_entry(sys_path_entry, rules)
         if 0 < len(modnames):
             yield (sys_path_entry, modnames)
 
 
+def path_stamp(path):
+    """
+    Return the [mtime, size] of `path`, or None if it doesn't exist.
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_mtime, st.st_size]
+
+
+def _walk_directory(directory, prefix, rules, seen, fingerprint=None):
+    """
+    Yield the names of the Python source modules in a directory, recursing into packages.
+
+    This follows `pkgutil.iter_modules()`: names are visited in sorted order,
+    and only directories with an ``__init__.py`` count as packages.
+    Unlike `pkgutil.walk_packages()`, this does not import the packages.
+
+    :param fingerprint: Optional list to append the [path, `path_stamp()`] of each directory
+        listed, and of each included directory that is not a package (yet), to.
+    """
+    real_directory = os.path.realpath(directory)
+    if real_directory in seen:  # Symlink loop
+        return
+    seen.add(real_directory)
+
+    if fingerprint is not None:
+        # Stamp before listing, so that changes made during the walk are noticed next time.
+        fingerprint.append([directory, path_stamp(directory)])
+
+    try:
+        filenames = sorted(os.listdir(directory))
+    except OSError:
+        return
+
+    for filename in filenames:
+        path = os.path.join(directory, filename)
+        (name, ext) = os.path.splitext(filename)
+        if os.path.isdir(path):
+            modname = prefix + filename
+            if '.' in filename or not rules.includes(modname):
+                continue
+            if not os.path.isfile(os.path.join(path, '__init__.py')):
+                # Adding an __init__.py changes this directory's stamp, not its parent's.
+                if fingerprint is not None:
+                    fingerprint.append([path, path_stamp(path)])
+                continue
+            for submodname in _walk_directory(path, modname + '.', rules, seen, fingerprint):
+                yield submodname
+        elif ext == '.py' and name != '__init__' and '.' not in name:
+            modname = prefix + name
+            if rules.includes(modname):
+                yield modname
+
+
+def discover_candidates_in_path_entry(sys_path_entry, rules=None, fingerprint=None):
+    """
+    Discover candidate settings module names in a single `sys.path` entry.
+
+    Directory entries are walked on the filesystem, without importing anything.
+    Other entries (such as zip files and eggs) fall back to `pkgutil.walk_packages()`,
+    which imports packages to find their submodules.
+
+    :param rules: `DiscoveryRules` (default: the built-in rules)
+    :param fingerprint: Optional list to append [path, `path_stamp()`] pairs to, which change
+        whenever the result would: for directories, the stamps of the directories the walk
+        listed or skipped (see `_walk_directory()`); otherwise, the stamp of the entry itself.
+    :return: List of module names
+    """
+    if rules is None:
+        rules = DiscoveryRules()
+
+    if rules.excludes_path_entry(sys_path_entry):
+        return []
+
+    if os.path.isdir(sys_path_entry or os.curdir):
+        return [
+            modname
+            for modname in _walk_directory(sys_path_entry or os.curdir, '', rules, set(),
+                                           fingerprint)
+            if is_candidate_name(modname)
+        ]
+
+    if fingerprint is not None:
+        fingerprint.append([sys_path_entry, path_stamp(sys_path_entry)])
+
+    def report_candidate(modname):
+        if is_candidate_name(modname):
+            print('Warning: import failed for {}'.format(modname))
+
+    return [
+        modname
+        for (finder, modname, is_pkg) in pkgutil.walk_packages([sys_path_entry],
+                                                               onerror=report_candidate)
+        if not is_pkg and is_candidate_name(modname) and rules.includes(modname)
+    ]
+
+
 # The presence of any of these settings indicate a likely Django settings module.
 _likely_setting_names = {
     # XXX: Too common?
@@ -115,37 +330,60 @@ def find_potential_problems(modname):
     return set(problems())
 
 
-def print_candidate_settings(include_problems=False):
+def print_candidate_settings(include_problems=False, jobs=None, timeout=None, index=None,
+                             static=True, rules=None):
     """
     Discover and print candidate usable Django settings modules to standard output.
 
+    Path entries are scanned and candidates probed in parallel (see `django_develop.discovery`),
+    and each path entry's results are printed as soon as they are available.
+
     :param include_problems:
         If true, include candidate modules with problems.
         This should mainly be useful for troubleshooting.
+    :param jobs: Number of worker processes to probe candidates with (default: CPU count)
+    :param timeout: Seconds to wait for any single candidate's probe (default: 10)
+    :param index:
+        Optional `django_develop.index.CandidateIndex` to reuse results from previous runs.
+        Its hit/miss summary is printed at the end.
+    :param static:
+        If true (the default), classify candidates by parsing their source where possible,
+        and only import them when that is inconclusive.
+    :param rules: `DiscoveryRules` (default: the built-in rules)
     """
+    from django_develop import discovery
+
     # TODO (Python 3): Use print(..., flush=True) instead
     print('Looking for usable Django settings modules in Python path...', end=' ')
     sys.stdout.flush()
 
-    candidate_groups = list(discover_candidate_settings())
-    if 0 < len(candidate_groups):
-        print('Found:')
-        print()
-        for (sys_path_entry, modnames) in candidate_groups:
-            # XXX: A bit messy.
-            if not include_problems:
-                modnames = [n for n in modnames if not find_potential_problems(n)]
-
-            if 0 < len(modnames):
-                print('    In {}:'.format(sys_path_entry))
-                print()
-                for modname in modnames:
-                    problems = find_potential_problems(modname)
-                    if not problems:
-                        print('        {}'.format(SUCCESS(modname)))
-                    elif include_problems:
-                        print('        {} ({})'.format(modname, ', '.join(problems)))
-                print()
-    else:
+    found = False
+    for (sys_path_entry, probed) in discovery.discover_and_probe(
+            jobs=jobs, timeout=timeout, index=index, static=static, rules=rules):
+        if not found:
+            print('Found:')
+            print()
+            found = True
+
+        # XXX: A bit messy.
+        if not include_problems:
+            probed = [(n, problems) for (n, problems) in probed if not problems]
+
+        if 0 < len(probed):
+            print('    In {}:'.format(sys_path_entry))
+            print()
+            for (modname, problems) in probed:
+                if not problems:
+                    print('        {}'.format(SUCCESS(modname)))
+                else:
+                    print('        {} ({})'.format(modname, ', '.join(sorted(problems))))
+            print()
+        sys.stdout.flush()
+
+    if not found:
         print('None found.')
         print()
+
+    if index is not None:
+        print(index.summary())
+        print()
@@ -1,9 +1,15 @@
+import importlib
+import json
+import os
+import subprocess
+import sys
 from io import StringIO
 from pathlib import Path
+from textwrap import dedent
 
 from py2_compat import unittest, mock, TemporaryDirectory
 
-from django_develop import cli
+from django_develop import cli, dev_settings, overrides, profiling
 
 
 def _patch_inside_virtual_env(expected):
@@ -52,3 +58,247 @@ class TestMain(unittest.TestCase):
         self.assertEqual(raised.exception.code, 2)
         self.assertEqual(stderr.getvalue().splitlines(),
                          ['django-develop not configured, try "django-develop-config"'])
+
+
+@mock.patch('sys.stderr', new_callable=StringIO)
+class TestRunCommand(unittest.TestCase):
+    """
+    Test `cli.run_command()`.
+    """
+
+    def setUp(self):
+        temp_dir = TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.dd = cli.DjangoDevelop(Path(temp_dir.name))
+        with mock.patch('sys.stdout', new_callable=StringIO):
+            self.dd.init_instance('test_examples.likely_settings')
+
+    def _configure(self, text):
+        config = self.dd.read_config()
+        config.read_string(text)
+        self.dd.write_config(config)
+
+    def test_config_errors(self, stderr):
+        """
+        Configuration errors are reported without a traceback.
+        """
+        cases = [
+            ('check', '[database]\nmode = nonexistent\n', "Unknown database mode 'nonexistent'"),
+            ('check', '[database]\nmode = shm\nseed = nonexistent\n',
+             "No snapshot named 'nonexistent' to seed the database from"),
+            ('collectstatic', '[database]\nmode = file\n[static]\nmethod = symlink\n',
+             "Unknown static files method 'symlink'"),
+        ]
+        for (command, text, message) in cases:
+            with self.subTest(message=message):
+                stderr.truncate(0)
+                stderr.seek(0)
+                self._configure(text)
+                with self.assertRaises(SystemExit) as raised:
+                    cli.run_command(self.dd, ['django-develop', command],
+                                    profiling.NullProfiler())
+                self.assertEqual(raised.exception.code, 2)
+                self.assertIn(message, stderr.getvalue())
+
+    def test_profile_subcommand(self, stderr):
+        """
+        django-develop's own subcommands report a startup profile too.
+        """
+        with mock.patch('sys.stdout', new_callable=StringIO):
+            cli.run_command(self.dd, ['django-develop', 'db-snapshot'],
+                            profiling.StartupProfiler())
+        with self.dd._startup_profile_path.open(encoding='utf-8') as f:
+            profile = json.load(f)
+        self.assertEqual([phase['name'] for phase in profile['phases']], ['db-snapshot'])
+        self.assertIn('Startup profile written to', stderr.getvalue())
+
+
+class TestFastExitImports(unittest.TestCase):
+    """
+    The early exits of `cli.main()` and `cli.main_config()` don't import Django, or the
+    modules that activating the dev settings needs.
+    """
+
+    # Modules that no early exit should import.
+    heavy_modules = [
+        'django',
+        'django_develop.dev_caches',
+        'django_develop.discovery',
+        'django_develop.instrumentation',
+        'django_develop.overrides',
+        'django_develop.request_profiling',
+        'django_develop.settings_snapshot',
+        'django_develop.static_analysis',
+        'django_develop.test_databases',
+    ]
+
+    source = dedent("""\
+        import json
+        import sys
+        from django_develop import cli, utils
+        utils.is_inside_virtual_env = lambda: {inside_virtual_env}
+        cli._get_DjangoDevelop = lambda: cli.DjangoDevelop({instance!r})
+        sys.argv = {argv!r}
+        try:
+            cli.{entry_point}()
+        except SystemExit as e:
+            print(json.dumps([e.code, sorted(sys.modules)]))
+        """)
+
+    def _run(self, entry_point, argv, inside_virtual_env):
+        with TemporaryDirectory() as temp_dir:
+            env = dict(os.environ, PYTHONPATH=str(Path(cli.__file__).parent.parent))
+            env.pop('DJANGO_AUTO_COMPLETE', None)
+            output = subprocess.check_output([sys.executable, '-c', self.source.format(
+                inside_virtual_env=inside_virtual_env, instance=str(Path(temp_dir, 'missing')),
+                argv=argv, entry_point=entry_point)], env=env, stderr=subprocess.DEVNULL)
+        return json.loads(output.decode('utf-8'))
+
+    def test_early_exits(self):
+        cases = [
+            ('main', ['django-develop', 'check'], False),
+            ('main', ['django-develop', '--db-mode=tmpfs', 'check'], False),
+            ('main', ['django-develop', 'check'], True),
+            ('main', ['django-develop', 'db-snapshot', 'list'], True),
+            ('main_config', ['django-develop-config'], False),
+        ]
+        for (entry_point, argv, inside_virtual_env) in cases:
+            with self.subTest(entry_point=entry_point, argv=argv,
+                              inside_virtual_env=inside_virtual_env):
+                (code, modules) = self._run(entry_point, argv, inside_virtual_env)
+                self.assertEqual(code, 2)
+                imported = [name for name in modules for heavy in self.heavy_modules
+                            if name == heavy or name.startswith(heavy + '.')]
+                self.assertEqual(imported, [])
+
+
+class TestActivateDevSettings(unittest.TestCase):
+    """
+    `cli.DjangoDevelop.activate_dev_settings()`
+    """
+
+    def setUp(self):
+        temp_dir = TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.instance_dir = Path(temp_dir.name, 'instance')
+        self.dd = cli.DjangoDevelop(self.instance_dir)
+
+        # A base settings module of our own, to modify.
+        self.module_dir = Path(temp_dir.name, 'modules')
+        self.module_dir.mkdir()
+        self.module_path = self.module_dir / 'snapshot_settings.py'
+        self.module_path.write_text('INSTALLED_APPS = ["one"]\n', encoding='utf-8')
+
+        for patcher in [mock.patch('sys.stdout', new_callable=StringIO),
+                        mock.patch('sys.path', [str(self.module_dir)] + sys.path),
+                        mock.patch.dict('sys.modules'),
+                        mock.patch.dict('os.environ')]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.dd.init_instance('snapshot_settings')
+
+        # Restore the dev_settings module's contents afterwards.
+        saved = dict(vars(dev_settings))
+        self.addCleanup(lambda: (vars(dev_settings).clear(), vars(dev_settings).update(saved)))
+
+    def _activate(self):
+        sys.modules.pop('snapshot_settings', None)
+        for name in [name for name in vars(dev_settings) if name.isupper()]:
+            delattr(dev_settings, name)
+        self.dd.activate_dev_settings()
+
+    def _enable_snapshot(self):
+        config = self.dd.read_config()
+        config.set('django-develop', 'snapshot_settings', 'true')
+        self.dd.write_config(config)
+
+    def test_defaults(self):
+        self._activate()
+        self.assertEqual(dev_settings.INSTALLED_APPS, ['one'])
+        self.assertTrue(dev_settings.DEBUG)
+        self.assertEqual(dev_settings.DATABASES['default']['NAME'],
+                         str(self.instance_dir / 'db.sqlite3'))
+        self.assertEqual(os.environ['DJANGO_SETTINGS_MODULE'], 'django_develop.dev_settings')
+        self.assertFalse((self.instance_dir / 'dev-settings.pickle').exists())
+
+    def test_snapshot(self):
+        self._enable_snapshot()
+        self._activate()
+        self.assertTrue((self.instance_dir / 'dev-settings.pickle').exists())
+
+        # The snapshot is used instead of importing the base settings module.
+        with mock.patch('importlib.import_module', side_effect=AssertionError):
+            self._activate()
+        self.assertEqual(dev_settings.INSTALLED_APPS, ['one'])
+
+        # Changing the base settings module invalidates the snapshot.
+        self.module_path.write_text('INSTALLED_APPS = ["one", "two"]\n', encoding='utf-8')
+        stat = self.module_path.stat()
+        os.utime(str(self.module_path), (stat.st_atime, stat.st_mtime + 10))
+        self._activate()
+        self.assertEqual(dev_settings.INSTALLED_APPS, ['one', 'two'])
+
+    def test_snapshot_environ(self):
+        """
+        Only the environment variables that the settings read, and DJANGO_*, invalidate it.
+        """
+        self.module_path.write_text(
+            'import os\nINSTALLED_APPS = [os.environ.get("APP_NAME", "one")]\n',
+            encoding='utf-8')
+        self._enable_snapshot()
+        self._activate()
+
+        os.environ.update({'PWD': '/elsewhere', 'SHLVL': '9', 'TERM': 'dumb'})
+        with mock.patch('importlib.import_module', side_effect=AssertionError):
+            self._activate()
+
+        for (name, value) in [('APP_NAME', 'two'), ('DJANGO_EXAMPLE', '1')]:
+            with self.subTest(name=name):
+                os.environ[name] = value
+                with mock.patch('importlib.import_module', wraps=importlib.import_module) as imp:
+                    self._activate()
+                imp.assert_called_once_with('snapshot_settings')
+                self.assertEqual(dev_settings.INSTALLED_APPS, [os.environ.get('APP_NAME')])
+
+    def test_overrides(self):
+        (self.module_dir / 'instance_overrides.py').write_text(
+            'INSTALLED_APPS = ["three"]\n', encoding='utf-8')
+        config = self.dd.read_config()
+        config.set('django-develop', 'override_modules', 'instance_overrides')
+        config.add_section('overrides')
+        config.set('overrides', 'DEBUG', 'False')
+        self.dd.write_config(config)
+
+        self._activate()
+        self.assertEqual(dev_settings.INSTALLED_APPS, ['three'])
+        self.assertFalse(dev_settings.DEBUG)
+
+    def test_layered(self):
+        """
+        The base settings are read through, not copied, and Django can load them.
+        """
+        from django.conf import Settings
+
+        self._activate()
+        base_mod = sys.modules['snapshot_settings']
+        self.assertNotIn('INSTALLED_APPS', vars(dev_settings))
+        self.assertIs(dev_settings.INSTALLED_APPS, base_mod.INSTALLED_APPS)
+        self.assertIn('SECRET_KEY', dir(dev_settings))
+
+        settings = Settings('django_develop.dev_settings')
+        self.assertEqual(settings.INSTALLED_APPS, ['one'])
+        self.assertTrue(settings.DEBUG)
+        self.assertEqual(settings.ROOT_URLCONF, 'django_develop.dev_urls')
+
+    def test_listing_is_lazy(self):
+        """
+        Listing the settings doesn't evaluate lazy values: reading them does, once.
+        """
+        thunk = mock.Mock(return_value='resolved')
+        dev_settings.set_layers([{'LAZY_SETTING': overrides.Lazy('lazy', thunk)}])
+        self.assertIn('LAZY_SETTING', dir(dev_settings))
+        thunk.assert_not_called()
+        self.assertEqual(dev_settings.LAZY_SETTING, 'resolved')
+        self.assertEqual(dev_settings.LAZY_SETTING, 'resolved')
+        thunk.assert_called_once_with()
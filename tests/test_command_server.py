@@ -0,0 +1,133 @@
+import os
+import subprocess
+import sys
+import time
+from io import StringIO
+from pathlib import Path
+
+from py2_compat import unittest, mock, TemporaryDirectory
+
+from django_develop import cli, command_server
+
+
+TEST_ROOT = os.path.dirname(__file__)
+
+
+@unittest.skipUnless(command_server.is_supported(), 'requires Unix sockets and os.fork()')
+class TestCommandServer(unittest.TestCase):
+    """
+    `command_server.serve()` and `command_server.run_client()`
+    """
+
+    def setUp(self):
+        temp_dir = TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.instance_path = temp_dir.name
+        with mock.patch('sys.stdout', new_callable=StringIO):
+            cli.DjangoDevelop(self.instance_path).init_instance('test_examples.likely_settings')
+        self.socket_path = command_server.socket_path(self.instance_path)
+
+        self.env = dict(os.environ, PYTHONPATH=os.pathsep.join(
+            [TEST_ROOT, str(Path(command_server.__file__).parent.parent)]))
+
+    def _python(self, code, **env):
+        return subprocess.Popen([sys.executable, '-c', code], env=dict(self.env, **env),
+                                stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    def _start_server(self, **env):
+        server = self._python(
+            'from django_develop import cli, command_server; '
+            'command_server.serve(cli.DjangoDevelop({!r}))'.format(self.instance_path), **env)
+        self.addCleanup(server.communicate)
+        self.addCleanup(server.terminate)
+
+        for _ in range(100):
+            if os.path.exists(self.socket_path):
+                return server
+            time.sleep(0.05)
+        self.fail('command server did not start')
+
+    def _client(self, *args, **env):
+        return self._python(
+            'import sys; from django_develop import command_server; '
+            'code = command_server.run_client({!r}, {!r}); '
+            'sys.exit("fallback" if code is None else code)'.format(
+                self.socket_path, ['django-develop'] + list(args)), **env)
+
+    def test_no_server(self):
+        self.assertIsNone(command_server.run_client(self.socket_path, ['django-develop']))
+
+    def test_commands(self):
+        """
+        Forward commands and their output and exit codes.
+        """
+        self._start_server()
+
+        client = self._client('check')
+        (stdout, stderr) = client.communicate()
+        self.assertEqual(client.returncode, 0)
+        self.assertIn(b'System check identified no issues', stdout)
+
+        client = self._client('nonexistent-command')
+        (stdout, stderr) = client.communicate()
+        self.assertEqual(client.returncode, 1)
+        self.assertIn(b"Unknown command: 'nonexistent-command'", stderr)
+
+    def test_subcommands(self):
+        """
+        django-develop's own subcommands run in the server too, except those that need a fresh
+        process.
+        """
+        self._start_server()
+
+        client = self._client('perf-report')
+        (stdout, stderr) = client.communicate()
+        self.assertEqual(client.returncode, 0)
+        self.assertIn(b'Instrumentation is not enabled', stdout)
+
+        client = self._client('serve-commands')
+        (stdout, stderr) = client.communicate()
+        self.assertEqual(stderr.strip(), b'fallback')
+
+    def test_db_mode(self):
+        """
+        The client runs commands itself unless the server's settings match its flags and
+        environment.
+        """
+        self._start_server(DJANGO_DEVELOP_DB_MODE='memory')
+
+        client = self._client(
+            '--db-mode=memory', 'shell', '-c',
+            'from django.db import connection; print(connection.settings_dict["NAME"])',
+            DJANGO_DEVELOP_DB_MODE='file')
+        (stdout, stderr) = client.communicate()
+        self.assertEqual(client.returncode, 0, stderr)
+        self.assertIn(b'mode=memory', stdout)
+
+        for (args, env) in [(['--db-mode=file', 'check'], {}),
+                            (['check'], {'DJANGO_DEVELOP_DB_MODE': 'file'}),
+                            (['check'], {'DJANGO_DEVELOP_DB_MODE': 'memory', 'DJANGO_EXTRA': '1'})]:
+            with self.subTest(args=args, env=env):
+                client = self._client(*args, **env)
+                (stdout, stderr) = client.communicate()
+                self.assertEqual(stderr.strip(), b'fallback')
+
+    def test_settings_inputs(self):
+        """
+        Unrelated environment variables don't stop the server from running commands,
+        but a different sys.path does, and the server logs why.
+        """
+        server = self._start_server()
+
+        client = self._client('check', PWD='/elsewhere', SHLVL='9', TERM='dumb')
+        (stdout, stderr) = client.communicate()
+        self.assertEqual(client.returncode, 0, stderr)
+
+        client = self._client('check', PYTHONPATH=os.pathsep.join(
+            [self.env['PYTHONPATH'], self.instance_path]))
+        (stdout, stderr) = client.communicate()
+        self.assertEqual(stderr.strip(), b'fallback')
+
+        server.terminate()
+        (stdout, stderr) = server.communicate()
+        self.assertIn(b"Leaving 'check' to the client: the instance, config, sys.path", stdout)
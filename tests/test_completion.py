@@ -0,0 +1,97 @@
+import json
+import os
+import subprocess
+import sys
+from io import StringIO
+from pathlib import Path
+
+from py2_compat import unittest, mock, TemporaryDirectory
+
+from django_develop import cli, completion
+
+
+TEST_ROOT = os.path.dirname(__file__)
+
+
+class TestComplete(unittest.TestCase):
+    """
+    `completion.complete()`
+    """
+
+    cache = {
+        'commands': {
+            'check': [['--deploy', False], ['--tag', True]],
+            'test': [['--parallel', True]],
+            'testserver': [],
+        },
+        'app_labels': ['auth', 'my_app'],
+    }
+
+    def test_subcommands(self):
+        cases = {
+            'django-develop ': ['check', 'help', 'test', 'testserver'],
+            'django-develop te': ['test', 'testserver'],
+        }
+        for (comp_words, expected) in cases.items():
+            with self.subTest(comp_words=comp_words):
+                self.assertEqual(completion.complete(self.cache, comp_words, '1'), expected)
+
+    def test_options(self):
+        cases = {
+            ('django-develop check --', '2'): ['--deploy', '--help', '--tag='],
+            ('django-develop check --deploy --', '3'): ['--help', '--tag='],
+            ('django-develop test ', '2'): ['--help', '--parallel=', 'auth', 'my_app'],
+            ('django-develop help ', '2'): [],
+        }
+        for ((comp_words, comp_cword), expected) in cases.items():
+            with self.subTest(comp_words=comp_words):
+                self.assertEqual(completion.complete(self.cache, comp_words, comp_cword),
+                                 expected)
+
+
+class TestAutocomplete(unittest.TestCase):
+    """
+    `completion.autocomplete()` and `completion.build_cache()`
+    """
+
+    def setUp(self):
+        temp_dir = TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.instance_path = temp_dir.name
+        with mock.patch('sys.stdout', new_callable=StringIO):
+            cli.DjangoDevelop(self.instance_path).init_instance('test_examples.likely_settings')
+
+    def test_missing_cache(self):
+        """
+        Without a cache, start a rebuild and fall back to Django.
+        """
+        with mock.patch.dict('os.environ', {'DJANGO_AUTO_COMPLETE': '1'}), \
+                mock.patch('subprocess.Popen') as Popen:
+            completion.autocomplete(self.instance_path)
+            completion.autocomplete(self.instance_path)
+        # Only one rebuild is started at a time.
+        self.assertEqual(Popen.call_count, 1)
+
+    def test_build_and_answer(self):
+        """
+        Build the cache in a subprocess, and answer from it.
+        """
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(
+            [TEST_ROOT, str(Path(completion.__file__).parent.parent)]))
+        subprocess.check_call(
+            [sys.executable, '-m', 'django_develop.completion', self.instance_path], env=env)
+
+        with Path(self.instance_path, 'completion-cache.json').open(encoding='utf-8') as f:
+            self.assertIn('--deploy', dict(json.load(f)['commands']['check']))
+
+        environ = {
+            'DJANGO_AUTO_COMPLETE': '1',
+            'COMP_WORDS': 'django-develop chec',
+            'COMP_CWORD': '1',
+        }
+        with mock.patch.dict('os.environ', environ), \
+                mock.patch('sys.stdout', new_callable=StringIO) as stdout:
+            with self.assertRaises(SystemExit) as raised:
+                completion.autocomplete(self.instance_path)
+        self.assertEqual(raised.exception.code, 0)
+        self.assertEqual(stdout.getvalue(), 'check\n')
@@ -0,0 +1,159 @@
+import os
+import sqlite3
+from configparser import RawConfigParser
+from io import StringIO
+from pathlib import Path
+from textwrap import dedent
+
+from py2_compat import unittest, mock, TemporaryDirectory
+
+from django_develop import cli, database_modes, snapshots
+
+
+def _config(text):
+    config = RawConfigParser()
+    config.read_string(dedent(text))
+    return config
+
+
+class TestPopDbModeFlag(unittest.TestCase):
+    """
+    `database_modes.pop_db_mode_flag()`
+    """
+
+    def test_flag(self):
+        argv = ['django-develop', '--db-mode=memory', 'check']
+        with mock.patch.dict('os.environ', {}):
+            database_modes.pop_db_mode_flag(argv)
+            self.assertEqual(os.environ[database_modes.ENVIRONMENT_VARIABLE], 'memory')
+        self.assertEqual(argv, ['django-develop', 'check'])
+
+
+class TestModeFromConfig(unittest.TestCase):
+    """
+    `database_modes.mode_from_config()`
+    """
+
+    def setUp(self):
+        patcher = mock.patch.dict('os.environ')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        os.environ.pop(database_modes.ENVIRONMENT_VARIABLE, None)
+
+    def test_modes(self):
+        self.assertEqual(database_modes.mode_from_config(_config('')), 'file')
+        self.assertEqual(database_modes.mode_from_config(_config('[database]\nmode = shm\n')),
+                         'shm')
+        os.environ[database_modes.ENVIRONMENT_VARIABLE] = 'memory'
+        self.assertEqual(database_modes.mode_from_config(_config('[database]\nmode = shm\n')),
+                         'memory')
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            database_modes.mode_from_config(_config('[database]\nmode = nonexistent\n'))
+
+
+class TestActivated(unittest.TestCase):
+    """
+    `database_modes.activated()`
+    """
+
+    def setUp(self):
+        temp_dir = TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.dd = cli.DjangoDevelop(Path(temp_dir.name, 'instance'))
+        with mock.patch('sys.stdout', new_callable=StringIO):
+            self.dd.init_instance('test_examples.likely_settings')
+
+        shm_path = Path(temp_dir.name, 'shm')
+        shm_path.mkdir()
+        for patcher in [mock.patch.object(database_modes, '_shm_directory', str(shm_path)),
+                        mock.patch.dict('os.environ')]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        os.environ.pop(database_modes.ENVIRONMENT_VARIABLE, None)
+
+        # Seed snapshot
+        seed = sqlite3.connect(str(snapshots.database_path(self.dd.instance_path)))
+        with seed:
+            seed.execute('CREATE TABLE t (x)')
+            seed.execute('INSERT INTO t VALUES (1)')
+        seed.close()
+        snapshots.snapshot(self.dd.instance_path, 'seed')
+
+    def _configure(self, mode):
+        config = self.dd.read_config()
+        config.read_string(dedent("""\
+            [database]
+            mode = {}
+            write_back = saved
+            """.format(mode)))
+        self.dd.write_config(config)
+        return database_modes.database_name(self.dd.instance_path, mode)
+
+    def _use(self, name):
+        db = sqlite3.connect(name, uri=True)
+        try:
+            with db:
+                db.execute('INSERT INTO t VALUES (2)')
+            return db.execute('SELECT x FROM t').fetchall()
+        finally:
+            db.close()
+
+    def _saved(self):
+        db = sqlite3.connect(str(snapshots.snapshot_path(self.dd.instance_path, 'saved')))
+        try:
+            return db.execute('SELECT x FROM t').fetchall()
+        finally:
+            db.close()
+
+    def test_shm(self):
+        name = self._configure('shm')
+        with database_modes.activated(self.dd):
+            self.assertEqual(self._use(name), [(1,), (2,)])
+        self.assertEqual(self._saved(), [(1,), (2,)])
+
+        # The database outlasts the process, and is not seeded again.
+        with database_modes.activated(self.dd):
+            self.assertEqual(self._use(name), [(1,), (2,), (2,)])
+
+    def test_memory(self):
+        name = self._configure('memory')
+        with database_modes.activated(self.dd):
+            self.assertEqual(self._use(name), [(1,), (2,)])
+            self.assertEqual(self._use(name), [(1,), (2,), (2,)])
+        self.assertEqual(self._saved(), [(1,), (2,), (2,)])
+
+    def test_read_only(self):
+        """
+        Commands that don't change the database don't write it back.
+        """
+        name = self._configure('memory')
+        with database_modes.activated(self.dd, ['django-develop', 'check']):
+            self._use(name)
+        self.assertFalse(snapshots.snapshot_path(self.dd.instance_path, 'saved').exists())
+
+    def test_reloader_parent(self):
+        """
+        Only runserver's serving child process prepares and writes back the database.
+        """
+        name = self._configure('shm')
+        argv = ['django-develop', 'runserver']
+        with database_modes.activated(self.dd, argv):
+            self.assertFalse(os.path.exists(name))
+        self.assertFalse(snapshots.snapshot_path(self.dd.instance_path, 'saved').exists())
+
+        with mock.patch.dict('os.environ', {'RUN_MAIN': 'true'}):
+            with database_modes.activated(self.dd, argv):
+                self.assertEqual(self._use(name), [(1,), (2,)])
+        self.assertEqual(self._saved(), [(1,), (2,)])
+
+    def test_seed_latest(self):
+        """
+        Without a configured seed, use the latest snapshot.
+        """
+        path = snapshots.snapshot_path(self.dd.instance_path, 'seed')
+        self.assertEqual(database_modes.seed_path(self.dd.instance_path, _config('')), path)
+        with self.assertRaises(ValueError):
+            database_modes.seed_path(self.dd.instance_path,
+                                     _config('[database]\nseed = nonexistent\n'))
@@ -0,0 +1,194 @@
+import os
+import socket
+from configparser import RawConfigParser
+from io import StringIO
+from pathlib import Path
+from textwrap import dedent
+
+from py2_compat import unittest, mock, TemporaryDirectory
+
+from django_develop import dev_caches
+
+
+def _config(text):
+    config = RawConfigParser()
+    config.read_string(dedent(text))
+    return config
+
+
+def _unused_port():
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+class TestServerAddresses(unittest.TestCase):
+    """
+    `dev_caches.server_addresses()`
+    """
+
+    def test_locations(self):
+        memcached = 'django.core.cache.backends.memcached.PyMemcacheCache'
+        redis = 'django.core.cache.backends.redis.RedisCache'
+        cases = [
+            (memcached, '127.0.0.1:11212', [(socket.AF_INET, ('127.0.0.1', 11212))]),
+            (memcached, ['a', 'b:1'], [(socket.AF_INET, ('a', 11211)),
+                                       (socket.AF_INET, ('b', 1))]),
+            (memcached, 'a;b', [(socket.AF_INET, ('a', 11211)), (socket.AF_INET, ('b', 11211))]),
+            (memcached, 'unix:/tmp/memcached.sock', [(socket.AF_UNIX, '/tmp/memcached.sock')]),
+            (redis, 'redis://cache:6380/1', [(socket.AF_INET, ('cache', 6380))]),
+            (redis, 'rediss://cache', [(socket.AF_INET, ('cache', 6379))]),
+            (redis, 'unix:///tmp/redis.sock', [(socket.AF_UNIX, '/tmp/redis.sock')]),
+            ('django.core.cache.backends.locmem.LocMemCache', 'anything', None),
+        ]
+        for (backend, location, addresses) in cases:
+            with self.subTest(backend=backend, location=location):
+                self.assertEqual(
+                    dev_caches.server_addresses({'BACKEND': backend, 'LOCATION': location}),
+                    addresses)
+
+
+class TestIsReachable(unittest.TestCase):
+    """
+    `dev_caches.is_reachable()`
+    """
+
+    def test_reachable(self):
+        server = socket.socket()
+        self.addCleanup(server.close)
+        server.bind(('127.0.0.1', 0))
+        server.listen(1)
+        self.assertTrue(dev_caches.is_reachable(socket.AF_INET, server.getsockname()))
+
+    def test_unreachable(self):
+        self.assertFalse(dev_caches.is_reachable(socket.AF_INET, ('127.0.0.1', _unused_port())))
+        self.assertFalse(dev_caches.is_reachable(socket.AF_UNIX, '/nonexistent/socket'))
+
+
+class TestDevCacheSettings(unittest.TestCase):
+    """
+    `dev_caches.dev_cache_settings()`
+    """
+
+    instance_path = Path('/instance')
+
+    def _settings(self, config_text, *layers):
+        with mock.patch('sys.stderr', new_callable=StringIO) as stderr:
+            settings = dev_caches.dev_cache_settings(self.instance_path, _config(config_text),
+                                                     list(layers))
+        return (settings, stderr.getvalue())
+
+    def test_unset(self):
+        self.assertEqual(self._settings('', {}), ({
+            'CACHES': {'default': {
+                'BACKEND': 'django_develop.cache.backends.sqlite.SQLiteCache',
+                'LOCATION': str(self.instance_path / 'cache' / 'default.sqlite3'),
+                'OPTIONS': {'MAX_SIZE': 256 * 1024 * 1024},
+            }},
+        }, ''))
+
+    def test_cached_sessions(self):
+        """
+        Cached database sessions are opt-in, and don't override the settings' SESSION_ENGINE.
+        """
+        config_text = '[cache]\ncached_sessions = true\n'
+        cases = [
+            (config_text, {}, 'django.contrib.sessions.backends.cached_db'),
+            ('', {}, None),
+            (config_text, {'SESSION_ENGINE': 'django.contrib.sessions.backends.db'}, None),
+            (config_text, {'SESSION_ENGINE': None}, None),
+        ]
+        for (text, layer, session_engine) in cases:
+            with self.subTest(text=text, layer=layer):
+                (settings, stderr) = self._settings(text, layer)
+                self.assertEqual(settings.get('SESSION_ENGINE'), session_engine)
+
+    def test_unreachable(self):
+        locmem = {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+        memcached = {
+            'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache',
+            'LOCATION': '127.0.0.1:{}'.format(_unused_port()),
+        }
+        (settings, stderr) = self._settings(
+            '[cache]\nbackend = local\nmax_entries = 10\n',
+            {'CACHES': {'default': locmem, 'memcached': memcached}},
+            {'CACHES': {}})  # Lower layers are ignored.
+        self.assertIn("cache 'memcached' unreachable", stderr)
+        self.assertEqual(settings, {
+            'CACHES': {
+                'default': locmem,
+                'memcached': {
+                    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                    'LOCATION': 'django-develop-memcached',
+                    'OPTIONS': {'MAX_ENTRIES': 10},
+                },
+            },
+        })
+
+    def test_reachable(self):
+        locmem = {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+        self.assertEqual(self._settings('', {'CACHES': {'default': locmem}}), ({}, ''))
+
+    def test_never(self):
+        self.assertEqual(self._settings('[cache]\nuse_dev_cache = never\n', {}), ({}, ''))
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            self._settings('[cache]\nuse_dev_cache = sometimes\n', {})
+
+
+class TestSQLiteCache(unittest.TestCase):
+    """
+    `django_develop.cache.backends.sqlite.SQLiteCache`
+    """
+
+    def setUp(self):
+        temp_dir = TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.location = os.path.join(temp_dir.name, 'cache', 'default.sqlite3')
+
+    def _cache(self, **options):
+        from django_develop.cache.backends.sqlite import SQLiteCache
+        return SQLiteCache(self.location, {'OPTIONS': options})
+
+    def test_operations(self):
+        cache = self._cache()
+        self.assertIsNone(cache.get('key'))
+        cache.set('key', {'value': 1})
+        self.assertEqual(cache.get('key'), {'value': 1})
+        self.assertFalse(cache.add('key', 2))
+        self.assertTrue(cache.add('other', 2))
+        self.assertTrue(cache.has_key('other'))
+        self.assertEqual(cache.get_many(['key', 'other', 'missing']),
+                         {'key': {'value': 1}, 'other': 2})
+        self.assertEqual(cache.incr('other'), 3)
+        self.assertTrue(cache.delete('other'))
+        self.assertFalse(cache.delete('other'))
+
+        # Shared between instances (and processes).
+        self.assertEqual(self._cache().get('key'), {'value': 1})
+
+        cache.clear()
+        self.assertIsNone(cache.get('key'))
+
+    def test_expiry(self):
+        cache = self._cache()
+        cache.set('expired', 1, timeout=0)
+        self.assertIsNone(cache.get('expired'))
+        self.assertTrue(cache.add('expired', 2))
+        self.assertEqual(cache.get('expired'), 2)
+        self.assertTrue(cache.touch('expired', timeout=0))
+        self.assertFalse(cache.has_key('expired'))
+
+    def test_eviction(self):
+        """
+        Evict the least recently used entries beyond MAX_SIZE.
+        """
+        cache = self._cache(MAX_SIZE=3000)
+        for i in range(5):
+            cache.set(i, b'x' * 1000)
+        cache.get(0)
+        cache.cull()
+        self.assertEqual([i for i in range(5) if cache.has_key(i)], [0, 4])
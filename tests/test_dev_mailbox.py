@@ -0,0 +1,235 @@
+import os
+import subprocess
+import sys
+from configparser import RawConfigParser
+from io import StringIO
+from pathlib import Path
+from textwrap import dedent
+
+from py2_compat import unittest, mock, TemporaryDirectory
+
+from django_develop import cli, dev_mailbox
+
+
+def _config(text):
+    config = RawConfigParser()
+    config.read_string(dedent(text))
+    return config
+
+
+def _row(subject, body='', sent=1500000000.0):
+    message = 'Subject: {}\nFrom: from@example.com\nTo: to@example.com\n\n{}\n'.format(
+        subject, body)
+    return (sent, 'from@example.com', 'to@example.com', subject, body, message.encode('ascii'))
+
+
+class TestEmailSettings(unittest.TestCase):
+    """
+    `dev_mailbox.email_settings()`
+    """
+
+    def test_backends(self):
+        cases = [
+            ('', 'django_develop.mail.backends.mailbox.EmailBackend'),
+            ('[mail]\nbackend = console\n', 'django.core.mail.backends.console.EmailBackend'),
+        ]
+        for (text, backend) in cases:
+            with self.subTest(text=text):
+                settings = dev_mailbox.email_settings(Path('instance'), _config(text))
+                self.assertEqual(settings['EMAIL_BACKEND'], backend)
+                self.assertEqual(settings[dev_mailbox.SETTING_NAME], {
+                    'PATH': str(Path('instance', 'mailbox.sqlite3')),
+                    'MAX_MESSAGES': dev_mailbox.DEFAULT_MAX_MESSAGES,
+                })
+
+    def test_unknown_backend(self):
+        with self.assertRaisesRegex(ValueError, "Unknown mail backend 'pigeon'"):
+            dev_mailbox.email_settings(Path('instance'), _config('[mail]\nbackend = pigeon\n'))
+
+
+class TestMailbox(unittest.TestCase):
+    """
+    `dev_mailbox.write_messages()`, `list_messages()` and `get_message()`
+    """
+
+    def setUp(self):
+        temp_dir = TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.path = Path(temp_dir.name, 'mailbox.sqlite3')
+        self.connection = dev_mailbox.connect(self.path)
+        self.addCleanup(self.connection.close)
+
+    def test_list_and_search(self):
+        dev_mailbox.write_messages(self.connection, [
+            _row('Welcome', 'Hello'), _row('Password reset', 'Your code is 50%_off'),
+            _row('Invoice', 'Hello again')])
+        self.assertEqual([row[4] for row in dev_mailbox.list_messages(self.connection)],
+                         ['Invoice', 'Password reset', 'Welcome'])
+        cases = [
+            ('hello', ['Invoice', 'Welcome']),
+            ('password', ['Password reset']),
+            ('50%_', ['Password reset']),
+            ('0%o', []),
+            ('to@example', ['Invoice', 'Password reset', 'Welcome']),
+        ]
+        for (search, subjects) in cases:
+            with self.subTest(search=search):
+                self.assertEqual([row[4] for row in
+                                  dev_mailbox.list_messages(self.connection, search)], subjects)
+                self.assertEqual(dev_mailbox.count_messages(self.connection, search),
+                                 len(subjects))
+        self.assertEqual(len(dev_mailbox.list_messages(self.connection, limit=1)), 1)
+
+    def test_search_index(self):
+        """
+        Searches use the full-text index, and find the same messages without it.
+        """
+        dev_mailbox.write_messages(self.connection, [
+            _row('Welcome', 'Hello'), _row('Password reset', 'Your code is 50%_off')])
+        indexes = {row[1] for row in self.connection.execute('PRAGMA index_list(messages)')}
+        self.assertLessEqual({'messages_sent', 'messages_recipients', 'messages_subject'},
+                             indexes)
+        (where, params) = dev_mailbox._search_clause(self.connection, 'reset')
+        plan = self.connection.execute(
+            'EXPLAIN QUERY PLAN SELECT id FROM messages' + where, params).fetchall()
+        self.assertIn('VIRTUAL TABLE INDEX', ' '.join(row[-1] for row in plan))
+
+        # Messages already in a mailbox are indexed when the index is created.
+        self.connection.executescript(
+            'DROP TABLE messages_search; DROP TRIGGER messages_search_insert; '
+            'DROP TRIGGER messages_search_delete;')
+        with mock.patch.object(dev_mailbox, '_has_search_index', return_value=False):
+            unindexed = [dev_mailbox.list_messages(self.connection, search)
+                         for search in ['reset', 'HELLO', '50%_', 'xyz']]
+        connection = dev_mailbox.connect(self.path)
+        self.addCleanup(connection.close)
+        self.assertEqual([dev_mailbox.list_messages(connection, search)
+                          for search in ['reset', 'HELLO', '50%_', 'xyz']], unindexed)
+        self.assertEqual([row[4] for row in unindexed[0]], ['Password reset'])
+
+    def test_get_message(self):
+        dev_mailbox.write_messages(self.connection, [_row('Welcome', 'Hello')])
+        ((message_id, _, _, _, _, size),) = dev_mailbox.list_messages(self.connection)
+        raw = dev_mailbox.get_message(self.connection, message_id)
+        self.assertEqual(len(raw), size)
+        self.assertEqual(dev_mailbox.format_message(raw), dedent("""\
+            From: from@example.com
+            To: to@example.com
+            Subject: Welcome
+
+            Hello"""))
+        self.assertIsNone(dev_mailbox.get_message(self.connection, message_id + 1))
+
+    def test_max_messages(self):
+        for i in range(5):
+            dev_mailbox.write_messages(self.connection, [_row('Message {}'.format(i))],
+                                       max_messages=3)
+        self.assertEqual([row[4] for row in dev_mailbox.list_messages(self.connection)],
+                         ['Message 4', 'Message 3', 'Message 2'])
+
+
+class TestMailboxWriter(unittest.TestCase):
+    """
+    `dev_mailbox.MailboxWriter`
+    """
+
+    def test_close_writes_queued(self):
+        with TemporaryDirectory() as temp_dir:
+            path = Path(temp_dir, 'mailbox.sqlite3')
+            writer = dev_mailbox.MailboxWriter(path, dev_mailbox.DEFAULT_MAX_MESSAGES)
+            writer.put([_row('Message {}'.format(i)) for i in range(1200)])
+            writer.close()
+            self.assertFalse(writer.thread.is_alive())
+            connection = dev_mailbox.connect(path)
+            self.addCleanup(connection.close)
+            self.assertEqual(dev_mailbox.count_messages(connection), 1200)
+
+
+class TestBackend(unittest.TestCase):
+    """
+    `django_develop.mail.backends.mailbox.EmailBackend`, and ``django-develop mail``
+    """
+
+    def test_send_and_show(self):
+        with TemporaryDirectory() as temp_dir:
+            Path(temp_dir, 'mail_project.py').write_text('INSTALLED_APPS = []\n')
+            instance_path = Path(temp_dir, 'instance')
+            with mock.patch('sys.stdout', new_callable=StringIO):
+                dd = cli.DjangoDevelop(instance_path)
+                dd.init_instance('mail_project')
+
+            env = dict(os.environ, PYTHONPATH=os.pathsep.join(
+                [temp_dir, str(Path(cli.__file__).parent.parent)]))
+            subprocess.check_call([sys.executable, '-c', dedent("""\
+                import django
+                from django.core.mail import EmailMessage, send_mail
+                from django_develop import cli
+                cli.DjangoDevelop({!r}).activate_dev_settings()
+                django.setup()
+                send_mail('Welcome', 'Hello there', 'from@example.com', ['to@example.com'])
+                message = EmailMessage('Report', 'See attached', 'from@example.com',
+                                       ['boss@example.com'], cc=['team@example.com'])
+                message.attach('report.csv', 'a,b\\n', 'text/csv')
+                message.send()
+                """.format(str(instance_path)))], env=env)
+
+            with mock.patch('sys.stdout', new_callable=StringIO) as stdout:
+                dev_mailbox.main_mail(dd, [])
+            lines = stdout.getvalue().splitlines()
+            self.assertEqual(len(lines), 2)
+            self.assertIn('from@example.com               -> boss@example.com, team@exam...',
+                          lines[0])
+            self.assertTrue(lines[0].endswith(' Report'), lines[0])
+            self.assertTrue(lines[1].endswith(' Welcome'), lines[1])
+
+            with mock.patch('sys.stdout', new_callable=StringIO) as stdout:
+                dev_mailbox.main_mail(dd, ['hello', '--limit', '5'])
+            self.assertEqual(len(stdout.getvalue().splitlines()), 1)
+
+            with mock.patch('sys.stdout', new_callable=StringIO) as stdout:
+                dev_mailbox.main_mail(dd, ['--show', lines[0].split()[0]])
+            shown = stdout.getvalue()
+            self.assertIn('Cc: team@example.com\nSubject: Report\n\nSee attached\n', shown)
+            self.assertIn('Attachments: report.csv', shown)
+
+            with self.assertRaisesRegex(ValueError, 'No message 99'):
+                dev_mailbox.main_mail(dd, ['--show', '99'])
+
+            with mock.patch('sys.stdout', new_callable=StringIO) as stdout:
+                dev_mailbox.main_mail(dd, ['--clear'])
+                dev_mailbox.main_mail(dd, [])
+            self.assertEqual(stdout.getvalue(), 'Removed 2 messages.\nNo messages.\n')
+
+    def test_management_command(self):
+        """
+        A project's own ``mail`` management command takes precedence over ``django-develop mail``.
+        """
+        with TemporaryDirectory() as temp_dir:
+            commands = Path(temp_dir, 'mail_app', 'management', 'commands')
+            commands.mkdir(parents=True)
+            for directory in [commands.parent.parent, commands.parent, commands]:
+                (directory / '__init__.py').touch()
+            (commands / 'mail.py').write_text(dedent("""\
+                from django.core.management.base import BaseCommand
+
+                class Command(BaseCommand):
+                    def handle(self, *args, **options):
+                        self.stdout.write('mail_app mail command')
+                """))
+            env = dict(os.environ, PYTHONPATH=os.pathsep.join(
+                [temp_dir, str(Path(cli.__file__).parent.parent)]))
+
+            for (installed_apps, expected) in [([], 'No messages.'),
+                                               (['mail_app'], 'mail_app mail command')]:
+                with self.subTest(installed_apps=installed_apps):
+                    Path(temp_dir, 'mail_project.py').write_text(
+                        'INSTALLED_APPS = {!r}\n'.format(installed_apps))
+                    instance_path = Path(temp_dir, 'instance-{}'.format(len(installed_apps)))
+                    with mock.patch('sys.stdout', new_callable=StringIO):
+                        cli.DjangoDevelop(instance_path).init_instance('mail_project')
+                    output = subprocess.check_output([sys.executable, '-c', dedent("""\
+                        from django_develop import cli, profiling
+                        cli.run_command(cli.DjangoDevelop({!r}), ['django-develop', 'mail'],
+                                        profiling.NullProfiler())
+                        """.format(str(instance_path)))], env=env).decode('utf-8')
+                    self.assertEqual(output.strip(), expected)
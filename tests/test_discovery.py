@@ -0,0 +1,153 @@
+import os.path
+from pathlib import Path
+
+from py2_compat import unittest, mock, TemporaryDirectory
+
+from django_develop import discovery
+
+
+TEST_ROOT = os.path.dirname(__file__)
+
+
+class TestScanPathEntries(unittest.TestCase):
+    """
+    `discovery.scan_path_entries()`
+    """
+
+    def test_dummy_path(self):
+        """
+        Discover no candidates from an empty / dummy path.
+        """
+        for path in [[], ['dummy'], ['foo', 'bar']]:
+            with self.subTest(path=path):
+                self.assertEqual(list(discovery.scan_path_entries(path)), [])
+
+    def test_examples(self):
+        """
+        Discover the example settings modules, in path order.
+        """
+        self.assertEqual(
+            list(discovery.scan_path_entries(['dummy', TEST_ROOT, 'dummy2'])),
+            [(TEST_ROOT, [
+                'test_examples.error_settings',
+                'test_examples.likely_settings',
+                'test_examples.no_likely_settings',
+                'test_examples.no_settings',
+            ])])
+
+
+class TestDiscoverAndProbe(unittest.TestCase):
+    """
+    `discovery.discover_and_probe()`
+    """
+
+    def test_examples(self):
+        """
+        Probe the example settings modules in worker processes.
+        """
+        self.assertEqual(
+            list(discovery.discover_and_probe([TEST_ROOT], jobs=2)),
+            [(TEST_ROOT, [
+                ('test_examples.error_settings', {'import raised NameError'}),
+                ('test_examples.likely_settings', set()),
+                ('test_examples.no_likely_settings', {'no likely setting names'}),
+                ('test_examples.no_settings', {'no uppercase names'}),
+            ])])
+
+    def test_isolated(self):
+        """
+        Probed modules are not imported into the calling process.
+        """
+        with mock.patch.dict('sys.modules'):
+            list(discovery.discover_and_probe([TEST_ROOT], jobs=1))
+            import sys
+            self.assertNotIn('test_examples.likely_settings', sys.modules)
+
+    def test_timeout(self):
+        """
+        Slow imports are reported as timed out, without holding up the rest.
+        """
+        with TemporaryDirectory() as temp_dir:
+            Path(temp_dir, 'slow_settings.py').write_text(
+                'import time\ntime.sleep(30)\n', encoding='utf-8')
+            Path(temp_dir, 'fast_settings.py').write_text(
+                'SECRET_KEY = "dummy"\n', encoding='utf-8')
+
+            self.assertEqual(
+                list(discovery.discover_and_probe([temp_dir], jobs=2, timeout=0.5,
+                                                  static=False)),
+                [(temp_dir, [
+                    ('fast_settings', set()),
+                    ('slow_settings', {'import timed out'}),
+                ])])
+
+    def test_hung_workers(self):
+        """
+        Probes that time out have their workers replaced, so probes queued behind them still run.
+        """
+        with TemporaryDirectory() as temp_dir:
+            for name in ['slow_a_settings', 'slow_b_settings', 'slow_c_settings']:
+                Path(temp_dir, name + '.py').write_text(
+                    'import time\ntime.sleep(30)\n', encoding='utf-8')
+            Path(temp_dir, 'z_fast_settings.py').write_text(
+                'SECRET_KEY = "dummy"\n', encoding='utf-8')
+
+            self.assertEqual(
+                list(discovery.discover_and_probe([temp_dir], jobs=2, timeout=1,
+                                                  static=False)),
+                [(temp_dir, [
+                    ('slow_a_settings', {'import timed out'}),
+                    ('slow_b_settings', {'import timed out'}),
+                    ('slow_c_settings', {'import timed out'}),
+                    ('z_fast_settings', set()),
+                ])])
+
+    def test_crashed_worker(self):
+        """
+        A probe whose worker process dies is reported, without holding up the rest.
+        """
+        with TemporaryDirectory() as temp_dir:
+            Path(temp_dir, 'exit_settings.py').write_text(
+                'import os\nos._exit(3)\n', encoding='utf-8')
+            Path(temp_dir, 'fast_settings.py').write_text(
+                'SECRET_KEY = "dummy"\n', encoding='utf-8')
+
+            self.assertEqual(
+                list(discovery.discover_and_probe([temp_dir], jobs=1, static=False)),
+                [(temp_dir, [
+                    ('exit_settings', {'probe exited with code 3'}),
+                    ('fast_settings', set()),
+                ])])
+
+    def test_static(self):
+        """
+        Modules that can be classified statically are not imported, and start no workers.
+        """
+        with TemporaryDirectory() as temp_dir:
+            Path(temp_dir, 'paths.py').write_text(
+                'import os\nBASE_DIR = os.path.dirname(os.path.abspath(__file__))\n',
+                encoding='utf-8')
+            Path(temp_dir, 'static_settings.py').write_text(
+                'from paths import BASE_DIR\nSECRET_KEY = "dummy"\n', encoding='utf-8')
+
+            with mock.patch.object(discovery, '_Worker') as worker:
+                self.assertEqual(
+                    list(discovery.discover_and_probe([temp_dir], jobs=1)),
+                    [(temp_dir, [('static_settings', set())])])
+            worker.assert_not_called()
+
+    def test_shadowed(self):
+        """
+        Module names found in several path entries are only probed once.
+        """
+        with TemporaryDirectory() as first, TemporaryDirectory() as second:
+            for temp_dir in [first, second]:
+                Path(temp_dir, 'shadowed_settings.py').write_text(
+                    'SECRET_KEY = "dummy"\n', encoding='utf-8')
+            with mock.patch('django_develop.discovery.find_potential_problems_statically',
+                            wraps=discovery.find_potential_problems_statically) as classify:
+                self.assertEqual(
+                    list(discovery.discover_and_probe([first, second], jobs=1)),
+                    [(first, [('shadowed_settings', set())]),
+                     (second, [('shadowed_settings', set())])])
+            self.assertEqual(classify.call_count, 1)
@@ -0,0 +1,189 @@
+import os
+from pathlib import Path
+
+from py2_compat import unittest, TemporaryDirectory
+
+from django_develop import discovery, utils
+from django_develop.index import CandidateIndex, fingerprint_is_current
+
+
+def _fingerprint(sys_path_entry):
+    fingerprint = []
+    utils.discover_candidates_in_path_entry(sys_path_entry, fingerprint=fingerprint)
+    return fingerprint
+
+
+class TestFingerprintIsCurrent(unittest.TestCase):
+    """
+    `index.fingerprint_is_current()`
+    """
+
+    def setUp(self):
+        temp_dir = TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.entry = temp_dir.name
+        Path(self.entry, 'pkg').mkdir()
+        Path(self.entry, 'pkg', '__init__.py').touch()
+        Path(self.entry, 'plain', 'sub').mkdir(parents=True)
+
+    def _touch_directory(self, path):
+        """
+        Make sure a directory's mtime changes, even on coarse-grained filesystems.
+        """
+        stat = os.stat(path)
+        os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+
+    def test_nonexistent(self):
+        fingerprint = _fingerprint(str(Path(self.entry, 'missing.zip')))
+        self.assertTrue(fingerprint_is_current(fingerprint))
+        Path(self.entry, 'missing.zip').touch()
+        self.assertFalse(fingerprint_is_current(fingerprint))
+
+    def test_new_module(self):
+        """
+        Adding a module to a package changes the fingerprint.
+        """
+        fingerprint = _fingerprint(self.entry)
+        self.assertTrue(fingerprint_is_current(fingerprint))
+        Path(self.entry, 'pkg', 'settings.py').touch()
+        self._touch_directory(str(Path(self.entry, 'pkg')))
+        self.assertFalse(fingerprint_is_current(fingerprint))
+
+    def test_new_package(self):
+        """
+        Turning a plain directory into a package changes the fingerprint.
+        """
+        fingerprint = _fingerprint(self.entry)
+        Path(self.entry, 'plain', '__init__.py').touch()
+        self._touch_directory(str(Path(self.entry, 'plain')))
+        self.assertFalse(fingerprint_is_current(fingerprint))
+
+    def test_unwalked_directory(self):
+        """
+        Changes below directories that discovery doesn't walk are ignored.
+        """
+        fingerprint = _fingerprint(self.entry)
+        Path(self.entry, 'plain', 'sub', 'settings.py').touch()
+        self._touch_directory(str(Path(self.entry, 'plain', 'sub')))
+        self.assertTrue(fingerprint_is_current(fingerprint))
+
+
+class TestCandidateIndex(unittest.TestCase):
+    """
+    `index.CandidateIndex` with `discovery.discover_and_probe()`
+    """
+
+    def setUp(self):
+        temp_dir = TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.entry = str(Path(temp_dir.name, 'entry'))
+        os.mkdir(self.entry)
+        self.settings_path = Path(self.entry, 'index_settings.py')
+        self.settings_path.write_text('FOO = 1\n', encoding='utf-8')
+        self.index_path = Path(temp_dir.name, 'candidate-index.json')
+
+    def _scan(self, index, static=True):
+        return list(discovery.discover_and_probe([self.entry], jobs=1, index=index,
+                                                 static=static))
+
+    def test_missing_or_corrupt(self):
+        """
+        Missing and corrupt index files load as empty indexes.
+        """
+        self.assertEqual(CandidateIndex.load(self.index_path).entries, {})
+        self.index_path.write_text('not json', encoding='utf-8')
+        self.assertEqual(CandidateIndex.load(self.index_path).entries, {})
+
+    def test_hits(self):
+        """
+        A second scan is answered from the saved index.
+        """
+        expected = [(self.entry, [('index_settings', {'no likely setting names'})])]
+
+        first = CandidateIndex.load(self.index_path)
+        self.assertEqual(self._scan(first), expected)
+        self.assertEqual((first.entry_hits, first.entry_misses), (0, 1))
+        self.assertEqual((first.probe_hits, first.probe_misses), (0, 1))
+
+        second = CandidateIndex.load(self.index_path)
+        self.assertEqual(self._scan(second), expected)
+        self.assertEqual((second.entry_hits, second.entry_misses), (1, 0))
+        self.assertEqual((second.probe_hits, second.probe_misses), (1, 0))
+
+    def test_modified_module(self):
+        """
+        Changed modules are probed again.
+        """
+        self._scan(CandidateIndex.load(self.index_path))
+
+        self.settings_path.write_text('SECRET_KEY = 1\n', encoding='utf-8')
+        stat = self.settings_path.stat()
+        os.utime(str(self.settings_path), (stat.st_atime, stat.st_mtime + 10))
+
+        index = CandidateIndex.load(self.index_path)
+        self.assertEqual(self._scan(index), [(self.entry, [('index_settings', set())])])
+        self.assertEqual((index.probe_hits, index.probe_misses), (0, 1))
+
+    def test_failed_import(self):
+        """
+        Failed imports are remembered, and not retried until the module changes.
+        """
+        self.settings_path.write_text('raise KeyError\n', encoding='utf-8')
+        expected = [(self.entry, [('index_settings', {'import raised KeyError'})])]
+        self.assertEqual(self._scan(CandidateIndex.load(self.index_path), static=False),
+                         expected)
+
+        index = CandidateIndex.load(self.index_path)
+        self.assertEqual(self._scan(index, static=False), expected)
+        self.assertEqual((index.probe_hits, index.probe_misses), (1, 0))
+
+    def test_modified_dependency(self):
+        """
+        Modules are probed again when a module they import from the same entry changes.
+        """
+        base_path = Path(self.entry, 'base.py')
+        base_path.write_text('FOO = 1\n', encoding='utf-8')
+        self.settings_path.write_text('from base import *\n', encoding='utf-8')
+        self._scan(CandidateIndex.load(self.index_path))
+
+        base_path.write_text('SECRET_KEY = 1\n', encoding='utf-8')
+        stat = base_path.stat()
+        os.utime(str(base_path), (stat.st_atime, stat.st_mtime + 10))
+
+        index = CandidateIndex.load(self.index_path)
+        self.assertIn(('index_settings', set()), self._scan(index)[0][1])
+
+    def test_installed_dependency(self):
+        """
+        Failed imports are probed again when a directory of the path changes.
+        """
+        site = Path(self.entry).parent / 'site'
+        site.mkdir()
+        self.settings_path.write_text('import dependency\nSECRET_KEY = 1\n', encoding='utf-8')
+
+        def scan():
+            index = CandidateIndex.load(self.index_path)
+            probed = list(discovery.discover_and_probe([self.entry, str(site)], jobs=1,
+                                                       index=index))
+            return (probed[0], index.probe_hits)
+
+        expected = (self.entry, [('index_settings', {'import raised ModuleNotFoundError'})])
+        self.assertEqual(scan(), (expected, 0))
+        self.assertEqual(scan(), (expected, 1))
+
+        Path(site, 'dependency.py').write_text('', encoding='utf-8')
+        stat = site.stat()
+        os.utime(str(site), (stat.st_atime, stat.st_mtime + 10))
+        self.assertEqual(scan(), ((self.entry, [('index_settings', set())]), 0))
+
+    def test_crash(self):
+        """
+        Probes that crash their worker are not remembered.
+        """
+        self.settings_path.write_text('import os\nos._exit(3)\n', encoding='utf-8')
+        expected = [(self.entry, [('index_settings', {'probe exited with code 3'})])]
+        self.assertEqual(self._scan(CandidateIndex.load(self.index_path)), expected)
+
+        index = CandidateIndex.load(self.index_path)
+        self.assertEqual(self._scan(index), expected)
+        self.assertEqual((index.probe_hits, index.probe_misses), (0, 1))
@@ -0,0 +1,86 @@
+import os
+from io import StringIO
+from pathlib import Path
+
+from py2_compat import unittest, mock, TemporaryDirectory
+
+from django_develop import cli, instances
+
+
+class TestInstancePath(unittest.TestCase):
+    """
+    `instances.instance_path()`
+    """
+
+    def test_names(self):
+        prefix = Path('/env')
+        self.assertEqual(instances.instance_path(prefix, 'default'),
+                         Path('/env/django-develop-instance'))
+        self.assertEqual(instances.instance_path(prefix, 'postgres-2'),
+                         Path('/env/django-develop-instances/postgres-2'))
+        for name in ['', '../x', 'a/b', '.hidden', 'current']:
+            with self.subTest(name=name):
+                with self.assertRaises(ValueError):
+                    instances.instance_path(prefix, name)
+
+
+@mock.patch.dict('os.environ')
+class TestSelection(unittest.TestCase):
+    """
+    `instances.pop_instance_flag()`, `instances.current_name()`, and `instances.switch()`
+    """
+
+    def setUp(self):
+        os.environ.pop(instances.ENVIRONMENT_VARIABLE, None)
+        temp_dir = TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.prefix = Path(temp_dir.name)
+
+    def test_pop_flag(self):
+        for (argv, rest, name) in [
+                (['dd', '--instance=a', 'runserver'], ['dd', 'runserver'], 'a'),
+                (['dd', 'runserver', '--instance', 'b', '8001'], ['dd', 'runserver', '8001'], 'b'),
+                (['dd', 'check'], ['dd', 'check'], None)]:
+            with self.subTest(argv=argv):
+                os.environ.pop(instances.ENVIRONMENT_VARIABLE, None)
+                instances.pop_instance_flag(argv)
+                self.assertEqual(argv, rest)
+                self.assertEqual(os.environ.get(instances.ENVIRONMENT_VARIABLE), name)
+
+    def test_current(self):
+        self.assertEqual(instances.current_name(self.prefix), 'default')
+        instances.switch(self.prefix, 'variant')
+        self.assertEqual(instances.current_name(self.prefix), 'variant')
+        os.environ[instances.ENVIRONMENT_VARIABLE] = 'other'
+        self.assertEqual(instances.current_name(self.prefix), 'other')
+
+    def test_list(self):
+        for name in ['default', 'b', 'a']:
+            instances.instance_path(self.prefix, name).mkdir(parents=True)
+        instances.switch(self.prefix, 'a')
+        self.assertEqual([name for (name, path) in instances.list_instances(self.prefix)],
+                         ['a', 'b', 'default'])
+
+    def test_get_DjangoDevelop(self):
+        with mock.patch('sys.prefix', str(self.prefix)):
+            self.assertEqual(cli._get_DjangoDevelop().instance_path,
+                             self.prefix / 'django-develop-instance')
+            os.environ[instances.ENVIRONMENT_VARIABLE] = 'variant'
+            self.assertEqual(cli._get_DjangoDevelop().instance_path,
+                             self.prefix / 'django-develop-instances' / 'variant')
+            os.environ[instances.ENVIRONMENT_VARIABLE] = '../escape'
+            with mock.patch('sys.stderr', new_callable=StringIO) as stderr:
+                with self.assertRaises(SystemExit):
+                    cli._get_DjangoDevelop()
+            self.assertIn('Invalid instance name', stderr.getvalue())
+
+    def test_use_instance(self):
+        instances.instance_path(self.prefix, 'variant').mkdir(parents=True)
+        with mock.patch('sys.prefix', str(self.prefix)), \
+                mock.patch('sys.stdout', new_callable=StringIO) as stdout:
+            with self.assertRaises(ValueError):
+                instances.main_use_instance(['missing'])
+            instances.main_use_instance(['variant'])
+            instances.main_use_instance([])
+        self.assertEqual(instances.current_name(self.prefix), 'variant')
+        self.assertIn('* variant', stdout.getvalue())
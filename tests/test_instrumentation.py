@@ -0,0 +1,200 @@
+import io
+import json
+import os
+import subprocess
+import sys
+from configparser import RawConfigParser
+from io import StringIO
+from pathlib import Path
+from textwrap import dedent
+
+from py2_compat import unittest, mock, TemporaryDirectory
+
+from django_develop import cli, instrumentation
+
+
+def _config(text):
+    config = RawConfigParser()
+    config.read_string(dedent(text))
+    return config
+
+
+class TestInstrumentationSettings(unittest.TestCase):
+    """
+    `instrumentation.instrumentation_settings()`
+    """
+
+    def test_disabled(self):
+        for text in ['', '[instrumentation]\nenabled = false\n']:
+            with self.subTest(text=text):
+                self.assertEqual(instrumentation.instrumentation_settings(
+                    Path('instance'), _config(text), [{'MIDDLEWARE': ['a']}]), {})
+
+    def test_enabled(self):
+        config = _config("""\
+            [instrumentation]
+            enabled = true
+            duplicate_threshold = 5
+            max_size = 2
+            """)
+        cases = [
+            ([], []),
+            ([{'MIDDLEWARE': ['a', 'b']}], ['a', 'b']),
+            ([{}, {'MIDDLEWARE': (instrumentation.MIDDLEWARE, 'a')}], ['a']),
+        ]
+        for (layers, middleware) in cases:
+            with self.subTest(layers=layers):
+                layer = instrumentation.instrumentation_settings(Path('instance'), config, layers)
+                self.assertEqual(layer['MIDDLEWARE'], [instrumentation.MIDDLEWARE] + middleware)
+                self.assertEqual(layer[instrumentation.SETTING_NAME], {
+                    'LOG': str(Path('instance', 'perf', 'requests.jsonl')),
+                    'DUPLICATE_THRESHOLD': 5,
+                    'MAX_BYTES': 2 * 1024 * 1024,
+                    'BACKUPS': instrumentation.DEFAULT_BACKUPS,
+                })
+
+    def test_unsupported(self):
+        """
+        Instrumentation is disabled, with a warning, for MIDDLEWARE_CLASSES.
+        """
+        config = _config('[instrumentation]\nenabled = true\n')
+        for layers in [[{'MIDDLEWARE_CLASSES': ['a']}],
+                       [{'MIDDLEWARE_CLASSES': ['a'], 'MIDDLEWARE': None}]]:
+            with self.subTest(layers=layers), \
+                    mock.patch('sys.stderr', new_callable=StringIO) as stderr:
+                self.assertEqual(
+                    instrumentation.instrumentation_settings(Path('instance'), config, layers),
+                    {})
+                self.assertIn('instrumentation is disabled', stderr.getvalue())
+
+
+class TestRotatingLog(unittest.TestCase):
+    """
+    `instrumentation.RotatingLog`
+    """
+
+    def test_rotation(self):
+        with TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, 'perf', 'requests.jsonl')
+            log = instrumentation.RotatingLog(path, max_bytes=30, backups=2)
+            for i in range(8):
+                log.append({'i': i, 'padding': 'x'})
+            self.assertEqual(sorted(os.listdir(os.path.dirname(path))),
+                             ['requests.jsonl', 'requests.jsonl.1', 'requests.jsonl.2'])
+            # Each record exceeds half the limit, so each file holds one.
+            self.assertEqual([record['i'] for record in instrumentation.read_log(path, 2)],
+                             [5, 6, 7])
+
+
+class TestQueryRecorder(unittest.TestCase):
+    """
+    `instrumentation.QueryRecorder`
+    """
+
+    def test_record(self):
+        recorder = instrumentation.QueryRecorder()
+        execute = mock.Mock(return_value='result')
+        for sql in ['SELECT a WHERE id = %s'] * 4 + ['SELECT b']:
+            self.assertEqual(recorder(execute, sql, [1], False, {}), 'result')
+        record = recorder.record(duplicate_threshold=3)
+        self.assertEqual(record['queries'], 5)
+        self.assertEqual(sorted((sql, count) for (sql, count, ms) in record['top_queries']),
+                         [('SELECT a WHERE id = %s', 4), ('SELECT b', 1)])
+        self.assertEqual(record['duplicates'], [['SELECT a WHERE id = %s', 4]])
+
+    def test_failing_query(self):
+        recorder = instrumentation.QueryRecorder()
+        with self.assertRaises(ValueError):
+            recorder(mock.Mock(side_effect=ValueError), 'SELECT', None, False, {})
+        self.assertEqual(recorder.record(duplicate_threshold=3)['queries'], 1)
+
+
+class TestReport(unittest.TestCase):
+    """
+    `instrumentation.percentile()` and `instrumentation.report()`
+    """
+
+    def test_percentile(self):
+        values = list(range(100, 0, -1))
+        self.assertEqual(instrumentation.percentile(values, 0.5), 50)
+        self.assertEqual(instrumentation.percentile(values, 0.95), 95)
+        self.assertEqual(instrumentation.percentile([7], 0.95), 7)
+        self.assertIsNone(instrumentation.percentile([], 0.5))
+
+    def test_report(self):
+        def record(view, ms, queries=(), duplicates=()):
+            return {'method': 'GET', 'path': '/', 'view': view, 'ms': ms,
+                    'queries': sum(count for (sql, count, ms) in queries),
+                    'top_queries': list(queries), 'duplicates': list(duplicates)}
+        records = ([record('fast', 1.0) for _ in range(10)] +
+                   [record('slow', 100.0, [['SELECT item', 20, 40.0]], [['SELECT item', 20]])])
+        lines = instrumentation.report(records)
+        self.assertEqual(lines[0], '11 requests: p50 1.0 ms, p95 100.0 ms, max 100.0 ms')
+        endpoints = lines[lines.index('Slowest endpoints (by p95):') + 1:]
+        self.assertTrue(endpoints[0].endswith('GET slow'), endpoints)
+        self.assertTrue(endpoints[1].endswith('GET fast'), endpoints)
+        self.assertIn('40.0 ms      20 times  SELECT item', lines[-4])
+        self.assertIn('1 requests, up to    20 times  SELECT item', lines[-1])
+
+    def test_empty(self):
+        self.assertEqual(instrumentation.report([]), ['No requests recorded.'])
+
+
+class TestMiddleware(unittest.TestCase):
+    """
+    `instrumentation.InstrumentationMiddleware`, through ``django-develop perf-report``
+    """
+
+    def test_requests(self):
+        with TemporaryDirectory() as temp_dir:
+            Path(temp_dir, 'perf_project.py').write_text(dedent("""\
+                from django.db import connection
+                from django.http import HttpResponse
+                from django.urls import path
+
+                ALLOWED_HOSTS = ['testserver']
+                INSTALLED_APPS = []
+                ROOT_URLCONF = 'perf_project'
+
+                def items(request):
+                    for i in range(4):
+                        with connection.cursor() as cursor:
+                            cursor.execute('SELECT %s', [i])
+                    return HttpResponse('items')
+
+                urlpatterns = [path('items/', items, name='items')]
+                """))
+            instance_path = Path(temp_dir, 'instance')
+            with mock.patch('sys.stdout', new_callable=StringIO):
+                dd = cli.DjangoDevelop(instance_path)
+                dd.init_instance('perf_project')
+            config = dd.read_config()
+            config.add_section('instrumentation')
+            config.set('instrumentation', 'enabled', 'true')
+            dd.write_config(config)
+
+            env = dict(os.environ, PYTHONPATH=os.pathsep.join(
+                [temp_dir, str(Path(cli.__file__).parent.parent)]))
+            subprocess.check_call([sys.executable, '-c', dedent("""\
+                import django
+                from django.test import Client
+                from django_develop import cli
+                cli.DjangoDevelop({!r}).activate_dev_settings()
+                django.setup()
+                client = Client()
+                assert client.get('/items/').status_code == 200
+                assert client.get('/missing/').status_code == 404
+                """.format(str(instance_path)))], env=env)
+
+            with io.open(str(instrumentation.log_path(instance_path)), encoding='utf-8') as f:
+                records = [json.loads(line) for line in f]
+            self.assertEqual([(r['path'], r['view'], r['status']) for r in records],
+                             [('/items/', 'items', 200), ('/missing/', None, 404)])
+            # The view's queries, and the transaction's BEGIN.
+            self.assertEqual([r['queries'] for r in records], [5, 0])
+            self.assertEqual(records[0]['duplicates'], [['SELECT %s', 4]])
+
+            with mock.patch('sys.stdout', new_callable=StringIO) as stdout:
+                instrumentation.main_perf_report(dd, ['--top', '1'])
+            self.assertTrue(stdout.getvalue().startswith('2 requests: p50 '), stdout.getvalue())
+            self.assertIn('Repeated queries (likely N+1):', stdout.getvalue())
@@ -0,0 +1,153 @@
+import os
+import subprocess
+import sys
+import time
+from io import StringIO
+from pathlib import Path
+from textwrap import dedent
+
+from py2_compat import unittest, mock, TemporaryDirectory
+
+from django_develop import cli, migration_templates
+
+
+class TestIsCacheable(unittest.TestCase):
+    """
+    `migration_templates.is_cacheable()`
+    """
+
+    def test_cacheable(self):
+        for args in [[], ['--noinput'], ['--no-input', '--skip-checks']]:
+            with self.subTest(args=args):
+                self.assertTrue(migration_templates.is_cacheable(args))
+
+    def test_not_cacheable(self):
+        for args in [['auth'], ['auth', 'zero'], ['--fake'], ['--database', 'other']]:
+            with self.subTest(args=args):
+                self.assertFalse(migration_templates.is_cacheable(args))
+
+
+class TestMigrationsFingerprint(unittest.TestCase):
+    """
+    `migration_templates.migrations_fingerprint()`
+    """
+
+    def setUp(self):
+        temp_dir = TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.migrations_path = Path(temp_dir.name, 'fingerprint_app', 'migrations')
+        self.migrations_path.mkdir(parents=True)
+        for path in [self.migrations_path.parent, self.migrations_path]:
+            (path / '__init__.py').touch()
+
+        sys.path.insert(0, temp_dir.name)
+        self.addCleanup(sys.path.remove, temp_dir.name)
+        self.addCleanup(sys.modules.pop, 'fingerprint_app', None)
+        self.addCleanup(sys.modules.pop, 'fingerprint_app.migrations', None)
+
+    def _fingerprint(self):
+        return migration_templates.migrations_fingerprint(
+            [('fingerprint_app', 'fingerprint_app.migrations'), ('other', None)])
+
+    def test_changes(self):
+        """
+        The fingerprint changes when migration files are added or edited, and only then.
+        """
+        migration = self.migrations_path / '0001_initial.py'
+        empty = self._fingerprint()
+
+        migration.write_text('operations = []\n')
+        added = self._fingerprint()
+        self.assertNotEqual(added, empty)
+
+        (self.migrations_path / 'README.txt').write_text('Not a migration.\n')
+        self.assertEqual(self._fingerprint(), added)
+
+        migration.write_text('operations = [None]\n')
+        self.assertNotIn(self._fingerprint(), {empty, added})
+
+
+class TestEvict(unittest.TestCase):
+    """
+    `migration_templates.evict()`
+    """
+
+    def setUp(self):
+        temp_dir = TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.directory = Path(temp_dir.name)
+
+        # Oldest first.
+        self.paths = [self.directory / '{}.sqlite3'.format(i) for i in range(4)]
+        now = time.time()
+        for (i, path) in enumerate(self.paths):
+            path.write_bytes(b'x' * 100)
+            os.utime(str(path), (now - 100 + i, now - 100 + i))
+
+    def _remaining(self):
+        return sorted(path.name for path in self.directory.iterdir())
+
+    def test_count(self):
+        removed = migration_templates.evict(self.directory, max_templates=2, max_size=10000)
+        self.assertEqual(removed, self.paths[1::-1])
+        self.assertEqual(self._remaining(), ['2.sqlite3', '3.sqlite3'])
+
+    def test_size(self):
+        migration_templates.evict(self.directory, max_templates=10, max_size=350)
+        self.assertEqual(self._remaining(), ['1.sqlite3', '2.sqlite3', '3.sqlite3'])
+
+    def test_keep(self):
+        migration_templates.evict(self.directory, max_templates=1, max_size=0,
+                                  keep=self.paths[0])
+        self.assertEqual(self._remaining(), ['0.sqlite3'])
+
+
+class TestMigrate(unittest.TestCase):
+    """
+    `migration_templates.migrate()`, in subprocesses with Django set up.
+    """
+
+    def setUp(self):
+        temp_dir = TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        Path(temp_dir.name, 'template_settings.py').write_text(dedent("""\
+            INSTALLED_APPS = ['django.contrib.contenttypes']
+            """))
+        self.instance_path = Path(temp_dir.name, 'instance')
+        with mock.patch('sys.stdout', new_callable=StringIO):
+            cli.DjangoDevelop(self.instance_path).init_instance('template_settings')
+
+        self.env = dict(os.environ, PYTHONPATH=os.pathsep.join(
+            [temp_dir.name, str(Path(migration_templates.__file__).parent.parent)]))
+
+    def _migrate(self, *args):
+        output = subprocess.check_output([sys.executable, '-c', dedent("""\
+            import django
+            from django.core.management import call_command
+            from django_develop import cli, migration_templates
+            def execute():
+                django.setup()
+                call_command('migrate', verbosity=0)
+            dd = cli.DjangoDevelop({!r})
+            dd.activate_dev_settings()
+            print(migration_templates.migrate(dd, {!r}, execute))
+            """.format(str(self.instance_path), list(args)))], env=self.env)
+        return output.decode('utf-8').splitlines()[-1]
+
+    def test_template(self):
+        db_path = self.instance_path / 'db.sqlite3'
+
+        self.assertEqual(self._migrate(), 'migrated')
+        self.assertEqual(len(list(migration_templates.templates_path(self.instance_path)
+                                  .iterdir())), 1)
+
+        # Existing databases are migrated as usual.
+        self.assertEqual(self._migrate(), 'migrated')
+
+        db_path.unlink()
+        self.assertEqual(self._migrate('--noinput'), 'template')
+        self.assertTrue(db_path.exists())
+
+        # Other arguments bypass the templates.
+        db_path.unlink()
+        self.assertEqual(self._migrate('contenttypes'), 'migrated')
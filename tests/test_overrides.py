@@ -0,0 +1,131 @@
+import os
+import sys
+import types
+from configparser import RawConfigParser
+from pathlib import Path
+from textwrap import dedent
+
+from py2_compat import unittest, mock, TemporaryDirectory
+
+from django_develop import overrides
+
+
+def _config(text):
+    config = RawConfigParser()
+    config.read_string(dedent(text))
+    return config
+
+
+def _resolve(layer):
+    return {name: (value.resolve() if isinstance(value, overrides.Lazy) else value)
+            for (name, value) in layer.items()}
+
+
+class TestConfigLayer(unittest.TestCase):
+    """
+    `overrides.config_layer()`
+    """
+
+    def test_values(self):
+        layer = overrides.config_layer(_config("""\
+            [overrides]
+            DEBUG = False
+            MIDDLEWARE = ['a.Middleware',
+                'b.Middleware']
+            PATH_JOIN = import:os.path.join
+            """))
+        self.assertEqual(_resolve(layer), {
+            'DEBUG': False,
+            'MIDDLEWARE': ['a.Middleware', 'b.Middleware'],
+            'PATH_JOIN': os.path.join,
+        })
+
+    def test_lazy(self):
+        """
+        Values are only evaluated when resolved.
+        """
+        layer = overrides.config_layer(_config("""\
+            [overrides]
+            INVALID = not a literal
+            MISSING = import:nonexistent.module.name
+            """))
+        with self.assertRaises(ValueError) as raised:
+            layer['INVALID'].resolve()
+        self.assertIn('Invalid value for INVALID', str(raised.exception))
+        with self.assertRaises(ImportError):
+            layer['MISSING'].resolve()
+
+    def test_no_section(self):
+        self.assertEqual(overrides.config_layer(_config('')), {})
+
+
+class TestModuleLayer(unittest.TestCase):
+    """
+    `overrides.module_layer()`
+    """
+
+    def setUp(self):
+        temp_dir = TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.module_dir = Path(temp_dir.name)
+        for patcher in [mock.patch('sys.path', [temp_dir.name] + sys.path),
+                        mock.patch.dict('sys.modules')]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_deferred(self):
+        """
+        Import the module only when one of its values is resolved.
+        """
+        (self.module_dir / 'deferred_overrides.py').write_text(dedent("""\
+            import os
+            DEBUG = False
+            CACHE_DIR = os.path.join('a', 'b')
+            _private = 1
+            """))
+        layer = overrides.module_layer('deferred_overrides')
+        self.assertEqual(sorted(layer), ['CACHE_DIR', 'DEBUG'])
+        self.assertNotIn('deferred_overrides', sys.modules)
+        self.assertEqual(_resolve(layer), {'DEBUG': False, 'CACHE_DIR': os.path.join('a', 'b')})
+
+    def test_inconclusive(self):
+        """
+        Import modules that can't be analysed right away.
+        """
+        (self.module_dir / 'star_overrides.py').write_text('from os.path import *\nDEBUG = 1\n')
+        layer = overrides.module_layer('star_overrides')
+        self.assertIn('star_overrides', sys.modules)
+        self.assertEqual(layer, {'DEBUG': 1})
+
+
+class TestLayers(unittest.TestCase):
+    """
+    `overrides.ModuleLayer`, `overrides.lookup()`, and `overrides.merge()`
+    """
+
+    def setUp(self):
+        self.module = types.ModuleType(str('layer_settings'))
+        self.module.DEBUG = False
+        self.module.SECRET_KEY = ''
+        self.module.lowercase = 1
+
+    def test_module_layer(self):
+        layer = overrides.ModuleLayer(self.module, hidden={'SECRET_KEY'})
+        self.assertEqual(layer.keys(), ['DEBUG'])
+        self.assertIn('DEBUG', layer)
+        self.assertNotIn('SECRET_KEY', layer)
+        self.assertNotIn('lowercase', layer)
+        with self.assertRaises(KeyError):
+            layer['SECRET_KEY']
+
+    def test_lookup(self):
+        thunk = mock.Mock(return_value=['value'])
+        layers = [{'LAZY': overrides.Lazy('x', thunk)},
+                  overrides.ModuleLayer(self.module, hidden={'SECRET_KEY'}),
+                  {'DEBUG': True, 'SECRET_KEY': 'default'}]
+        self.assertFalse(thunk.called)
+        self.assertEqual(overrides.lookup(layers, 'LAZY'), ['value'])
+        self.assertEqual(overrides.merge(layers),
+                         {'LAZY': ['value'], 'DEBUG': False, 'SECRET_KEY': 'default'})
+        with self.assertRaises(KeyError):
+            overrides.lookup(layers, 'MISSING')
@@ -0,0 +1,68 @@
+import importlib
+import json
+import sys
+from pathlib import Path
+
+from py2_compat import unittest, mock, TemporaryDirectory
+
+from django_develop import profiling
+
+
+class TestPopProfileStartupFlag(unittest.TestCase):
+    """
+    `profiling.pop_profile_startup_flag()`
+    """
+
+    def test_flag(self):
+        argv = ['django-develop', '--profile-startup', 'check']
+        with mock.patch.dict('os.environ', clear=True):
+            self.assertTrue(profiling.pop_profile_startup_flag(argv))
+        self.assertEqual(argv, ['django-develop', 'check'])
+
+    def test_environment(self):
+        cases = {'': False, '0': False, '1': True}
+        for (value, expected) in cases.items():
+            with self.subTest(value=value):
+                with mock.patch.dict('os.environ', {profiling.ENVIRONMENT_VARIABLE: value}):
+                    self.assertEqual(
+                        profiling.pop_profile_startup_flag(['django-develop', 'check']),
+                        expected)
+
+
+class TestStartupProfiler(unittest.TestCase):
+    """
+    `profiling.StartupProfiler`
+    """
+
+    def test_phases(self):
+        profiler = profiling.StartupProfiler()
+        with profiler.phase('outer'):
+            with profiler.phase('inner'):
+                pass
+        self.assertEqual([(p['name'], p['parent']) for p in profiler.phases],
+                         [('outer', None), ('inner', 'outer')])
+
+    def test_trace_imports(self):
+        """
+        Record the tree of imports triggered by a module.
+        """
+        with TemporaryDirectory() as temp_dir:
+            Path(temp_dir, 'traced_settings.py').write_text(
+                'import traced_dependency\n', encoding='utf-8')
+            Path(temp_dir, 'traced_dependency.py').write_text('', encoding='utf-8')
+
+            profiler = profiling.StartupProfiler()
+            with mock.patch('sys.path', [temp_dir] + sys.path), mock.patch.dict('sys.modules'):
+                with profiler.trace_imports('traced_settings'):
+                    importlib.import_module('traced_settings')
+
+            [root] = profiler.imports
+            self.assertEqual(root['module'], 'traced_settings')
+            self.assertEqual([child['module'] for child in root['children']],
+                             ['traced_dependency'])
+
+            report_path = Path(temp_dir, 'startup-profile.json')
+            with mock.patch('sys.stderr'):
+                profiler.report(report_path)
+            with report_path.open(encoding='utf-8') as f:
+                self.assertEqual(json.load(f)['imports'][0]['module'], 'traced_settings')
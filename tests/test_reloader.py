@@ -0,0 +1,182 @@
+import os
+import sys
+from configparser import RawConfigParser
+from io import StringIO
+from pathlib import Path
+from textwrap import dedent
+
+from py2_compat import unittest, mock, TemporaryDirectory
+
+from django_develop import reloader
+
+
+def _config(text):
+    config = RawConfigParser()
+    config.read_string(dedent(text))
+    return config
+
+
+class TestWatchScope(unittest.TestCase):
+    """
+    `reloader.WatchScope`
+    """
+
+    def test_includes(self):
+        scope = reloader.WatchScope(['/project', '/env/site-packages/installed'],
+                                    excluded_paths=['/project/instance', '/env'],
+                                    excluded_names=['.git', '*.egg-info'])
+        cases = [
+            ('/project/app/models.py', True),
+            ('/project/app', True),
+            ('/project/instance/db.sqlite3', False),
+            ('/project/.git/HEAD', False),
+            ('/project/app.egg-info/PKG-INFO', False),
+            ('/projectile/app.py', False),
+            ('/env/site-packages/django/__init__.py', False),
+            # Exclusions containing a root don't apply within it.
+            ('/env/site-packages/installed/settings.py', True),
+        ]
+        for (path, included) in cases:
+            with self.subTest(path=path):
+                self.assertEqual(scope.includes(path), included)
+
+
+class TestScopeFromConfig(unittest.TestCase):
+    """
+    `reloader.source_roots()` and `reloader.scope_from_config()`
+    """
+
+    def setUp(self):
+        temp_dir = TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.project = os.path.realpath(temp_dir.name)
+        os.makedirs(os.path.join(self.project, 'proj', 'settings'))
+        for name in ['proj/__init__.py', 'proj/settings/__init__.py', 'proj/settings/dev.py']:
+            Path(self.project, name).touch()
+        patcher = mock.patch('sys.path', [self.project] + sys.path)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_source_roots(self):
+        self.assertEqual(reloader.source_roots('proj.settings.dev', site_dirs=set()),
+                         [self.project])
+        self.assertEqual(reloader.source_roots('proj.settings.dev', site_dirs={self.project}),
+                         [os.path.join(self.project, 'proj')])
+        self.assertEqual(reloader.source_roots('nonexistent_settings'), [])
+
+    def test_scope(self):
+        instance_path = Path(self.project, 'instance')
+        scope = reloader.scope_from_config(instance_path, _config("""\
+            [django-develop]
+            base_settings_module = proj.settings.dev
+            [reloader]
+            watch = /shared/templates
+            exclude =
+                docs
+                {}
+            """.format(os.path.join(self.project, 'proj', 'generated'))))
+        self.assertEqual(scope.roots, (self.project, '/shared/templates'))
+        for (path, included) in [('proj/settings/dev.py', True),
+                                 ('instance/db.sqlite3', False),
+                                 ('instance/static_files/app.js', False),
+                                 ('docs/conf.py', False),
+                                 ('proj/generated/schema.py', False)]:
+            with self.subTest(path=path):
+                self.assertEqual(scope.includes(os.path.join(self.project, path)), included)
+
+    def test_invalid_backend(self):
+        with self.assertRaises(ValueError):
+            reloader.get_reloader(Path(self.project), _config('[reloader]\nbackend = fsevents\n'))
+
+    def test_django_backend(self):
+        self.assertIsNone(reloader.get_reloader(Path(self.project),
+                                                _config('[reloader]\nbackend = django\n')))
+
+    def test_unknown_roots(self):
+        with mock.patch('sys.stderr', new_callable=StringIO) as stderr:
+            self.assertIsNone(reloader.get_reloader(Path(self.project), _config("""\
+                [django-develop]
+                base_settings_module = nonexistent_settings
+                """)))
+        self.assertIn("cannot locate the project's source roots", stderr.getvalue())
+
+
+class TestStatReloader(unittest.TestCase):
+    """
+    `reloader.get_reloader()` with the stat backend.
+    """
+
+    def test_watched_files(self):
+        with TemporaryDirectory() as temp_dir:
+            temp_dir = os.path.realpath(temp_dir)
+            watched = Path(temp_dir, 'watched.py')
+            watched.touch()
+            config = _config('[django-develop]\nbase_settings_module = nonexistent_settings\n'
+                             '[reloader]\nbackend = stat\nwatch = {}\n'.format(temp_dir))
+            instance = reloader.get_reloader(Path(temp_dir, 'instance'), config)
+            instance.extra_files.add(watched)
+            instance.extra_files.add(Path(temp_dir, 'instance', 'db.sqlite3'))
+            instance.watch_dir(temp_dir, '**/*.html')
+            instance.watch_dir(os.path.dirname(os.__file__), '**/*.html')
+            Path(temp_dir, 'page.html').touch()
+            self.assertEqual(sorted(instance.watched_files()),
+                             [Path(temp_dir, 'page.html'), watched])
+
+
+@unittest.skipUnless(reloader.inotify_available(), 'inotify is not available')
+class TestInotifyReloader(unittest.TestCase):
+    """
+    `reloader.get_reloader()` with the inotify backend.
+    """
+
+    def setUp(self):
+        temp_dir = TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.root = os.path.realpath(temp_dir.name)
+        self.config = _config('[django-develop]\nbase_settings_module = nonexistent_settings\n'
+                              '[reloader]\nbackend = inotify\nwatch = {}\n'.format(self.root))
+        self.instance = reloader.get_reloader(Path(self.root, 'instance'), self.config)
+        self.instance.SLEEP_TIME = 0
+        self.ticker = self.instance.tick()
+        self.addCleanup(self.ticker.close)
+
+    def _changes(self):
+        """
+        Run the reloader until it sees no more events, and return the files it was notified of.
+        """
+        changed = []
+        with mock.patch.object(self.instance, 'notify_file_changed', changed.append):
+            for _ in range(5):
+                next(self.ticker)
+        return changed
+
+    def test_notify(self):
+        watched = Path(self.root, 'app', 'models.py')
+        unwatched = Path(self.root, 'app', 'other.py')
+        watched.parent.mkdir()
+        watched.touch()
+        unwatched.touch()
+        templates = Path(self.root, 'templates')
+        templates.mkdir()
+        self.instance.extra_files.add(watched)
+        self.instance.watch_dir(str(templates), '**/*.html')
+        self.assertEqual(self._changes(), [])
+
+        watched.write_text('changed')
+        unwatched.write_text('changed')
+        (templates / 'nested').mkdir()
+        self.assertEqual(self._changes(), [watched])
+
+        # New directories under watched globs are watched too.
+        (templates / 'nested' / 'page.html').write_text('changed')
+        (templates / 'nested' / 'page.txt').write_text('changed')
+        self.assertEqual(self._changes(), [templates / 'nested' / 'page.html'])
+
+    def test_instance_directory(self):
+        db = Path(self.root, 'instance', 'db.sqlite3')
+        db.parent.mkdir()
+        db.touch()
+        self.instance.extra_files.add(db)
+        self.assertEqual(self._changes(), [])
+        db.write_text('changed')
+        self.assertEqual(self._changes(), [])
@@ -0,0 +1,193 @@
+import os
+import subprocess
+import sys
+from collections import Counter
+from configparser import RawConfigParser
+from io import StringIO
+from pathlib import Path
+from textwrap import dedent
+
+from py2_compat import unittest, mock, TemporaryDirectory
+
+from django_develop import cli, request_profiling
+
+
+def _config(text):
+    config = RawConfigParser()
+    config.read_string(dedent(text))
+    return config
+
+
+class TestProfilingSettings(unittest.TestCase):
+    """
+    `request_profiling.profiling_settings()`
+    """
+
+    def test_disabled(self):
+        self.assertEqual(request_profiling.profiling_settings(
+            Path('instance'), _config(''), [{'MIDDLEWARE': ['a']}]), {})
+
+    def test_enabled(self):
+        config = _config("""\
+            [request_profiling]
+            enabled = true
+            interval = 2
+            clock = cpu
+            """)
+        layer = request_profiling.profiling_settings(
+            Path('instance'), config, [{'MIDDLEWARE': ['a']}])
+        self.assertEqual(layer['MIDDLEWARE'], [request_profiling.MIDDLEWARE, 'a'])
+        self.assertEqual(layer[request_profiling.SETTING_NAME], {
+            'DIRECTORY': str(Path('instance', 'profiles')),
+            'INTERVAL': 0.002,
+            'CLOCK': 'cpu',
+            'MAX_PROFILES': request_profiling.DEFAULT_MAX_PROFILES,
+        })
+
+    def test_unknown_clock(self):
+        config = _config("""\
+            [request_profiling]
+            enabled = true
+            clock = sundial
+            """)
+        with self.assertRaisesRegex(ValueError, "Unknown profiling clock 'sundial'"):
+            request_profiling.profiling_settings(Path('instance'), config, [])
+
+    def test_middleware_classes(self):
+        """
+        Profiling is disabled, with a warning, for settings that use MIDDLEWARE_CLASSES.
+        """
+        config = _config('[request_profiling]\nenabled = true\n')
+        with mock.patch('sys.stderr', new_callable=StringIO) as stderr:
+            self.assertEqual(request_profiling.profiling_settings(
+                Path('instance'), config, [{'MIDDLEWARE_CLASSES': ['a']}]), {})
+        self.assertIn('request profiling is disabled', stderr.getvalue())
+
+
+class TestProfiles(unittest.TestCase):
+    """
+    `request_profiling.write_profile()`, `list_profiles()` and `read_stacks()`
+    """
+
+    def test_write_and_evict(self):
+        stacks = Counter({'main (a.py:1);work (a.py:5)': 3, 'main (a.py:1)': 1})
+        with TemporaryDirectory() as temp_dir:
+            ids = [request_profiling.write_profile(
+                temp_dir, {'started': 1500000000.25 + i, 'path': '/items/1/'}, stacks,
+                max_profiles=2) for i in range(3)]
+            self.assertTrue(ids[0].endswith('-250000-items_1'), ids[0])
+            self.assertEqual([profile['id'] for profile in
+                              request_profiling.list_profiles(temp_dir)], ids[:0:-1])
+            self.assertEqual(len(os.listdir(temp_dir)), 4)
+            self.assertEqual(request_profiling.read_stacks(temp_dir, ids[2]), stacks)
+
+    def test_invalid_id(self):
+        for profile_id in ['../secret', '20200101-000000-000000-a/../../b', '']:
+            with self.subTest(profile_id=profile_id):
+                with self.assertRaises(ValueError):
+                    request_profiling.read_stacks('profiles', profile_id)
+
+
+class TestDiff(unittest.TestCase):
+    """
+    `request_profiling.function_totals()`, `diff_stacks()` and `diff_folded()`
+    """
+
+    base = Counter({'main;render': 6, 'main;query': 2, 'main': 2})
+    other = Counter({'main;render': 2, 'main;query': 8})
+
+    def test_function_totals(self):
+        (self_samples, inclusive_samples) = request_profiling.function_totals(self.base)
+        self.assertEqual(self_samples, Counter({'render': 6, 'query': 2, 'main': 2}))
+        self.assertEqual(inclusive_samples, Counter({'main': 10, 'render': 6, 'query': 2}))
+
+    def test_diff_stacks(self):
+        self.assertEqual(request_profiling.diff_stacks(self.base, self.other), [
+            ('query', 20.0, 80.0), ('render', 60.0, 20.0), ('main', 20.0, 0.0)])
+
+    def test_diff_folded(self):
+        self.assertEqual(request_profiling.diff_folded(self.base, self.other),
+                         'main 2 0\nmain;query 2 8\nmain;render 6 2\n')
+
+
+class TestMiddleware(unittest.TestCase):
+    """
+    `request_profiling.ProfilingMiddleware`, and the views in `dev_urls`
+    """
+
+    def test_profile_request(self):
+        with TemporaryDirectory() as temp_dir:
+            Path(temp_dir, 'profiled_project.py').write_text(dedent("""\
+                import time
+                from django.http import HttpResponse
+                from django.urls import include, path
+
+                ALLOWED_HOSTS = ['testserver']
+                INSTALLED_APPS = []
+                ROOT_URLCONF = 'profiled_project'
+
+                def spin_for_profiler(request):
+                    deadline = time.time() + 0.2
+                    while time.time() < deadline:
+                        pass
+                    return HttpResponse('done')
+
+                urlpatterns = [
+                    path('spin/', spin_for_profiler),
+                    path('__profiles__/', include('django_develop.request_profiling_urls')),
+                ]
+                """))
+            instance_path = Path(temp_dir, 'instance')
+            with mock.patch('sys.stdout', new_callable=StringIO):
+                dd = cli.DjangoDevelop(instance_path)
+                dd.init_instance('profiled_project')
+            config = dd.read_config()
+            config.add_section('request_profiling')
+            config.set('request_profiling', 'enabled', 'true')
+            config.set('request_profiling', 'interval', '1')
+            dd.write_config(config)
+
+            env = dict(os.environ, PYTHONPATH=os.pathsep.join(
+                [temp_dir, str(Path(cli.__file__).parent.parent)]))
+            output = subprocess.check_output([sys.executable, '-c', dedent("""\
+                import django
+                from django.test import Client
+                from django_develop import cli
+                cli.DjangoDevelop({!r}).activate_dev_settings()
+                django.setup()
+
+                # runserver builds the middleware, and serves requests, in other threads.
+                import threading
+                threaded = []
+                thread = threading.Thread(target=lambda: threaded.append(
+                    Client().get('/spin/?{parameter}').get('{header}')))
+                thread.start()
+                thread.join()
+                print('threaded:', threaded[0] is not None)
+
+                client = Client()
+                print('unmarked:', client.get('/spin/').get('{header}'))
+                ids = [client.get('/spin/?{parameter}').get('{header}'),
+                       client.get('/spin/', HTTP_X_DJANGO_DEVELOP_PROFILE='1').get('{header}')]
+                for url in ['/__profiles__/', '/__profiles__/{{}}/'.format(ids[0]),
+                            '/__profiles__/{{}}/folded/'.format(ids[0]),
+                            '/__profiles__/diff/?base={{}}&other={{}}'.format(*ids),
+                            '/__profiles__/missing/']:
+                    print(url.split('/')[2] or 'index', client.get(url).status_code)
+                """.format(str(instance_path), header=request_profiling.HEADER,
+                           parameter=request_profiling.QUERY_PARAMETER))],
+                env=env).decode('utf-8')
+
+            self.assertIn('unmarked: None', output)
+            self.assertEqual([line.split()[-1] for line in output.splitlines()[2:]],
+                             ['200', '200', '200', '200', '404'])
+            self.assertIn('threaded: True', output)
+            profiles = request_profiling.list_profiles(
+                str(request_profiling.profiles_path(instance_path)))
+            self.assertEqual(len(profiles), 3)
+            stacks = request_profiling.read_stacks(
+                str(request_profiling.profiles_path(instance_path)), profiles[0]['id'])
+            self.assertGreater(sum(stacks.values()), 10)
+            # Stacks start below the middleware.
+            self.assertTrue(all(not stack.startswith('__call__') for stack in stacks), stacks)
+            self.assertTrue(any('spin_for_profiler' in stack for stack in stacks), stacks)
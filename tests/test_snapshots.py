@@ -0,0 +1,96 @@
+import sqlite3
+from io import StringIO
+from pathlib import Path
+
+from py2_compat import unittest, mock, TemporaryDirectory
+
+from django_develop import snapshots, sqlite
+
+
+class TestCopyDatabase(unittest.TestCase):
+    """
+    `sqlite.copy_database()`
+    """
+
+    def test_wal(self):
+        """
+        Copies include changes that are still in the source's WAL.
+        """
+        with TemporaryDirectory() as temp_dir:
+            source_path = str(Path(temp_dir, 'source.sqlite3'))
+            target_path = str(Path(temp_dir, 'target.sqlite3'))
+
+            source = sqlite3.connect(source_path)
+            source.execute('PRAGMA journal_mode = WAL')
+            source.execute('PRAGMA wal_autocheckpoint = 0')
+            source.execute('CREATE TABLE t (x)')
+            source.execute('INSERT INTO t VALUES (1)')
+            source.commit()
+
+            self.assertIn(sqlite.copy_database(source_path, target_path), {'reflink', 'backup'})
+            source.close()
+
+            target = sqlite3.connect(target_path)
+            self.assertEqual(target.execute('SELECT x FROM t').fetchall(), [(1,)])
+            target.close()
+
+    def test_missing(self):
+        with TemporaryDirectory() as temp_dir:
+            with self.assertRaises(IOError):
+                sqlite.copy_database(Path(temp_dir, 'missing'), Path(temp_dir, 'target'))
+            self.assertFalse(Path(temp_dir, 'missing').exists())
+
+
+class TestSnapshots(unittest.TestCase):
+    """
+    `snapshots.snapshot()` and `snapshots.restore()`
+    """
+
+    def setUp(self):
+        temp_dir = TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.instance_path = Path(temp_dir.name)
+        self.db_path = str(snapshots.database_path(self.instance_path))
+
+    def _execute(self, sql):
+        db = sqlite3.connect(self.db_path)
+        try:
+            with db:
+                return db.execute(sql).fetchall()
+        finally:
+            db.close()
+
+    def test_snapshot_restore(self):
+        self._execute('CREATE TABLE t (x)')
+        self._execute('INSERT INTO t VALUES (1)')
+        snapshots.snapshot(self.instance_path, 'seeded')
+
+        self._execute('INSERT INTO t VALUES (2)')
+        snapshots.restore(self.instance_path, 'seeded')
+        self.assertEqual(self._execute('SELECT x FROM t'), [(1,)])
+
+        self.assertEqual([name for (name, path) in snapshots.list_snapshots(self.instance_path)],
+                         ['seeded'])
+
+    def test_errors(self):
+        cases = {
+            'no database': lambda: snapshots.snapshot(self.instance_path, 'name'),
+            'no snapshot': lambda: snapshots.restore(self.instance_path, 'name'),
+            'invalid name': lambda: snapshots.snapshot_path(self.instance_path, '../name'),
+        }
+        for (label, operation) in cases.items():
+            with self.subTest(label=label):
+                with self.assertRaises(snapshots.SnapshotError):
+                    operation()
+
+    def test_main(self):
+        dd = mock.Mock(instance_path=self.instance_path)
+        self._execute('CREATE TABLE t (x)')
+        with mock.patch('sys.stdout', new_callable=StringIO) as stdout:
+            snapshots.main_snapshot(dd, ['one'])
+            snapshots.main_restore(dd, ['one'])
+            snapshots.main_snapshot(dd, [])
+        lines = stdout.getvalue().splitlines()
+        self.assertRegex(lines[0], r"^Saved snapshot 'one' \((reflink|backup)\)$")
+        self.assertRegex(lines[1], r"^Restored snapshot 'one' \((reflink|backup)\)$")
+        self.assertTrue(lines[2].startswith('one '))
@@ -0,0 +1,75 @@
+import os.path
+from configparser import RawConfigParser
+from textwrap import dedent
+
+from py2_compat import unittest, TemporaryDirectory
+
+from django_develop import sqlite
+
+
+def _config(text):
+    config = RawConfigParser()
+    config.read_string(dedent(text))
+    return config
+
+
+class TestPragmasFromConfig(unittest.TestCase):
+    """
+    `sqlite.pragmas_from_config()`
+    """
+
+    def test_default_profile(self):
+        self.assertEqual(sqlite.pragmas_from_config(_config('')), sqlite.PROFILES['fast'])
+
+    def test_profiles(self):
+        for profile in sqlite.PROFILES:
+            with self.subTest(profile=profile):
+                self.assertEqual(
+                    sqlite.pragmas_from_config(_config("""\
+                        [sqlite]
+                        profile = {}
+                        """.format(profile))),
+                    sqlite.PROFILES[profile])
+
+    def test_overrides(self):
+        pragmas = sqlite.pragmas_from_config(_config("""\
+            [sqlite]
+            profile = default
+            cache_size = -1000
+            journal_mode = wal
+            """))
+        self.assertEqual(pragmas, {'cache_size': '-1000', 'journal_mode': 'wal'})
+
+    def test_invalid(self):
+        cases = {
+            'unknown profile': '[sqlite]\nprofile = nonexistent\n',
+            'invalid value': '[sqlite]\njournal_mode = WAL; DROP TABLE foo\n',
+        }
+        for (label, text) in cases.items():
+            with self.subTest(label=label):
+                with self.assertRaises(ValueError):
+                    sqlite.pragmas_from_config(_config(text))
+
+
+class TestDatabaseWrapper(unittest.TestCase):
+    """
+    `django_develop.db.backends.sqlite3.base.DatabaseWrapper`
+    """
+
+    def test_pragmas(self):
+        from django_develop.db.backends.sqlite3.base import DatabaseWrapper
+
+        with TemporaryDirectory() as temp_dir:
+            wrapper = DatabaseWrapper({
+                'ENGINE': 'django_develop.db.backends.sqlite3',
+                'NAME': os.path.join(temp_dir, 'db.sqlite3'),
+                'OPTIONS': {'pragmas': sqlite.PROFILES['fast']},
+            })
+            conn = wrapper.get_new_connection(wrapper.get_connection_params())
+            try:
+                self.assertEqual(conn.execute('PRAGMA journal_mode').fetchone(), ('wal',))
+                self.assertEqual(conn.execute('PRAGMA busy_timeout').fetchone(), (5000,))
+                # NORMAL
+                self.assertEqual(conn.execute('PRAGMA synchronous').fetchone(), (1,))
+            finally:
+                conn.close()
@@ -0,0 +1,212 @@
+import ast
+import os.path
+from pathlib import Path
+from textwrap import dedent
+
+from py2_compat import unittest, TemporaryDirectory
+
+from django_develop import static_analysis
+
+
+TEST_ROOT = os.path.dirname(__file__)
+
+
+class TestFindModuleSource(unittest.TestCase):
+    """
+    `static_analysis.find_module_source()`
+    """
+
+    def test_found(self):
+        self.assertEqual(
+            static_analysis.find_module_source('test_examples.likely_settings', [TEST_ROOT]),
+            os.path.join(TEST_ROOT, 'test_examples', 'likely_settings.py'))
+
+    def test_not_found(self):
+        for modname in ['nonexistent', 'test_examples.nonexistent', '', '.foo']:
+            with self.subTest(modname=modname):
+                self.assertIsNone(static_analysis.find_module_source(modname, [TEST_ROOT]))
+
+
+class TestAnalyseModule(unittest.TestCase):
+    """
+    `static_analysis.analyse_module()`
+    """
+
+    def _analyse(self, source):
+        return static_analysis.analyse_module(ast.parse(dedent(source)))
+
+    def test_bound_names(self):
+        (names, conclusive) = self._analyse("""\
+            import os.path
+            from django import VERSION as DJANGO_VERSION
+            A, (B, C) = 1, (2, 3)
+            try:
+                D = os.environ['D']
+            except KeyError as e:
+                D = None
+            if A:
+                E = [x for x in range(B)]
+            def f():
+                INNER = 1
+            """)
+        self.assertTrue(conclusive)
+        self.assertEqual(names, {'os', 'DJANGO_VERSION', 'A', 'B', 'C', 'D', 'e', 'E', 'f'})
+
+    def test_inconclusive(self):
+        cases = {
+            'star import': 'from base_settings import *',
+            'dynamic namespace': 'globals().update(FOO=1)',
+            'undefined name': 'FOO = BAR',
+        }
+        for (label, source) in cases.items():
+            with self.subTest(label=label):
+                (names, conclusive) = self._analyse(source)
+                self.assertFalse(conclusive)
+
+    def test_function_bodies(self):
+        """
+        Names used in function bodies don't count as undefined.
+        """
+        (names, conclusive) = self._analyse("""\
+            def f():
+                return BAR
+            """)
+        self.assertTrue(conclusive)
+
+
+class TestFindPotentialProblemsStatically(unittest.TestCase):
+    """
+    `static_analysis.find_potential_problems_statically()`
+    """
+
+    def test_examples(self):
+        """
+        Classify the example modules like `utils.find_potential_problems()`,
+        but leave the failing one inconclusive.
+        """
+        cases = {
+            'test_examples.error_settings': None,
+            'test_examples.likely_settings': set(),
+            'test_examples.no_likely_settings': {'no likely setting names'},
+            'test_examples.no_settings': {'no uppercase names'},
+            'nonexistent': None,
+        }
+        for (modname, problems) in cases.items():
+            with self.subTest(modname=modname):
+                self.assertEqual(
+                    static_analysis.find_potential_problems_statically(modname, [TEST_ROOT]),
+                    problems)
+
+    def test_failing_after_settings(self):
+        """
+        Modules that bind likely setting names, but might fail to import, are inconclusive.
+        """
+        with TemporaryDirectory() as temp_dir:
+            Path(temp_dir, 'failing_settings.py').write_text(
+                'SECRET_KEY = "x"\nFOO = UNDEFINED\n', encoding='utf-8')
+            self.assertIsNone(static_analysis.find_potential_problems_statically(
+                'failing_settings', [temp_dir]))
+
+    def test_imports(self):
+        """
+        Modules are only classified if everything they import would import.
+        """
+        cases = {
+            'missing module': ('import nonexistent_pkg_xyz\nSECRET_KEY = "x"\n', None),
+            'missing name': ('from os import nonexistent_name\nSECRET_KEY = "x"\n', None),
+            'missing relative': ('from . import nonexistent\nSECRET_KEY = "x"\n', None),
+            'failing helper': ('import failing_helper\nSECRET_KEY = "x"\n', None),
+            'failing package': ('import failing_package.module\nSECRET_KEY = "x"\n', None),
+            'star import': ('from helper import *\nSECRET_KEY = "x"\n', None),
+            'helper': ('from helper import BASE_DIR\nSECRET_KEY = "x"\n', set()),
+            'package': ('import package.module\nSECRET_KEY = "x"\n', set()),
+        }
+        with TemporaryDirectory() as temp_dir:
+            Path(temp_dir, 'helper.py').write_text(
+                'import os\nBASE_DIR = os.path.dirname(__file__)\n', encoding='utf-8')
+            Path(temp_dir, 'failing_helper.py').write_text(
+                'raise ImportError\n', encoding='utf-8')
+            for (package, init) in [('package', ''), ('failing_package', 'import missing\n')]:
+                Path(temp_dir, package).mkdir()
+                Path(temp_dir, package, '__init__.py').write_text(init, encoding='utf-8')
+                Path(temp_dir, package, 'module.py').write_text('', encoding='utf-8')
+            for (label, (source, problems)) in cases.items():
+                with self.subTest(label=label):
+                    modname = 'settings_' + label.replace(' ', '_')
+                    Path(temp_dir, modname + '.py').write_text(source, encoding='utf-8')
+                    self.assertEqual(static_analysis.find_potential_problems_statically(
+                        modname, [temp_dir]), problems)
+
+    def test_failing_package(self):
+        """
+        Modules in packages that might fail to import are inconclusive.
+        """
+        with TemporaryDirectory() as temp_dir:
+            Path(temp_dir, 'project').mkdir()
+            Path(temp_dir, 'project', '__init__.py').write_text(
+                'import nonexistent_pkg_xyz\n', encoding='utf-8')
+            Path(temp_dir, 'project', 'settings.py').write_text(
+                'SECRET_KEY = "x"\n', encoding='utf-8')
+            self.assertIsNone(static_analysis.find_potential_problems_statically(
+                'project.settings', [temp_dir]))
+
+    def test_realistic(self):
+        """
+        Common settings idioms can be classified.
+        """
+        cases = {
+            'startproject': """\
+                '''Django settings for project.'''
+                from pathlib import Path
+                BASE_DIR = Path(__file__).resolve().parent.parent
+                SECRET_KEY = 'django-insecure-dummy'
+                DEBUG = True
+                ALLOWED_HOSTS = []
+                DATABASES = {
+                    'default': {
+                        'ENGINE': 'django.db.backends.sqlite3',
+                        'NAME': BASE_DIR / 'db.sqlite3',
+                    }
+                }
+                STATIC_URL = 'static/'
+                """,
+            'os.path': """\
+                import os
+                BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+                SECRET_KEY = os.environ.get('SECRET_KEY', 'dummy')
+                DEBUG = os.environ.get('DEBUG') == '1'
+                TEMPLATE_DIRS = [os.path.join(BASE_DIR, 'templates')]
+                INSTALLED_APPS = ('django.contrib.admin',)
+                INSTALLED_APPS += ('django.contrib.auth',)
+                """,
+        }
+        with TemporaryDirectory() as temp_dir:
+            Path(temp_dir, 'project').mkdir()
+            Path(temp_dir, 'project', '__init__.py').write_text('', encoding='utf-8')
+            for (label, source) in cases.items():
+                with self.subTest(label=label):
+                    Path(temp_dir, 'project', 'settings.py').write_text(
+                        dedent(source), encoding='utf-8')
+                    self.assertEqual(static_analysis.find_potential_problems_statically(
+                        'project.settings', [temp_dir]), set())
+
+    def test_might_raise(self):
+        """
+        Statements that might raise make the result inconclusive.
+        """
+        cases = {
+            'environ lookup': 'import os\nSECRET_KEY = os.environ["SECRET_KEY"]\n',
+            'unknown call': 'import os\nSECRET_KEY = os.urandom(8)\n',
+            'call statement': 'print("hello")\nSECRET_KEY = "x"\n',
+            'compound statement': 'if True:\n    SECRET_KEY = "x"\n',
+            'unpacking': 'A, B = (1, 2, 3)\nSECRET_KEY = "x"\n',
+            'type error': 'SECRET_KEY = "x" + 1\n',
+            'unhashable key': 'SECRET_KEY = "x"\nFOO = {[]: 1}\n',
+            'decorator': '@staticmethod\ndef f(): pass\nSECRET_KEY = "x"\n',
+        }
+        with TemporaryDirectory() as temp_dir:
+            for (label, source) in cases.items():
+                with self.subTest(label=label):
+                    Path(temp_dir, 'raising_settings.py').write_text(source, encoding='utf-8')
+                    self.assertIsNone(static_analysis.find_potential_problems_statically(
+                        'raising_settings', [temp_dir]))
@@ -0,0 +1,125 @@
+import json
+import os
+import subprocess
+import sys
+from io import StringIO
+from pathlib import Path
+from textwrap import dedent
+
+from py2_compat import unittest, mock, TemporaryDirectory
+
+from django_develop import cli, static_files
+
+
+class TestParseArgs(unittest.TestCase):
+    """
+    `static_files.parse_args()`
+    """
+
+    def test_supported(self):
+        for args in [[], ['--noinput'], ['--no-input', '-v', '0'], ['--verbosity=2']]:
+            with self.subTest(args=args):
+                self.assertIsNotNone(static_files.parse_args(args))
+
+    def test_unsupported(self):
+        for args in [['--clear'], ['--link'], ['-i', '*.map'], ['--dry-run'], ['-v', '9']]:
+            with self.subTest(args=args):
+                with mock.patch('sys.stderr', new_callable=StringIO):
+                    self.assertIsNone(static_files.parse_args(args))
+
+
+class TestCollect(unittest.TestCase):
+    """
+    `static_files.collect()`
+    """
+
+    def setUp(self):
+        temp_dir = TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.source_dir = Path(temp_dir.name, 'assets')
+        self.root = str(Path(temp_dir.name, 'static_files'))
+        self.manifest = Path(temp_dir.name, 'static-manifest.json')
+
+        (self.source_dir / 'css').mkdir(parents=True)
+        self._write('css/site.css', 'body {}')
+        self._write('app.js', 'app()')
+
+    def _write(self, path, text):
+        (self.source_dir / path).write_text(text)
+
+    def _sources(self):
+        return {str(path.relative_to(self.source_dir)): str(path)
+                for path in self.source_dir.rglob('*') if path.is_file()}
+
+    def _collect(self, method='hardlink'):
+        counts = static_files.collect(self.root, self.manifest, self._sources(), method=method,
+                                      jobs=2)
+        return {action: count for (action, count) in counts.items() if count}
+
+    def _collected(self, path):
+        return Path(self.root, path).read_text()
+
+    def test_incremental(self):
+        self.assertEqual(self._collect(), {'hardlink': 2})
+        self.assertEqual(self._collected('css/site.css'), 'body {}')
+        self.assertEqual(self._collect(), {'unmodified': 2})
+
+        # Touched, but unchanged.
+        source = str(self.source_dir / 'app.js')
+        os.utime(source, (0, 0))
+        self.assertEqual(self._collect(), {'unmodified': 2})
+        self.assertEqual(json.loads(self.manifest.read_text())['files']['app.js'][2], 0)
+
+        # Changed, and removed.
+        (self.source_dir / 'app.js').unlink()
+        self._write('app.js', 'app(2)')
+        (self.source_dir / 'css' / 'site.css').unlink()
+        self.assertEqual(self._collect(), {'hardlink': 1, 'removed': 1})
+        self.assertEqual(self._collected('app.js'), 'app(2)')
+        self.assertFalse(Path(self.root, 'css', 'site.css').exists())
+
+    def test_copy(self):
+        self.assertEqual(self._collect(method='copy'), {'copy': 2})
+        self.assertNotEqual(os.stat(str(self.source_dir / 'app.js')).st_ino,
+                            os.stat(os.path.join(self.root, 'app.js')).st_ino)
+
+        # Collected files that changed are replaced, even if the source didn't change.
+        Path(self.root, 'app.js').write_text('modified')
+        os.utime(str(self.source_dir / 'app.js'), (0, 0))
+        self.assertEqual(self._collect(method='copy'), {'copy': 1, 'unmodified': 1})
+        self.assertEqual(self._collected('app.js'), 'app()')
+
+
+class TestCollectstatic(unittest.TestCase):
+    """
+    `static_files.collectstatic()`, in a subprocess with Django set up.
+    """
+
+    def setUp(self):
+        temp_dir = TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        assets = Path(temp_dir.name, 'assets')
+        assets.mkdir()
+        (assets / 'app.js').write_text('app()')
+        Path(temp_dir.name, 'static_settings.py').write_text(dedent("""\
+            INSTALLED_APPS = ['django.contrib.staticfiles']
+            STATIC_URL = '/static/'
+            STATICFILES_DIRS = [{!r}]
+            """.format(str(assets))))
+        self.instance_path = Path(temp_dir.name, 'instance')
+        with mock.patch('sys.stdout', new_callable=StringIO):
+            cli.DjangoDevelop(self.instance_path).init_instance('static_settings')
+
+        self.env = dict(os.environ, PYTHONPATH=os.pathsep.join(
+            [temp_dir.name, str(Path(static_files.__file__).parent.parent)]))
+
+    def test_collectstatic(self):
+        output = subprocess.check_output([sys.executable, '-c', dedent("""\
+            from django_develop import cli, static_files
+            dd = cli.DjangoDevelop({!r})
+            dd.activate_dev_settings()
+            static_files.collectstatic(dd, ['--noinput'], None)
+            """.format(str(self.instance_path)))], env=self.env)
+        self.assertIn('1 static files linked, 0 copied, 0 unmodified, 0 removed',
+                      output.decode('utf-8'))
+        self.assertEqual((self.instance_path / 'static_files' / 'app.js').read_text(), 'app()')
@@ -0,0 +1,123 @@
+import hashlib
+import os
+import sqlite3
+import subprocess
+import sys
+from configparser import RawConfigParser
+from io import StringIO
+from pathlib import Path
+from textwrap import dedent
+
+from py2_compat import unittest, mock, TemporaryDirectory
+
+from django_develop import cli, test_databases
+
+
+class TestDevTestSettings(unittest.TestCase):
+    """
+    `test_databases.dev_test_settings()`
+    """
+
+    def test_settings(self):
+        config = RawConfigParser()
+        config.read_string('[tests]\ndirectory = /tmp/tests\n'
+                           '[migrations]\nmax_templates = 2\nmax_templates_size = 3\n')
+        tag = hashlib.sha1(b'/instance').hexdigest()[:12]
+        self.assertEqual(test_databases.dev_test_settings(Path('/instance'), config), {
+            'NAME': '/tmp/tests/django-develop-test-{}.sqlite3'.format(tag),
+            'DJANGO_DEVELOP_INSTANCE': '/instance',
+            'DJANGO_DEVELOP_TEMPLATE_LIMITS': {'max_templates': 2, 'max_size': 3 * 1024 * 1024},
+        })
+
+    def test_disabled(self):
+        config = RawConfigParser()
+        config.read_string('[tests]\ntemplate_cache = false\n')
+        self.assertEqual(test_databases.dev_test_settings(Path('/instance'), config), {})
+
+
+class TestSaveTemplate(unittest.TestCase):
+    """
+    `test_databases.save_template()`
+    """
+
+    def test_limits(self):
+        """
+        Older templates beyond the given limits are evicted.
+        """
+        with TemporaryDirectory() as temp_dir:
+            instance_path = Path(temp_dir)
+            directory = test_databases.templates_path(instance_path)
+            directory.mkdir()
+            old = directory / 'old.sqlite3'
+            sqlite3.connect(str(old)).close()
+            os.utime(str(old), (0, 0))
+            test_database = Path(temp_dir, 'test.sqlite3')
+            sqlite3.connect(str(test_database)).close()
+
+            with mock.patch('django_develop.test_databases.template_for',
+                            return_value=directory / 'new.sqlite3'):
+                test_databases.save_template(instance_path, str(test_database),
+                                             {'max_templates': 1, 'max_size': 1024 * 1024})
+            self.assertEqual(sorted(path.name for path in directory.iterdir()),
+                             ['new.sqlite3'])
+
+
+class TestCreation(unittest.TestCase):
+    """
+    Test database creation with `django_develop.db.backends.sqlite3`, in a subprocess.
+    """
+
+    def setUp(self):
+        temp_dir = TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        Path(temp_dir.name, 'test_db_settings.py').write_text(dedent("""\
+            INSTALLED_APPS = ['django.contrib.contenttypes', 'django.contrib.auth']
+            """))
+        self.instance_path = Path(temp_dir.name, 'instance')
+        with mock.patch('sys.stdout', new_callable=StringIO):
+            dd = cli.DjangoDevelop(self.instance_path)
+            dd.init_instance('test_db_settings')
+        config = dd.read_config()
+        config.add_section('tests')
+        config.set('tests', 'directory', temp_dir.name)
+        dd.write_config(config)
+
+        self.env = dict(os.environ, PYTHONPATH=os.pathsep.join(
+            [temp_dir.name, str(Path(cli.__file__).parent.parent)]))
+
+    def _run(self):
+        return subprocess.check_output([sys.executable, '-c', dedent("""\
+            import os
+            import sqlite3
+            import django
+            from django.db import connection
+            from django_develop import cli
+            cli.DjangoDevelop({!r}).activate_dev_settings()
+            django.setup()
+            name = connection.creation.create_test_db(verbosity=1)
+            print('per process:', name.endswith('-{{}}.sqlite3'.format(os.getpid())))
+            connection.creation.clone_test_db(suffix=1, verbosity=0)
+            clone = connection.creation.get_test_db_clone_settings(1)['NAME']
+            tables = "SELECT name FROM sqlite_master WHERE type = 'table' ORDER BY name"
+            print('clone tables:', 'auth_user' in connection.introspection.table_names() and
+                  sqlite3.connect(clone).execute(tables).fetchall() ==
+                  sqlite3.connect(name).execute(tables).fetchall())
+            connection.creation.destroy_test_db(suffix=1, verbosity=0)
+            connection.creation.destroy_test_db('old', verbosity=0)
+            print('removed:', not os.path.exists(name) and not os.path.exists(clone))
+            """.format(str(self.instance_path)))], env=self.env,
+            stderr=subprocess.STDOUT).decode('utf-8')
+
+    def test_templates(self):
+        first = self._run()
+        self.assertNotIn('Copied test database from template', first)
+        self.assertIn('clone tables: True', first)
+        self.assertIn('per process: True', first)
+        self.assertIn('removed: True', first)
+        templates = list(test_databases.templates_path(self.instance_path).iterdir())
+        self.assertEqual(len(templates), 1)
+
+        second = self._run()
+        self.assertIn('Copied test database from template {}'.format(templates[0].name[:12]),
+                      second)
+        self.assertIn('clone tables: True', second)
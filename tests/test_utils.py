@@ -7,7 +7,10 @@ from textwrap import dedent
 from hypothesis import given, example, note, assume
 from hypothesis.strategies import text
 
-from py2_compat import unittest, mock
+from configparser import RawConfigParser
+from pathlib import Path
+
+from py2_compat import unittest, mock, TemporaryDirectory
 
 from django_develop import utils
 
@@ -45,6 +48,22 @@ class TestVirtualEnvDetection(unittest.TestCase):
                     self.assertEqual(utils.is_inside_virtual_env(), expected)
 
 
+class TestSuccess(unittest.TestCase):
+    """
+    `utils.SUCCESS()`
+    """
+
+    def test_matches_django(self):
+        from django.core.management.color import color_style
+        environ = {k: v for (k, v) in os.environ.items() if k != 'DJANGO_COLORS'}
+        for isatty in [True, False]:
+            with self.subTest(isatty=isatty):
+                stdout = mock.Mock(**{'isatty.return_value': isatty})
+                environ_patch = mock.patch.dict(os.environ, environ, clear=True)
+                with mock.patch('sys.stdout', stdout), environ_patch:
+                    self.assertEqual(utils.SUCCESS('spam'), color_style().SUCCESS('spam'))
+
+
 class TestIsCandidateName(unittest.TestCase):
     """
     `utils.is_candidate_name()`
@@ -139,6 +158,77 @@ class TestDiscoverCandidateSettings(unittest.TestCase):
                 ])])
 
 
+class TestDiscoveryRules(unittest.TestCase):
+    """
+    `utils.DiscoveryRules`
+    """
+
+    def test_from_config(self):
+        config = RawConfigParser()
+        self.assertEqual(utils.DiscoveryRules.from_config(config), utils.DiscoveryRules())
+
+        config.read_string(dedent("""\
+            [discovery]
+            include = my_project*
+            exclude =
+                my_project_legacy
+                *.vendored
+            exclude_stdlib = false
+            """))
+        self.assertEqual(
+            utils.DiscoveryRules.from_config(config),
+            utils.DiscoveryRules(include=['my_project*'],
+                                 exclude=['my_project_legacy', '*.vendored'],
+                                 exclude_stdlib=False))
+
+    def test_includes(self):
+        rules = utils.DiscoveryRules(include=['my_project*'], exclude=['*.vendored'])
+        cases = {
+            'my_project': True,
+            'my_project_two.settings': True,
+            'my_project.vendored': False,
+            'other.settings': False,
+            'numpy': False,
+        }
+        for (modname, expected) in cases.items():
+            with self.subTest(modname=modname):
+                self.assertEqual(rules.includes(modname), expected)
+
+    def test_stdlib(self):
+        """
+        The standard library is excluded by default.
+        """
+        stdlib = os.path.dirname(os.__file__)
+        self.assertTrue(utils.DiscoveryRules().excludes_path_entry(stdlib))
+        self.assertFalse(utils.DiscoveryRules(exclude_stdlib=False).excludes_path_entry(stdlib))
+        self.assertFalse(utils.DiscoveryRules().excludes_path_entry(TEST_ROOT))
+
+
+class TestDiscoverCandidatesInPathEntry(unittest.TestCase):
+    """
+    `utils.discover_candidates_in_path_entry()`
+    """
+
+    def test_walk(self):
+        """
+        Walk packages on the filesystem, without importing them.
+        """
+        with TemporaryDirectory() as temp_dir:
+            for path in ['app/__init__.py', 'app/sub/__init__.py', 'not_a_package/settings.py',
+                         'skipped/__init__.py', 'skipped/settings.py']:
+                if not Path(temp_dir, path).parent.exists():
+                    Path(temp_dir, path).parent.mkdir(parents=True)
+                Path(temp_dir, path).write_text('raise Exception\n', encoding='utf-8')
+            for path in ['settings.py', 'app/settings.py', 'app/sub/dev_settings.py',
+                         'app/sub/settings_ext.so']:
+                Path(temp_dir, path).write_text('', encoding='utf-8')
+
+            rules = utils.DiscoveryRules(exclude=['skipped'])
+            self.assertEqual(
+                utils.discover_candidates_in_path_entry(temp_dir, rules),
+                ['app.settings', 'app.sub.dev_settings', 'settings'])
+
+
 class TestFindPotentialProblems(unittest.TestCase):
     """
     `utils.find_potential_problems()`
@@ -270,3 +360,32 @@ class TestPrintCandidateSettings(unittest.TestCase):
                     test_examples.no_settings (no uppercase names)
 
             """.format(TEST_ROOT)))
+
+    def test_failed_imports_remembered(self):
+        """
+        Later calls don't import failed candidates again, until their source or the path changes.
+        """
+        with TemporaryDirectory() as temp_dir, \
+                mock.patch('sys.path', [temp_dir]), \
+                mock.patch.dict('django_develop.discovery._failed_imports', clear=True):
+            imports_log = Path(temp_dir, 'imports.log')
+            source = Path(temp_dir, 'broken_settings.py')
+            source.write_text('with open({!r}, "a") as f:\n    f.write("x")\nraise KeyError\n'
+                              .format(str(imports_log)))
+            for _ in range(2):
+                with self._patch_stdout() as stdout:
+                    utils.print_candidate_settings(include_problems=True)
+                self.assertIn('broken_settings (import raised KeyError)', stdout.getvalue())
+            self.assertEqual(imports_log.read_text(), 'x')
+
+            stat = source.stat()
+            os.utime(str(source), (stat.st_atime, stat.st_mtime + 10))
+            with self._patch_stdout():
+                utils.print_candidate_settings(include_problems=True)
+            self.assertEqual(imports_log.read_text(), 'xx')
+
+            # Or the path.
+            with TemporaryDirectory() as other_dir, mock.patch('sys.path', [temp_dir, other_dir]):
+                with self._patch_stdout():
+                    utils.print_candidate_settings(include_problems=True)
+            self.assertEqual(imports_log.read_text(), 'xxx')